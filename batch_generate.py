@@ -0,0 +1,295 @@
+"""Bulk reminder generation from a CSV or JSONL file.
+
+Each input row needs ``pet_name`` and ``start_date`` (YYYY-MM-DD) and may set
+``dosage`` (default 12), ``time`` (HH:MM, empty for all-day), ``notes`` and
+``product_name``. Rendering fans out over a process pool, uploads run through
+a bounded thread pool, and one manifest line per input row is written in
+input order:
+
+    python batch_generate.py clinic.csv --out runs/clinic
+
+Input is streamed and at most ``--window`` rows are in flight, so memory stays
+flat for very large files. The manifest doubles as the checkpoint: running the
+same command again skips every row it records as ok and retries the others,
+appending their new outcome (the last line for a row wins). Published reminders
+are added to the reminder index in batches (see reminder_core.reminder_index).
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime
+
+from reminder_core.config import Settings
+from reminder_core.dedup import ENTRY_FIELDS, request_fingerprint
+from reminder_core.encoding import profile_extension
+from reminder_core.id_allocator import LocalIdAllocator
+from reminder_core.page import get_page_assets
+from reminder_core.pipeline import (
+    DEFAULT_PRODUCT,
+    ReminderRequest,
+    build_reminder_details,
+    format_meaningful_id,
+    get_generator,
+    render_artifacts,
+)
+from reminder_core.reminder_index import BufferedIndexWriter, IndexEntry
+from reminder_core.storage import ARTIFACT_URL_FIELDS, SHARDED_KEY_LAYOUT, ArtifactPublisher
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def iter_rows(path, input_format=None):
+    """Yield input rows as dicts, one at a time"""
+    input_format = input_format or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if input_format == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def parse_row(row):
+    """Validate one input row and return its ReminderRequest (raises ValueError)"""
+    pet_name = str(row.get('pet_name') or '').strip()
+    if not pet_name:
+        raise ValueError("pet_name is required")
+    start_date = date.fromisoformat(str(row.get('start_date') or '').strip())
+    dosage = int(row.get('dosage') or 12)
+    if dosage < 1:
+        raise ValueError("dosage must be at least 1")
+    selected_time = str(row.get('time') or '').strip()
+    if selected_time:
+        selected_time = datetime.strptime(selected_time, "%H:%M").strftime("%H:%M")
+    return ReminderRequest(
+        pet_name=pet_name,
+        product_name=str(row.get('product_name') or DEFAULT_PRODUCT).strip(),
+        start_date=start_date,
+        dosage=dosage,
+        selected_time=selected_time,
+        notes=str(row.get('notes') or '')
+    )
+
+
+def render_row(meaningful_id, request, settings):
+    """Process-pool task: render every artifact for one row"""
+    return render_artifacts(meaningful_id, request, ArtifactPublisher(settings), settings.card_image_profile).uploads
+
+
+def publish_row(row_no, meaningful_id, render_future, publisher, dry_run, dedup=None, reminder_index=None):
+    """Upload-pool task: wait for a row's render, upload it and return its manifest entry.
+
+    ``dedup`` is an optional ``(index, fingerprint, reminder_details)`` and
+    ``reminder_index`` an optional ``(BufferedIndexWriter, IndexEntry)``, both recorded once published.
+    """
+    entry = {'row': row_no, 'meaningful_id': meaningful_id}
+    try:
+        uploads = render_future.result()
+        for name, spec in uploads.items():
+            url = publisher.object_url(spec['key'])
+            if not dry_run:
+                url = publisher.put_artifact(**spec)
+            entry[ARTIFACT_URL_FIELDS[name]] = url
+        entry['status'] = 'ok'
+        if dedup:
+            index, fingerprint, reminder_details = dedup
+            index.record(fingerprint, {**{name: entry.get(name) for name in ENTRY_FIELDS}, 'reminder_details': reminder_details})
+        if reminder_index and not dry_run:
+            writer, index_entry = reminder_index
+            writer.add(index_entry)
+    except Exception as e:
+        entry['status'] = 'error'
+        entry['error'] = f"{type(e).__name__}: {e}"
+    return entry
+
+
+def reuse_row(row_no, original):
+    """Upload-pool task: the manifest entry for a row identical to one this run is still publishing.
+
+    Queued after ``original``, so that task has already started when this one waits for it.
+    """
+    first = original.result()
+    if first['status'] != 'ok':
+        return {'row': row_no, 'status': 'error', 'error': f"identical row {first['row']} failed: {first['error']}"}
+    return {'row': row_no, **{name: first.get(name) for name in ENTRY_FIELDS if name != 'reminder_details'},
+            'status': 'ok', 'deduplicated': True}
+
+
+class Manifest:
+    """Append-only JSONL manifest that also serves as the resume checkpoint"""
+
+    def __init__(self, path, sync_every=100):
+        self.path = path
+        self.sync_every = sync_every
+        # Rows whose latest entry is 'ok'; every other row is processed (again) on resume
+        self.done = self._recover()
+        self._unsynced = 0
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _recover(self):
+        """Rows last recorded as ok; drops a line torn by a crash mid-write"""
+        if not os.path.exists(self.path):
+            return set()
+        statuses = {}
+        good_offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                statuses[entry['row']] = entry['status']
+                good_offset += len(line)
+        if good_offset != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_offset)
+        return {row for row, status in statuses.items() if status == 'ok'}
+
+    def write(self, entry):
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        if entry['status'] == 'ok':
+            self.done.add(entry['row'])
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        self.sync()
+        self._file.close()
+
+
+def run_batch(input_path, out_dir, settings, workers=None, upload_workers=8, window=64, dry_run=False, input_format=None):
+    """Generate reminders for every row not yet recorded as ok in the manifest; returns (ok, errors) for this run"""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = Manifest(os.path.join(out_dir, MANIFEST_NAME))
+    skip = set(manifest.done)
+    generator = get_generator(settings)
+    publisher = generator.publisher
+    # Dry runs must not consume IDs from the shared S3 counter
+    local_ids = LocalIdAllocator() if dry_run else None
+    if not dry_run:
+        static_errors = publisher.publish_static(get_page_assets().values())
+        if static_errors:
+            raise RuntimeError(f"could not publish shared page assets: {static_errors}")
+    index_writer = BufferedIndexWriter(generator.reminder_index) if generator.reminder_index and not dry_run else None
+    image_extension = profile_extension(settings.card_image_profile)
+    counts = {'ok': 0, 'error': 0}
+    # Rows of this run still being published, by fingerprint; the dedup index only learns of them once uploaded
+    in_flight = {}
+
+    def record(entry):
+        manifest.write(entry)
+        counts[entry['status']] += 1
+
+    # Spawned workers do not inherit the parent's S3 and upload threads
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as render_pool, \
+            ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="batch-upload") as upload_pool:
+        pending = deque()
+        try:
+            for row_no, row in enumerate(iter_rows(input_path, input_format), 1):
+                if row_no in skip:
+                    continue
+                try:
+                    request = parse_row(row)
+                except (KeyError, TypeError, ValueError) as e:
+                    entry = {'row': row_no, 'status': 'error', 'error': f"invalid row: {e}"}
+                    pending.append(upload_pool.submit(lambda entry=entry: entry))
+                else:
+                    # Identical rows already published (by this or an earlier run) are reused as is
+                    dedup = existing = original = None
+                    if not dry_run and generator.dedup_index is not None:
+                        fingerprint = request_fingerprint(request, settings.card_image_profile)
+                        # Before the index: a row leaves in_flight only after it has been recorded there
+                        original = in_flight.get(fingerprint)
+                        if original is None:
+                            existing = generator.dedup_index.lookup(fingerprint)
+                        reminder_details = build_reminder_details(request.start_date, request.dosage,
+                                                                  request.selected_time, request.notes)
+                        dedup = (generator.dedup_index, fingerprint, reminder_details)
+                    if original is not None:
+                        pending.append(upload_pool.submit(reuse_row, row_no, original))
+                    elif existing is not None:
+                        entry = {'row': row_no, **{name: existing.get(name) for name in ENTRY_FIELDS if name != 'reminder_details'},
+                                 'status': 'ok', 'deduplicated': True}
+                        pending.append(upload_pool.submit(lambda entry=entry: entry))
+                    else:
+                        try:
+                            # Only leased numbers are unique across processes; a failed lease fails the row
+                            sequence_number = local_ids.allocate() if local_ids else generator.allocator.allocate()
+                        except Exception as e:
+                            entry = {'row': row_no, 'status': 'error',
+                                     'error': f"could not reserve an ID: {type(e).__name__}: {e}"}
+                            pending.append(upload_pool.submit(lambda entry=entry: entry))
+                        else:
+                            meaningful_id = format_meaningful_id(sequence_number, request.pet_name,
+                                                                 request.product_name)
+                            render_future = render_pool.submit(render_row, meaningful_id, request, settings)
+                            reminder_index = index_writer and (index_writer, IndexEntry(
+                                meaningful_id, SHARDED_KEY_LAYOUT, image_extension, [request.pet_name]))
+                            future = upload_pool.submit(publish_row, row_no, meaningful_id, render_future,
+                                                        publisher, dry_run, dedup, reminder_index)
+                            if dedup:
+                                in_flight[fingerprint] = future
+                                future.add_done_callback(lambda _, fingerprint=fingerprint: in_flight.pop(fingerprint))
+                            pending.append(future)
+
+                # Write finished rows in input order; block once the window is full
+                while pending and (len(pending) >= window or pending[0].done()):
+                    record(pending.popleft().result())
+            while pending:
+                record(pending.popleft().result())
+        finally:
+            manifest.close()
+    if index_writer:
+        # Reminders left out here are picked up by migrate_keys.py --index-only
+        try:
+            index_writer.flush()
+        except Exception as e:
+            print(f"could not update the reminder index: {type(e).__name__}: {e}", file=sys.stderr)
+    return counts['ok'], counts['error']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate pet reminders in bulk from a CSV or JSONL file.")
+    parser.add_argument('input', help="CSV or JSONL file with one reminder per row")
+    parser.add_argument('--out', required=True, help="directory for the manifest/checkpoint")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help="input format (default: from the file extension)")
+    parser.add_argument('--workers', type=int, default=None, help="render processes (default: CPU count)")
+    parser.add_argument('--upload-workers', type=int, default=8, help="concurrent S3 uploads")
+    parser.add_argument('--window', type=int, default=64, help="maximum rows in flight")
+    parser.add_argument('--dry-run', action='store_true', help="render everything but upload nothing")
+    args = parser.parse_args(argv)
+
+    settings = Settings.from_mapping()
+    if not args.dry_run:
+        configured, error = get_generator(settings).s3_status()
+        if not configured:
+            parser.error(f"S3 is not configured ({error}); fix the AWS settings or use --dry-run")
+
+    ok, errors = run_batch(args.input, args.out, settings, args.workers, args.upload_workers,
+                           max(1, args.window), args.dry_run, args.format)
+    print(f"{ok} reminders generated, {errors} rows failed; manifest: {os.path.join(args.out, MANIFEST_NAME)}")
+    dedup_index = get_generator(settings).dedup_index
+    if dedup_index is not None and not args.dry_run:
+        stats = dedup_index.stats()
+        print(f"deduplicated {stats['local_hit'] + stats['remote_hit']} of {stats['lookups']} rows "
+              f"(hit rate {stats['hit_rate']:.1%})")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Reminder card rendering: static template + overlay vs. drawing from scratch.
+
+Checks that both renderers produce pixel-identical cards for a few
+representative inputs, then times each one.
+
+    python -m benchmarks.bench_card --renders 50
+"""
+import argparse
+import statistics
+import time
+
+from reminder_core.card import create_reminder_image
+from reminder_core.qr import get_qr_matrix
+
+CASES = [
+    ('Daisy', {'frequency': 'Monthly', 'start_date': '2026-10-17', 'duration': '≈ 12 months',
+               'total_reminders': 12, 'times': '', 'notes': ''}),
+    ('Charlie', {'frequency': 'Monthly', 'start_date': '2026-11-01', 'duration': '≈ 1.0 years',
+                 'total_reminders': 13, 'times': '08:30', 'notes': 'Give with food, check for side effects after the dose'}),
+    ('Maximilian Von Fluffington III', {'frequency': 'Monthly', 'start_date': '2026-11-01', 'duration': '≈ 2.0 years',
+                                        'total_reminders': 24, 'times': '21:00', 'notes': 'short'}),
+]
+PRODUCT = 'NexGard SPECTRA'
+QR_URL = 'https://pet-reminder.s3.us-east-1.amazonaws.com/calendars/QR0001_Daisy_NexGardSPE.ics'
+
+
+def time_renders(renders, **kwargs):
+    qr = get_qr_matrix(QR_URL)
+    samples = []
+    for i in range(renders):
+        pet_name, details = CASES[i % len(CASES)]
+        started = time.perf_counter()
+        create_reminder_image(pet_name, PRODUCT, details, qr, **kwargs)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--renders', type=int, default=50)
+    args = parser.parse_args()
+
+    qr = get_qr_matrix(QR_URL)
+    for pet_name, details in CASES:
+        templated = create_reminder_image(pet_name, PRODUCT, details, qr)
+        scratch = create_reminder_image(pet_name, PRODUCT, details, qr, use_template=False)
+        if templated.tobytes() != scratch.tobytes():
+            raise SystemExit(f"template output differs from the from-scratch renderer for {pet_name!r}")
+    print(f"pixel-identical output for {len(CASES)} cases")
+
+    for name, kwargs in (('from scratch', {'use_template': False}), ('template', {})):
+        samples = time_renders(args.renders, **kwargs)
+        print(f"{name:>13}: median {statistics.median(samples):.2f} ms, "
+              f"max {max(samples):.2f} ms over {len(samples)} renders")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Size/time report for the card and QR image encoding profiles.
+
+    python -m benchmarks.bench_encoding --repeat 10
+"""
+import argparse
+import io
+import statistics
+import time
+
+from PIL import Image, ImageChops
+
+from reminder_core.card import create_reminder_image
+from benchmarks.bench_card import CASES, PRODUCT, QR_URL
+from reminder_core.encoding import ENCODING_PROFILES, encode_image
+from reminder_core.qr import get_qr_matrix
+
+
+def max_channel_error(original, data):
+    decoded = Image.open(io.BytesIO(data)).convert('RGB')
+    return max(high for _, high in ImageChops.difference(original.convert('RGB'), decoded).getextrema())
+
+
+def report(label, images, repeat):
+    print(f"\n{label}")
+    print(f"{'profile':>15} {'bytes':>9} {'encode ms':>10} {'max error':>10}")
+    for profile in ENCODING_PROFILES:
+        sizes, samples, errors = [], [], []
+        for img in images:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                encoded = encode_image(img, profile)
+                samples.append((time.perf_counter() - started) * 1000)
+            sizes.append(len(encoded.data))
+            errors.append(max_channel_error(img, encoded.data))
+        print(f"{profile:>15} {statistics.mean(sizes):>9.0f} {statistics.median(samples):>10.2f} {max(errors):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    qr = get_qr_matrix(QR_URL)
+    cards = [create_reminder_image(pet_name, PRODUCT, details, qr) for pet_name, details in CASES]
+    report("reminder card (1200x800)", cards, args.repeat)
+    report("QR code (box size 12)", [qr.to_image(box_size=12)], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
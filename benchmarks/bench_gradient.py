@@ -0,0 +1,54 @@
+"""Micro-benchmark: card gradient via the draw.line loop vs. the gradient engine.
+
+    python -m benchmarks.bench_gradient --repeat 50
+"""
+import argparse
+import statistics
+import time
+
+from PIL import Image, ImageDraw
+
+from reminder_core.gradient import linear_gradient
+
+SIZE = (1200, 800)
+START, END = (8, 49, 42), (10, 61, 51)
+
+
+def line_loop_gradient(size, start, end):
+    """The per-row loop the card renderer used before"""
+    width, height = size
+    img = Image.new('RGB', size, start)
+    draw = ImageDraw.Draw(img)
+    for i in range(height):
+        color_factor = i / height
+        fill = tuple(int(s + (e - s) * color_factor) for s, e in zip(start, end))
+        draw.line([(0, i), (width, i)], fill=fill)
+    return img
+
+
+def measure(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(SIZE, START, END)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    if line_loop_gradient(SIZE, START, END).tobytes() != linear_gradient(SIZE, START, END).tobytes():
+        raise SystemExit("gradient engine output differs from the draw.line loop")
+    print("byte-identical output")
+
+    loop_ms = measure(line_loop_gradient, args.repeat)
+    engine_ms = measure(linear_gradient, args.repeat)
+    print(f"draw.line loop: {loop_ms:.3f} ms")
+    print(f"        engine: {engine_ms:.3f} ms ({loop_ms / engine_ms:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Calendar files: direct ICS writer vs. the icalendar object graph.
+
+Checks that the fast writer's output is byte-identical to the icalendar
+reference for awkward inputs (escapes, CR/LF variants, multi-byte text that
+straddles the 75-octet fold) and that icalendar parses it back to the same
+values, then times single files and a bulk run.
+
+    python -m benchmarks.bench_ics --bulk 10000
+"""
+import argparse
+import statistics
+import time
+from datetime import date, datetime, timezone
+
+from icalendar import Calendar
+
+from reminder_core.ics import create_calendar_reminder, create_calendar_reminder_reference
+
+UID = '5f0c1f6e-8a53-4d1f-9a51-0f5dbd3c7b11'
+DTSTAMP = datetime(2026, 10, 17, 9, 30, 5)
+PRODUCT = 'NexGard SPECTRA'
+CASES = [
+    ('Daisy', PRODUCT, 12, '', date(2026, 10, 17), ''),
+    ('Charlie', PRODUCT, 13, '08:30', date(2026, 11, 1), 'Give with food, check for side effects after the dose'),
+    ('Rex; Jr, the 2nd \\ co', 'NexGard SPECTRA (chewable)', 24, '21:00', date(2026, 12, 31), 'a\r\nb\rc\nd \\N e'),
+    ('Mochi 🐶 モチ', PRODUCT, 1, '', date(2028, 2, 29), 'ü' * 40 + ' 🐾' * 30),
+    ('Maximilian Von Fluffington III', PRODUCT, 0, '23:59', date(2026, 1, 31),
+     'backslash at the fold ' + '\\' * 60 + ', semicolons;' * 8),
+]
+
+
+def round_trip_values(ics_text):
+    """The properties a calendar client would read from ``ics_text``"""
+    calendar = Calendar.from_ical(ics_text)
+    event = next(iter(calendar.walk('VEVENT')))
+    alarm = next(iter(event.walk('VALARM')))
+    return {
+        'calendar': {name: str(calendar[name]) for name in ('VERSION', 'PRODID', 'CALSCALE', 'METHOD')},
+        'summary': str(event['SUMMARY']),
+        'description': str(event['DESCRIPTION']),
+        'dtstart': event.decoded('DTSTART'),
+        'dtend': event.decoded('DTEND'),
+        'dtstamp': event.decoded('DTSTAMP'),
+        'uid': str(event['UID']),
+        'rrule': dict(event['RRULE']),
+        'alarm': (str(alarm['ACTION']), str(alarm['DESCRIPTION']), alarm.decoded('TRIGGER')),
+    }
+
+
+def check_equivalence():
+    for case in CASES:
+        for dtstamp in (DTSTAMP, DTSTAMP.replace(tzinfo=timezone.utc)):
+            fast = create_calendar_reminder(*case, uid=UID, dtstamp=dtstamp)
+            reference = create_calendar_reminder_reference(*case, uid=UID, dtstamp=dtstamp)
+            if fast != reference:
+                raise SystemExit(f"fast writer output differs for {case!r}:\n{fast!r}\n{reference!r}")
+            if any(len(line.encode('utf-8')) > 75 for line in fast.split('\r\n')):
+                raise SystemExit(f"unfolded line for {case!r}")
+            if round_trip_values(fast) != round_trip_values(reference):
+                raise SystemExit(f"round trip differs for {case!r}")
+    print(f"byte-identical output and round trip for {len(CASES)} cases")
+
+
+def measure(func, repeat):
+    samples = []
+    for i in range(repeat):
+        case = CASES[i % len(CASES)]
+        started = time.perf_counter()
+        func(*case)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def measure_bulk(func, count):
+    started = time.perf_counter()
+    for i in range(count):
+        func(*CASES[i % len(CASES)])
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--bulk', type=int, default=10000)
+    args = parser.parse_args()
+
+    check_equivalence()
+    reference_ms = measure(create_calendar_reminder_reference, args.repeat)
+    fast_ms = measure(create_calendar_reminder, args.repeat)
+    print(f"icalendar: {reference_ms:.4f} ms per file")
+    print(f"     fast: {fast_ms:.4f} ms per file ({reference_ms / fast_ms:.0f}x faster)")
+
+    reference_s = measure_bulk(create_calendar_reminder_reference, args.bulk)
+    fast_s = measure_bulk(create_calendar_reminder, args.bulk)
+    print(f"{args.bulk} files: icalendar {reference_s:.2f} s, fast {fast_s:.3f} s")
+
+
+if __name__ == '__main__':
+    main()
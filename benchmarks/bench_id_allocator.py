@@ -0,0 +1,76 @@
+"""Concurrency benchmark for reminder ID allocation.
+
+Runs N concurrent allocations spread over several simulated replicas that
+share one in-process S3 stand-in, and compares the lease-based allocator with
+the previous read-modify-write counter.
+
+    python -m benchmarks.bench_id_allocator --allocations 1000 --replicas 4
+"""
+import argparse
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_s3 import FakeS3Client
+from reminder_core.id_allocator import COUNTER_KEY, LeasedIdAllocator
+from reminder_core.stores import S3Store
+
+BUCKET = 'pet-reminder'
+
+
+class ReadModifyWriteCounter:
+    """The previous get_next_sequence_number() S3 logic, kept for comparison"""
+
+    def __init__(self, s3_client, bucket):
+        self.s3_client = s3_client
+        self.bucket = bucket
+
+    def allocate(self):
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=COUNTER_KEY)
+            current_count = int(response['Body'].read().decode('utf-8'))
+        except Exception:
+            current_count = 0
+        next_count = current_count + 1
+        self.s3_client.put_object(Bucket=self.bucket, Key=COUNTER_KEY, Body=str(next_count).encode('utf-8'))
+        return next_count
+
+
+def run(make_allocator, allocations, replicas, threads, latency, jitter):
+    s3 = FakeS3Client(latency=latency, jitter=jitter, seed=1)
+    allocators = [make_allocator(s3) for _ in range(replicas)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        ids = list(pool.map(lambda i: allocators[i % replicas].allocate(), range(allocations)))
+    elapsed = time.perf_counter() - started
+    duplicates = sum(count - 1 for count in Counter(ids).values() if count > 1)
+    return {
+        'allocations': allocations,
+        'unique': len(set(ids)),
+        'duplicates': duplicates,
+        'seconds': round(elapsed, 3),
+        's3_calls': dict(s3.calls),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--allocations', type=int, default=1000)
+    parser.add_argument('--replicas', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--block-size', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.002, help="injected seconds per S3 call")
+    parser.add_argument('--jitter', type=float, default=0.003)
+    args = parser.parse_args()
+
+    common = (args.allocations, args.replicas, args.threads, args.latency, args.jitter)
+    leased = run(lambda s3: LeasedIdAllocator(S3Store(BUCKET, client=s3), block_size=args.block_size), *common)
+    legacy = run(lambda s3: ReadModifyWriteCounter(s3, BUCKET), *common)
+    for name, result in (('leased', leased), ('read-modify-write', legacy)):
+        print(f"{name:>18}: {result}")
+    if leased['duplicates']:
+        raise SystemExit("leased allocator produced duplicate IDs")
+
+
+if __name__ == '__main__':
+    main()
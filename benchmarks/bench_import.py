@@ -0,0 +1,144 @@
+"""Cold start of the package and the Streamlit entry point, each sample in a fresh interpreter.
+
+Reports, against the budgets in COLD_START_BUDGET_MS:
+- Cold import time of each module. pet_reminder is imported with streamlit
+  already loaded, as it is under ``streamlit run``.
+- The heaviest imports under the entry point, from ``python -X importtime``.
+- Time until the form has rendered, how long the background warm-up takes
+  step by step, and the latency of the first submit after it.
+
+    python -m benchmarks.bench_import --repeat 10
+
+Subprocesses use the memory store unless STORAGE_BACKEND is set, so no
+network is needed.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = ('reminder_core', 'reminder_core.pipeline', 'pet_reminder')
+HEAVY_MODULES = ('streamlit', 'boto3', 'PIL', 'qrcode', 'icalendar')
+# Imported before timing, because the server has already loaded them when it runs the script
+PRELOADED = {'pet_reminder': 'streamlit'}
+COLD_START_BUDGET_MS = {
+    'reminder_core': 5,
+    'reminder_core.pipeline': 250,
+    'pet_reminder': 50,
+    'form': 1500,
+    'first_submit': 1000,
+}
+
+PROBE = """
+import sys, time
+{preload}
+started = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - started) * 1000
+print(elapsed, ','.join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+# Renders the form the way a new worker does, then waits for the warm-up and submits once
+APP_PROBE = """
+import threading, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file('pet_reminder.py', default_timeout=120)
+started = time.perf_counter()
+app.run()
+form = (time.perf_counter() - started) * 1000
+for thread in threading.enumerate():
+    if thread.name == 'startup-warmup':
+        thread.join()
+warmed = (time.perf_counter() - started) * 1000
+from reminder_core.warmup import WARMUP_SECONDS
+steps = {dict(labels)['step']: value * 1000 for name, labels, value in WARMUP_SECONDS.samples() if name.endswith('_sum')}
+app.text_input(key='pet_name_input').input('Daisy').run()
+started = time.perf_counter()
+app.button(key='submit_btn').click().run()
+submit = (time.perf_counter() - started) * 1000
+assert not app.exception, app.exception
+print(repr((form, warmed, submit, steps)))
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(args):
+    env = {**os.environ, 'STORAGE_BACKEND': os.environ.get('STORAGE_BACKEND', 'memory')}
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+def cold_import(module):
+    """(milliseconds, heavy modules loaded) for importing ``module`` in a new process"""
+    preload = f"import {PRELOADED[module]}" if module in PRELOADED else ''
+    result = _run(['-c', PROBE.format(preload=preload, module=module, heavy=HEAVY_MODULES)])
+    elapsed, loaded = result.stdout.strip().splitlines()[-1].partition(' ')[::2]
+    return float(elapsed), loaded
+
+
+def import_profile(module, top):
+    """The ``top`` direct imports of ``module`` with the largest cumulative ``-X importtime``"""
+    preload = f"import {PRELOADED[module]}; " if module in PRELOADED else ''
+    result = _run(['-X', 'importtime', '-c', f"{preload}import {module}"])
+    entries, parent_depth = [], None
+    # Children are listed before their parent, indented two more spaces
+    for line in reversed(result.stderr.splitlines()):
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        if parent_depth is None:
+            if name.strip() == module:
+                parent_depth = depth
+        elif depth <= parent_depth:
+            break
+        elif depth == parent_depth + 1:
+            entries.append((int(cumulative) / 1000, name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def budget(name, elapsed):
+    limit = COLD_START_BUDGET_MS.get(name)
+    if limit is None:
+        return ''
+    return f"budget {limit} ms: {'ok' if elapsed <= limit else 'OVER'}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--top', type=int, default=8, help="imports to list in the entry point profile")
+    parser.add_argument('--no-app', action='store_true', help="skip rendering the app")
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        samples = []
+        for _ in range(args.repeat):
+            elapsed, loaded = cold_import(module)
+            samples.append(elapsed)
+        median = statistics.median(samples)
+        print(f"{module:>24}: {median:8.1f} ms  loads: {loaded or '-':<32} {budget(module, median)}")
+
+    entry = 'pet_reminder'
+    print(f"\n-X importtime, heaviest imports of {entry} (streamlit preloaded):")
+    for cumulative, name in import_profile(entry, args.top):
+        print(f"{cumulative:10.1f} ms  {name}")
+
+    if args.no_app:
+        return
+    runs = [eval(_run(['-c', APP_PROBE]).stdout.strip().splitlines()[-1]) for _ in range(max(1, args.repeat // 3))]
+    form = statistics.median(run[0] for run in runs)
+    warmed = statistics.median(run[1] for run in runs)
+    submit = statistics.median(run[2] for run in runs)
+    print(f"\ncold start, median of {len(runs)} fresh processes:")
+    print(f"{'form rendered':>24}: {form:8.1f} ms  {budget('form', form)}")
+    print(f"{'warm-up finished':>24}: {warmed:8.1f} ms")
+    for step in runs[0][3]:
+        print(f"{step:>24}  {statistics.median(run[3][step] for run in runs):8.1f} ms")
+    print(f"{'first submit':>24}: {submit:8.1f} ms  {budget('first_submit', submit)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""Flat vs. hash-prefixed reminder keys, index lookups and the key migration, against the in-process S3.
+
+Reports:
+- How the keys of sequentially numbered reminders spread over prefixes. S3
+  scales request rates per prefix, so one hot prefix caps PUT throughput.
+- Finding a pet's reminders by listing ``pages/`` vs. one GET of the
+  reminder index, in S3 calls and in time at the given per-call latency.
+- Indexing many reminders for one popular pet one at a time, the way
+  reminders are generated, into a single unbounded manifest vs. size-capped
+  segments: bytes written per append, the largest object, and whether every
+  reminder can still be found.
+- A migration of flat-keyed reminders with migrate_keys. It checks that
+  every migrated object has the content of the original, that each page
+  links its shared assets at the new depth, that index lookups resolve to
+  objects that exist, that the flat objects are left alone, and that a
+  second run writes nothing.
+
+    python -m benchmarks.bench_key_layout --reminders 5000 --latency 0.01 --hot-pet 3000
+"""
+import argparse
+import gzip
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_pipeline import BUCKET, REQUESTS
+from benchmarks.fake_s3 import FakeS3Client
+from migrate_keys import parse_key, run_migration
+from reminder_core.config import Settings
+from reminder_core.encoding import profile_extension
+from reminder_core.page import get_page_assets
+from reminder_core.pipeline import format_meaningful_id, render_artifacts
+from reminder_core.reminder_index import INDEX_SEGMENT_BYTES, IndexEntry, ReminderIndex, pet_key
+from reminder_core.storage import FLAT_KEY_LAYOUT, SHARDED_KEY_LAYOUT, ArtifactPublisher, reminder_keys
+from reminder_core.stores import S3Store
+
+PET_NAMES = ['Daisy', 'Charlie', 'Bella', 'Max', 'Luna', 'Rocky', 'Coco', 'Milo', 'Bailey', 'Nala', 'Oscar', 'Ziggy']
+PRODUCT = 'NexGard SPECTRA'
+
+
+def prefix_spread(count, layout):
+    """(prefixes used, largest share of keys under one prefix) for ``count`` sequential calendar keys"""
+    prefixes = Counter()
+    for sequence_number in range(1, count + 1):
+        meaningful_id = format_meaningful_id(sequence_number, PET_NAMES[sequence_number % len(PET_NAMES)], PRODUCT)
+        prefixes[reminder_keys(meaningful_id, layout=layout)['calendar'].rpartition('/')[0]] += 1
+    return len(prefixes), max(prefixes.values()) / count
+
+
+def scan_for_pet(store, pet_name):
+    """IDs of a pet's reminders the way it is done without an index: list every page"""
+    key, ids = pet_key(pet_name), []
+    for object_key in store.list_keys('pages/'):
+        parsed = parse_key('page', object_key)
+        if parsed and pet_key(parsed[0].split('_')[1]) == key:
+            ids.append(parsed[0])
+    return ids
+
+
+def compare_lookups(count, lookups, latency, seed):
+    client = FakeS3Client(seed=seed)
+    store = S3Store(BUCKET, client=client)
+    index = ReminderIndex(store)
+    entries = []
+    for sequence_number in range(1, count + 1):
+        pet_name = PET_NAMES[sequence_number % len(PET_NAMES)]
+        meaningful_id = format_meaningful_id(sequence_number, pet_name, PRODUCT)
+        store.put(reminder_keys(meaningful_id)['page'], b'<html>', 'text/html')
+        entries.append(IndexEntry(meaningful_id, SHARDED_KEY_LAYOUT, 'png', [pet_name]))
+    index.add(entries)
+
+    client.latency = latency
+    rng = random.Random(seed)
+    print(f"\nfind a pet's reminders among {count} ({latency * 1000:.0f} ms per S3 call), mean of {lookups}:")
+    print(f"{'':>16} {'ms':>9} {'S3 calls':>9}")
+    results = {}
+    for label, find in (('ListObjectsV2', lambda pet: scan_for_pet(store, pet)),
+                        ('index', index.ids_for_pet)):
+        pets = random.Random(seed).choices(PET_NAMES, k=lookups)
+        client.calls.clear()
+        started = time.perf_counter()
+        results[label] = [sorted(find(pet)) for pet in pets]
+        elapsed = (time.perf_counter() - started) * 1000 / lookups
+        print(f"{label:>16} {elapsed:>9.1f} {sum(client.calls.values()) / lookups:>9.1f}")
+    if results['ListObjectsV2'] != results['index']:
+        raise SystemExit("the index and the listing disagree on a pet's reminders")
+
+    meaningful_id = rng.choice(entries).meaningful_id
+    client.calls.clear()
+    keys = index.lookup(meaningful_id)
+    calls = sum(client.calls.values())
+    if keys is None or store.head(keys['page']) is None:
+        raise SystemExit(f"index lookup of {meaningful_id} does not resolve to its page")
+    print(f"{'ID lookup':>16} {'':>9} {calls:>9}")
+
+
+def hot_pet(count, segment_bytes):
+    """Index ``count`` reminders for one pet, one add() each; returns (bytes PUT per add, largest object)"""
+    client = FakeS3Client()
+    store = S3Store(BUCKET, client=client)
+    index = ReminderIndex(store, segment_bytes=segment_bytes)
+    ids = [format_meaningful_id(sequence_number, 'Max', PRODUCT) for sequence_number in range(1, count + 1)]
+    for meaningful_id in ids:
+        index.add([IndexEntry(meaningful_id, SHARDED_KEY_LAYOUT, 'png', ['Max'])])
+    if index.ids_for_pet('max') != ids:
+        raise SystemExit("the index lost or reordered reminders for Max")
+    if index.lookup(ids[-1]) is None:
+        raise SystemExit(f"{ids[-1]} is not indexed")
+    largest = max(len(stored['Body']) for stored in client.objects(BUCKET).values())
+    return client.bytes_written / count, largest
+
+
+def compare_hot_pet(count):
+    print(f"\n{count} reminders for one pet, indexed one at a time:")
+    print(f"{'':>16} {'bytes/add':>13} {'largest object':>15}")
+    for label, segment_bytes in (('one manifest', float('inf')), ('segmented', INDEX_SEGMENT_BYTES)):
+        per_add, largest = hot_pet(count, segment_bytes)
+        print(f"{label:>16} {per_add:>13,.0f} {largest:>15,}")
+    if largest > INDEX_SEGMENT_BYTES + 1024:
+        raise SystemExit(f"a segment grew to {largest} bytes, over the {INDEX_SEGMENT_BYTES} byte cap")
+
+
+def decoded(body):
+    return gzip.decompress(body) if body[:2] == b'\x1f\x8b' else body
+
+
+def publish_flat(publisher, count):
+    """Publish ``count`` reminders under flat keys, as before the sharded layout; returns their contents"""
+    publisher.publish_static(get_page_assets().values())
+    extension = profile_extension(publisher.settings.card_image_profile)
+    contents = {}
+    for sequence_number in range(1, count + 1):
+        request = REQUESTS[sequence_number % len(REQUESTS)]
+        meaningful_id = format_meaningful_id(sequence_number, request.pet_name, request.product_name)
+        uploads = render_artifacts(meaningful_id, request, publisher, publisher.settings.card_image_profile).uploads
+        flat_keys = reminder_keys(meaningful_id, extension, FLAT_KEY_LAYOUT)
+        for kind, spec in uploads.items():
+            body = decoded(spec['body'])
+            contents[meaningful_id, kind] = body
+            if kind == 'page':
+                # Flat pages linked the shared assets one level up
+                body = body.replace(b'="../../static/', b'="../static/')
+            publisher.store.put(flat_keys[kind], body, spec['content_type'])
+    return contents
+
+
+def check_migration(count, latency, workers):
+    client = FakeS3Client()
+    settings = Settings.from_mapping({'S3_BUCKET_NAME': BUCKET})
+    publisher = ArtifactPublisher(settings, store=S3Store(BUCKET, client=client),
+                                  executor=ThreadPoolExecutor(max_workers=8))
+    store = publisher.store
+    contents = publish_flat(publisher, count)
+    flat_before = dict(client.objects(BUCKET))
+    index = ReminderIndex(store)
+
+    client.latency = latency
+    client.calls.clear()
+    started = time.perf_counter()
+    stats = run_migration(publisher, index, workers=workers)
+    elapsed = time.perf_counter() - started
+    if stats['errors']:
+        raise SystemExit(f"migration failed: {stats['errors']}")
+    calls = dict(client.calls)
+    client.latency = 0
+
+    for (meaningful_id, kind), body in contents.items():
+        keys = index.lookup(meaningful_id)
+        if keys is None:
+            raise SystemExit(f"{meaningful_id} is not indexed")
+        migrated = decoded(store.get(keys[kind]).body)
+        if migrated != body:
+            raise SystemExit(f"{keys[kind]} differs from the original {kind}")
+        if kind == 'page' and b'="../static/' in migrated:
+            raise SystemExit(f"{keys[kind]} still links assets one level up")
+    for pet_name in {meaningful_id.split('_')[1] for meaningful_id, _ in contents}:
+        if not index.ids_for_pet(pet_name):
+            raise SystemExit(f"no reminders indexed for {pet_name}")
+    after = client.objects(BUCKET)
+    changed = [key for key, stored in flat_before.items() if after.get(key, {}).get('ETag') != stored['ETag']]
+    if changed:
+        raise SystemExit(f"migration modified {len(changed)} existing objects, e.g. {changed[0]}")
+
+    puts = client.calls['PutObject']
+    rerun = run_migration(publisher, index, workers=workers)
+    if rerun['copied'] or client.calls['PutObject'] != puts:
+        raise SystemExit(f"second run wrote again: {rerun}, {client.calls['PutObject'] - puts} PUTs")
+
+    print(f"\nmigrated {stats['reminders']} flat reminders ({stats['copied']} objects) in {elapsed:.2f} s "
+          f"at {latency * 1000:.0f} ms per S3 call: "
+          + ', '.join(f"{calls.get(op, 0)} {op}" for op in ('ListObjectsV2', 'GetObject', 'PutObject')))
+    print("contents, page asset links, index lookups and flat objects check out; a second run wrote nothing")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reminders', type=int, default=5000)
+    parser.add_argument('--lookups', type=int, default=20)
+    parser.add_argument('--migrate', type=int, default=30, help="flat reminders to render and migrate")
+    parser.add_argument('--hot-pet', type=int, default=3000, help="reminders indexed for one popular pet")
+    parser.add_argument('--latency', type=float, default=0.01, help="seconds per simulated S3 call")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{args.reminders} sequential reminders: {'prefixes':>9} {'busiest prefix':>15}")
+    for layout in (FLAT_KEY_LAYOUT, SHARDED_KEY_LAYOUT):
+        prefixes, busiest = prefix_spread(args.reminders, layout)
+        print(f"{layout:>22}: {prefixes:>9} {busiest:>14.1%}")
+    compare_lookups(args.reminders, args.lookups, args.latency, args.seed)
+    compare_hot_pet(args.hot_pet)
+    check_migration(args.migrate, args.latency, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Submit latency with inline uploads vs. the write-behind outbox.
+
+Runs the same submits against an in-process S3 with a slow, jittery tail,
+once uploading inline and once through an UploadOutbox, and reports submit
+latency percentiles for both. It then checks that every URL handed out by
+the outbox run exists in the bucket once the spool is flushed, and that rows
+spooled while S3 is down survive a restart and are uploaded by a new outbox.
+
+    python -m benchmarks.bench_outbox --submits 60 --latency 0.01 --jitter 0.25
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_pipeline import BUCKET, REQUESTS
+from benchmarks.fake_s3 import FakeS3Client, _client_error
+from reminder_core.config import Settings
+from reminder_core.id_allocator import LeasedIdAllocator
+from reminder_core.outbox import UploadOutbox
+from reminder_core.pipeline import ReminderGenerator
+from reminder_core.storage import ArtifactPublisher
+from reminder_core.stores import S3Store
+
+# Large enough that no submit here refills its ID block (see bench_id_allocator), so only uploads touch S3
+ID_BLOCK_SIZE = 10000
+
+
+class UnavailableS3(FakeS3Client):
+    """An S3 that rejects every PUT, as during an outage"""
+
+    def put_object(self, Bucket, Key, **kwargs):
+        self._delay('PutObject')
+        raise _client_error('ServiceUnavailable', 503, 'PutObject')
+
+
+def make_publisher(client, workers=8):
+    settings = Settings.from_mapping({'S3_BUCKET_NAME': BUCKET, 'S3_UPLOAD_WORKERS': str(workers)})
+    return ArtifactPublisher(settings, store=S3Store(BUCKET, client=client),
+                             executor=ThreadPoolExecutor(max_workers=workers))
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def time_submits(generator, submits):
+    samples, results = [], []
+    for i in range(submits):
+        started = time.perf_counter()
+        results.append(generator.generate(REQUESTS[i % len(REQUESTS)]))
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, results
+
+
+def report(label, samples):
+    print(f"{label:>8} {statistics.median(samples):>9.1f} {percentile(samples, 0.95):>9.1f} "
+          f"{percentile(samples, 0.99):>9.1f} {max(samples):>9.1f}")
+
+
+def check_published(client, results):
+    stored = client.objects(BUCKET)
+    prefix = f"https://{BUCKET}.s3.us-east-1.amazonaws.com/"
+    missing = [url for artifacts in results for url in (artifacts.calendar_url, artifacts.web_page_url,
+                                                        artifacts.reminder_image_url)
+               if url[len(prefix):] not in stored]
+    if missing:
+        raise SystemExit(f"{len(missing)} URLs missing after flush, e.g. {missing[0]}")
+
+
+def check_restart(directory, rows):
+    path = os.path.join(directory, 'restart.sqlite3')
+    down = UnavailableS3()
+    outbox = UploadOutbox(path, make_publisher(down)).start()
+    spec = {'key': 'calendars/restart.ics', 'body': b'BEGIN:VCALENDAR', 'content_type': 'text/calendar'}
+    for i in range(rows):
+        outbox.enqueue({'calendar': {**spec, 'key': f'calendars/restart-{i}.ics'}})
+    time.sleep(0.2)
+    pending = outbox.stats()
+    outbox.stop()
+
+    up = FakeS3Client()
+    restarted = UploadOutbox(path, make_publisher(up)).start()
+    # Failed rows are backed off; a restarted process retries them when due, so make them due now
+    with restarted._db:
+        restarted._db.execute('UPDATE uploads SET next_attempt = 0')
+    if not restarted.flush(timeout=30):
+        raise SystemExit(f"restarted outbox did not drain: {restarted.stats()}")
+    restarted.stop()
+    if len(up.objects(BUCKET)) != rows:
+        raise SystemExit(f"expected {rows} objects after restart, found {len(up.objects(BUCKET))}")
+    print(f"restart: {pending['pending']} spooled while S3 was down ({pending['retrying']} already retried), "
+          f"all {rows} uploaded by the next process")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--submits', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.01, help="seconds per S3 call")
+    parser.add_argument('--jitter', type=float, default=0.25, help="extra random seconds per S3 call")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    inline_s3 = FakeS3Client(args.latency, args.jitter, args.seed)
+    publisher = make_publisher(inline_s3)
+    inline = ReminderGenerator(publisher.settings, publisher,
+                               LeasedIdAllocator(publisher.store, block_size=ID_BLOCK_SIZE))
+    inline.next_sequence_number()
+    report('inline', time_submits(inline, args.submits)[0])
+
+    with tempfile.TemporaryDirectory() as directory:
+        spooled_s3 = FakeS3Client(args.latency, args.jitter, args.seed)
+        publisher = make_publisher(spooled_s3)
+        outbox = UploadOutbox(os.path.join(directory, 'outbox.sqlite3'), publisher).start()
+        spooled = ReminderGenerator(publisher.settings, publisher,
+                                    LeasedIdAllocator(publisher.store, block_size=ID_BLOCK_SIZE), outbox=outbox)
+        spooled.next_sequence_number()
+        samples, results = time_submits(spooled, args.submits)
+        report('outbox', samples)
+        started = time.perf_counter()
+        outbox.flush()
+        print(f"\noutbox drained {args.submits} submits {time.perf_counter() - started:.1f} s after the last one")
+        outbox.stop()
+        check_published(spooled_s3, results)
+        check_restart(directory, rows=20)
+
+
+if __name__ == '__main__':
+    main()
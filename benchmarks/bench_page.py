@@ -0,0 +1,95 @@
+"""Validation page size: inline SVG QR code vs. the base64 PNG it replaced.
+
+Checks that the SVG path draws exactly the dark modules of the matrix, then
+reports raw and gzip sizes of each page, and the time to render it, for URLs
+of a few lengths (longer URLs mean larger QR versions).
+
+    python -m benchmarks.bench_page --repeat 200
+"""
+import argparse
+import base64
+import gzip
+import re
+import statistics
+import time
+
+from benchmarks.bench_card import CASES, PRODUCT, QR_URL
+from reminder_core.page import create_web_page_html
+from reminder_core.qr import QR_BORDER, get_qr_matrix
+
+URLS = [
+    QR_URL,
+    QR_URL.replace('QR0001', 'QR123456') + '?v=2',
+    'https://reminders.example.com/' + 'households/' * 8 + 'QR000123_Smith_Household.ics',
+]
+SVG_ELEMENT = re.compile(r'<svg viewBox=.*?</svg>', re.DOTALL)
+PNG_ELEMENT = """<img src="data:image/png;base64,{}"
+                    alt="QR Code for Pet Reminder"
+                    class="qr-image"
+                    style="width: 200px; height: 200px; display: block; margin: 0 auto; border: 2px solid #00e47c; padding: 10px; background-color: white;" />"""
+
+
+def drawn_modules(path, border):
+    """Dark ``(x, y)`` modules painted by a path made of M/m moves and h strokes"""
+    modules = set()
+    x = y = 0.0
+    for command, args in re.findall(r'([Mmh])([-\d. ]+)', path):
+        numbers = [float(n) for n in args.split()]
+        if command == 'M':
+            x, y = numbers
+        elif command == 'm':
+            x, y = x + numbers[0], y + numbers[1]
+        else:
+            modules.update((int(x) + i - border, int(y) - border) for i in range(int(numbers[0])))
+            x += numbers[0]
+    return modules
+
+
+def check_path(qr):
+    expected = {(x + i, y) for x, y, length in qr.dark_runs() for i in range(length)}
+    if drawn_modules(qr.svg_path(QR_BORDER), QR_BORDER) != expected:
+        raise SystemExit(f"SVG path does not match the QR matrix ({qr.size}x{qr.size})")
+
+
+def png_page(pet_name, details, url, qr):
+    """The page as it was built before, with the QR code as a base64 PNG"""
+    png = base64.b64encode(qr.to_png(box_size=12)).decode()
+    html = create_web_page_html(pet_name, PRODUCT, url, details, qr)
+    return SVG_ELEMENT.sub(lambda _: PNG_ELEMENT.format(png), html, count=1)
+
+
+def measure(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    pet_name, details = CASES[1]
+    print(f"{'side':>4} {'qr bytes':>16} {'page bytes':>18} {'gzip bytes':>16} {'render ms':>16}")
+    print(f"{'':>4} {'png':>7} {'svg':>8} {'png':>8} {'svg':>9} {'png':>7} {'svg':>8} {'png':>7} {'svg':>8}")
+    for url in URLS:
+        qr = get_qr_matrix(url)
+        check_path(qr)
+        svg_html = create_web_page_html(pet_name, PRODUCT, url, details, qr)
+        png_html = png_page(pet_name, details, url, qr)
+        png_qr = len(base64.b64encode(qr.to_png(box_size=12)))
+        svg_qr = len(SVG_ELEMENT.search(svg_html).group(0))
+        sizes = [len(html.encode('utf-8')) for html in (png_html, svg_html)]
+        gzipped = [len(gzip.compress(html.encode('utf-8'), mtime=0)) for html in (png_html, svg_html)]
+        png_ms = measure(lambda: png_page(pet_name, details, url, qr), args.repeat)
+        svg_ms = measure(lambda: create_web_page_html(pet_name, PRODUCT, url, details, qr), args.repeat)
+        print(f"{qr.size:>4} {png_qr:>7} {svg_qr:>8} {sizes[0]:>8} {sizes[1]:>9} "
+              f"{gzipped[0]:>7} {gzipped[1]:>8} {png_ms:>7.3f} {svg_ms:>8.3f}")
+    print("\npng render includes encoding the PNG; the svg page is built from the cached matrix alone")
+
+
+if __name__ == '__main__':
+    main()
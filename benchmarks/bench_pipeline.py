@@ -0,0 +1,261 @@
+"""Stage-level benchmark of one submit, end to end, against the in-process S3.
+
+Times each stage of a submit on its own (ID, calendar, QR, page, card,
+encoding and every upload) as well as the whole pipeline, reports
+p50/p95/p99, the memory each stage allocates and the bytes each artifact
+weighs, and writes everything as JSON so runs can be compared:
+
+    python -m benchmarks.bench_pipeline --iterations 200 --latency 0.02 --output runs/pipeline.json
+
+``--store memory`` swaps the S3 stand-in for a MemoryStore, which measures
+the pipeline at memory speed with no client in the way.
+
+Allocations are measured in a separate tracemalloc pass so tracing does not
+skew the timings.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+
+from benchmarks.fake_s3 import FakeS3Client
+from reminder_core.card import create_reminder_image
+from reminder_core.config import Settings
+from reminder_core.encoding import encode_image
+from reminder_core.ics import create_calendar_reminder
+from reminder_core.id_allocator import LeasedIdAllocator
+from reminder_core.page import create_web_page_html
+from reminder_core.pipeline import (
+    DEFAULT_PRODUCT,
+    ReminderGenerator,
+    ReminderRequest,
+    build_reminder_details,
+    format_duration_text,
+    format_meaningful_id,
+)
+from reminder_core.qr import get_qr_matrix
+from reminder_core.storage import (
+    ArtifactPublisher,
+    calendar_key,
+    calendar_upload,
+    reminder_image_upload,
+    web_page_upload,
+)
+from reminder_core.stores import MemoryStore, S3Store
+
+BUCKET = 'pet-reminder'
+REQUESTS = [
+    ReminderRequest('Daisy', DEFAULT_PRODUCT, date(2026, 10, 17), 12),
+    ReminderRequest('Charlie', DEFAULT_PRODUCT, date(2026, 11, 1), 13, '08:30',
+                    'Give with food, check for side effects after the dose'),
+    ReminderRequest('Maximilian Von Fluffington III', DEFAULT_PRODUCT, date(2026, 11, 1), 24, '21:00', 'short'),
+]
+
+
+class StageRecorder:
+    """Runs stage callables and records either wall time or traced allocations per stage"""
+
+    def __init__(self, trace_allocations=False):
+        self.trace_allocations = trace_allocations
+        self.samples = defaultdict(list)
+
+    def measure(self, stage, func, *args, **kwargs):
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            result = func(*args, **kwargs)
+            current, peak = tracemalloc.get_traced_memory()
+            self.samples[stage].append({'peak': peak - before, 'retained': current - before})
+        else:
+            started = time.perf_counter()
+            result = func(*args, **kwargs)
+            self.samples[stage].append((time.perf_counter() - started) * 1000)
+        return result
+
+
+def make_generator(latency, jitter, seed, image_profile, upload_workers, store_kind='fake-s3'):
+    """A generator wired to a fresh in-process S3 with the given injected latency, or to a MemoryStore"""
+    if store_kind == 'memory':
+        store = MemoryStore()
+    else:
+        store = S3Store(BUCKET, client=FakeS3Client(latency=latency, jitter=jitter, seed=seed))
+    settings = Settings.from_mapping({
+        'AWS_REGION': 'us-east-1',
+        'S3_BUCKET_NAME': BUCKET,
+        'CARD_IMAGE_PROFILE': image_profile,
+        'S3_UPLOAD_WORKERS': str(upload_workers),
+    })
+    publisher = ArtifactPublisher(settings, store=store, executor=ThreadPoolExecutor(max_workers=upload_workers))
+    return ReminderGenerator(settings, publisher, LeasedIdAllocator(store, block_size=settings.id_lease_block_size))
+
+
+def run_stages(generator, request, recorder, artifact_bytes):
+    """One submit split into its stages, in the same order render_artifacts() runs them"""
+    publisher = generator.publisher
+    sequence_number = recorder.measure('allocate_id', generator.next_sequence_number)
+    meaningful_id = format_meaningful_id(sequence_number, request.pet_name, request.product_name)
+
+    recorder.measure('format_duration_text', format_duration_text, request.start_date, request.dosage)
+    calendar_data = recorder.measure(
+        'create_calendar_reminder', create_calendar_reminder, request.pet_name, request.product_name,
+        request.dosage, request.selected_time, request.start_date, request.notes
+    )
+    reminder_details = build_reminder_details(request.start_date, request.dosage, request.selected_time, request.notes)
+    calendar_url = publisher.object_url(calendar_key(meaningful_id))
+
+    # Every ID is new, so the QR matrix cache never hits here, as in production
+    qr_matrix = recorder.measure('qr_encode', get_qr_matrix, calendar_url)
+    qr_image_bytes = recorder.measure('qr_png', qr_matrix.to_png, box_size=12)
+    html_content = recorder.measure(
+        'create_web_page_html', create_web_page_html, request.pet_name, request.product_name,
+        calendar_url, reminder_details, qr_matrix
+    )
+    card = recorder.measure(
+        'create_reminder_image', create_reminder_image, request.pet_name, request.product_name, reminder_details, qr_matrix
+    )
+    encoded = recorder.measure('encode_card', encode_image, card, generator.settings.card_image_profile)
+
+    uploads = {
+        'calendar': calendar_upload(calendar_data, meaningful_id),
+        'page': web_page_upload(html_content, meaningful_id),
+        'image': reminder_image_upload(encoded.data, meaningful_id, encoded.content_type, encoded.extension)
+    }
+    for name, spec in uploads.items():
+        recorder.measure(f'upload_{name}', publisher.put_artifact, **spec)
+
+    artifact_bytes['qr_png'].append(len(qr_image_bytes))
+    for name, spec in uploads.items():
+        body = spec['body']
+        artifact_bytes[name].append(len(body.encode('utf-8') if isinstance(body, str) else body))
+
+
+def summarize(samples):
+    """count/mean/p50/p95/p99/max of a list of numbers"""
+    if len(samples) > 1:
+        cuts = statistics.quantiles(samples, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = samples[0]
+    return {
+        'count': len(samples),
+        'mean': round(statistics.fmean(samples), 4),
+        'p50': round(p50, 4),
+        'p95': round(p95, 4),
+        'p99': round(p99, 4),
+        'max': round(max(samples), 4),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(iterations, warmup, latency, jitter, seed, image_profile, upload_workers, allocations=True,
+        store_kind='fake-s3'):
+    """Run the stage, full-pipeline and allocation passes; returns the JSON-ready report"""
+    generator = make_generator(latency, jitter, seed, image_profile, upload_workers, store_kind)
+    artifact_bytes = defaultdict(list)
+
+    # Warm fonts, the card templates and the ID lease before measuring
+    for i in range(warmup):
+        run_stages(generator, REQUESTS[i % len(REQUESTS)], StageRecorder(), defaultdict(list))
+        generator.generate(REQUESTS[i % len(REQUESTS)])
+
+    timings = StageRecorder()
+    for i in range(iterations):
+        run_stages(generator, REQUESTS[i % len(REQUESTS)], timings, artifact_bytes)
+
+    for i in range(iterations):
+        timings.measure('full_pipeline', generator.generate, REQUESTS[i % len(REQUESTS)])
+
+    report = {
+        'benchmark': 'pipeline',
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'config': {
+            'iterations': iterations,
+            'warmup': warmup,
+            'latency_s': latency,
+            'jitter_s': jitter,
+            'seed': seed,
+            'image_profile': image_profile,
+            'upload_workers': upload_workers,
+            'store': store_kind,
+        },
+        'stages_ms': {stage: summarize(samples) for stage, samples in timings.samples.items()},
+        'artifact_bytes': {name: summarize(sizes) for name, sizes in artifact_bytes.items()},
+    }
+    if isinstance(generator.publisher.store, S3Store):
+        report['s3_calls'] = dict(generator.publisher.store.client.calls)
+
+    if allocations:
+        traced = StageRecorder(trace_allocations=True)
+        tracemalloc.start()
+        try:
+            for i in range(iterations):
+                run_stages(generator, REQUESTS[i % len(REQUESTS)], traced, defaultdict(list))
+            for i in range(iterations):
+                traced.measure('full_pipeline', generator.generate, REQUESTS[i % len(REQUESTS)])
+        finally:
+            tracemalloc.stop()
+        report['allocations_bytes'] = {
+            stage: {
+                'peak': summarize([sample['peak'] for sample in samples]),
+                'retained': summarize([sample['retained'] for sample in samples]),
+            }
+            for stage, samples in traced.samples.items()
+        }
+
+    generator.publisher.executor.shutdown()
+    return report
+
+
+def print_report(report):
+    print(f"{'stage':>26} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>10}")
+    allocations = report.get('allocations_bytes', {})
+    for stage, stats in report['stages_ms'].items():
+        peak = allocations.get(stage, {}).get('peak', {}).get('p50')
+        peak_text = f"{peak / 1024:10.1f}" if peak is not None else f"{'-':>10}"
+        print(f"{stage:>26} {stats['p50']:9.3f} {stats['p95']:9.3f} {stats['p99']:9.3f} {peak_text}")
+    print()
+    for name, stats in report['artifact_bytes'].items():
+        print(f"{name:>26} {stats['p50']:9.0f} bytes (max {stats['max']:.0f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.0, help="injected seconds per S3 call")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random seconds per S3 call")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--image-profile', default='png-palette')
+    parser.add_argument('--upload-workers', type=int, default=8)
+    parser.add_argument('--store', choices=('fake-s3', 'memory'), default='fake-s3')
+    parser.add_argument('--no-allocations', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--output', help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run(args.iterations, args.warmup, args.latency, args.jitter, args.seed,
+                 args.image_profile, args.upload_workers, allocations=not args.no_allocations, store_kind=args.store)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nreport written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
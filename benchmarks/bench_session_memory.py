@@ -0,0 +1,90 @@
+"""Per-session memory: artifact references vs. the full artifacts sessions used to keep.
+
+Generates reminders against a MemoryStore, then reports how many bytes a
+session held before (every artifact body plus the preview) and holds now
+(an artifact_reference()), and replays downloads with a recency skew
+through an ArtifactCache far smaller than the working set, to show the
+hit rate and that evicted artifacts are reloaded byte for byte.
+
+    python -m benchmarks.bench_session_memory --reminders 60 --cache-kb 256
+"""
+import argparse
+import io
+import random
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from benchmarks.bench_pipeline import REQUESTS
+from reminder_core.artifact_cache import (
+    CACHED_FIELDS,
+    ArtifactCache,
+    StoreArtifactLoader,
+    artifact_reference,
+    reference_size,
+)
+from reminder_core.config import Settings
+from reminder_core.encoding import encode_image
+from reminder_core.id_allocator import LeasedIdAllocator
+from reminder_core.pipeline import ReminderGenerator
+from reminder_core.storage import ArtifactPublisher
+from reminder_core.stores import MemoryStore
+
+# The session fields generate_content() used to store, plus the preview encoded on first display
+LEGACY_SESSION_FIELDS = (
+    'meaningful_id', 'reminder_image_bytes', 'qr_image_bytes', 'calendar_data', 'web_page_url',
+    'calendar_url', 'reminder_image_url', 'reminder_details', 'pet_name', 'product_name', 'html_content'
+)
+
+
+def legacy_session(artifacts, preview_profile):
+    content = {name: getattr(artifacts, name) for name in LEGACY_SESSION_FIELDS}
+    card = Image.open(io.BytesIO(artifacts.reminder_image_bytes))
+    content['reminder_preview_bytes'] = encode_image(card, preview_profile).data
+    return content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reminders', type=int, default=60)
+    parser.add_argument('--downloads', type=int, default=2000)
+    parser.add_argument('--cache-kb', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    settings = Settings.from_mapping({'STORAGE_BACKEND': 'memory'})
+    store = MemoryStore()
+    publisher = ArtifactPublisher(settings, store=store, executor=ThreadPoolExecutor(max_workers=4))
+    generator = ReminderGenerator(settings, publisher, LeasedIdAllocator(store))
+    cache = ArtifactCache(args.cache_kb * 1024, StoreArtifactLoader(publisher, settings.card_image_profile))
+
+    legacy_sizes, reference_sizes, originals = [], [], {}
+    for i in range(args.reminders):
+        artifacts = generator.generate(REQUESTS[i % len(REQUESTS)])
+        cache.put_artifacts(artifacts)
+        originals[artifacts.meaningful_id] = {name: getattr(artifacts, name) for name in CACHED_FIELDS}
+        legacy_sizes.append(reference_size(legacy_session(artifacts, settings.card_preview_profile)))
+        reference_sizes.append(reference_size(artifact_reference(artifacts, settings.card_preview_profile)))
+
+    working_set = sum(reference_size(bodies) for bodies in originals.values())
+    print(f"per session: {statistics.mean(legacy_sizes) / 1024:.1f} KiB before, "
+          f"{statistics.mean(reference_sizes) / 1024:.1f} KiB now")
+    print(f"artifacts of {args.reminders} reminders: {working_set / 1024:.0f} KiB, cache budget {args.cache_kb} KiB")
+
+    # Recent reminders are downloaded most; older ones now and then
+    rng = random.Random(args.seed)
+    ids = list(originals)
+    for _ in range(args.downloads):
+        meaningful_id = ids[-1 - min(len(ids) - 1, int(rng.expovariate(1 / 5)))]
+        name = rng.choice(('calendar_data', 'reminder_image_bytes', 'qr_image_bytes', 'html_content'))
+        if cache.get(meaningful_id, name) != originals[meaningful_id][name]:
+            raise SystemExit(f"{name} of {meaningful_id} differs after a reload")
+    stats = cache.stats()
+    print(f"downloads: {stats['reads']}, hit rate {stats['hit_rate']:.1%}, reloaded {stats['loaded']}, "
+          f"missed {stats['miss']}, evicted {stats['evicted']}; cache holds {stats['bytes'] / 1024:.0f} KiB")
+    publisher.executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Card text fitting: cached glyph advances vs. measuring strings with FreeType.
+
+The naive way to shrink a name or wrap notes measures the whole candidate
+string (or line) with ``font.getlength()`` at each size and after each word.
+This times that against TextLayout on the card's own boxes, counts FreeType
+calls for both, and checks that every line TextLayout produces really fits
+when FreeType measures it.
+
+    python -m benchmarks.bench_text_layout --rounds 20
+"""
+import argparse
+import random
+import time
+
+from reminder_core.assets import get_render_assets
+from reminder_core.card import (
+    CARD_LEFT_X,
+    CARD_NOTE_LINES,
+    CARD_NOTES_SIZES,
+    CARD_NOTES_X,
+    CARD_PET_SIZES,
+    CARD_TEXT_RIGHT,
+)
+from reminder_core.text_layout import ELLIPSIS, TextLayout
+
+PET_NAMES = ['Daisy', 'Charlie', 'Maximilian Von Fluffington III', 'Sir Barksalot of Woofington Manor', 'Mo']
+WORDS = ('give with food check for side effects after the dose keep away from water for 48 hours '
+         'call the clinic if vomiting occurs Supercalifragilisticexpialidociousness').split()
+
+
+class CountingFont:
+    """Wraps a font and counts getlength() calls"""
+
+    def __init__(self, font):
+        self.font = font
+        self.calls = 0
+
+    def getlength(self, text):
+        self.calls += 1
+        return self.font.getlength(text)
+
+
+def naive_fit_line(font_for_size, text, max_width, sizes):
+    for size in sizes:
+        if font_for_size(size).getlength(text) <= max_width:
+            return [text], size
+    font = font_for_size(sizes[-1])
+    while text and font.getlength(text + ELLIPSIS) > max_width:
+        text = text[:-1]
+    return [text.rstrip() + ELLIPSIS], sizes[-1]
+
+
+def naive_fit_lines(font_for_size, text, max_width, max_lines, sizes):
+    for size in sizes:
+        font = font_for_size(size)
+        lines, line = [], ''
+        for word in text.split():
+            candidate = f"{line} {word}" if line else word
+            if font.getlength(candidate) <= max_width or not line:
+                line = candidate
+            else:
+                lines.append(line)
+                line = word
+        lines.append(line)
+        if len(lines) <= max_lines:
+            return lines, size
+    return lines[:max_lines], sizes[-1]
+
+
+def notes(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 60)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    fonts = {}
+
+    def counting_font(size):
+        if size not in fonts:
+            fonts[size] = CountingFont(get_render_assets().font(size))
+        return fonts[size]
+
+    rng = random.Random(args.seed)
+    cases = [(rng.choice(PET_NAMES).upper(), notes(rng)) for _ in range(50)]
+    name_width, notes_width = CARD_TEXT_RIGHT - CARD_LEFT_X, CARD_TEXT_RIGHT - CARD_NOTES_X
+
+    def run(fit_line, fit_lines):
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            for pet_name, note in cases:
+                fit_line(pet_name, name_width, CARD_PET_SIZES)
+                fit_lines(note, notes_width, CARD_NOTE_LINES, CARD_NOTES_SIZES)
+        calls = sum(font.calls for font in fonts.values())
+        return (time.perf_counter() - started) * 1000 / (args.rounds * len(cases)), calls
+
+    naive_ms, naive_calls = run(lambda *a: naive_fit_line(counting_font, *a),
+                                lambda *a: naive_fit_lines(counting_font, *a))
+    print(f"{'':>16} {'ms/card':>9} {'getlength calls':>16}")
+    print(f"{'naive':>16} {naive_ms:>9.3f} {naive_calls:>16}")
+    for label, max_layouts in (('advances only', 0), ('TextLayout', 1024)):
+        fonts.clear()
+        layout = TextLayout(counting_font, max_layouts=max_layouts)
+        ms, calls = run(layout.fit_line, layout.fit_lines)
+        print(f"{label:>16} {ms:>9.3f} {calls:>16}")
+
+    # Fresh layout without memoized results: advances only, and every line must fit
+    layout = TextLayout(lambda size: get_render_assets().font(size), max_layouts=0)
+    worst = float('-inf')
+    for pet_name, note in cases:
+        for fitted, width in ((layout.fit_line(pet_name, name_width, CARD_PET_SIZES), name_width),
+                              (layout.fit_lines(note, notes_width, CARD_NOTE_LINES, CARD_NOTES_SIZES), notes_width)):
+            if len(fitted.lines) > CARD_NOTE_LINES:
+                raise SystemExit(f"{len(fitted.lines)} lines for {note!r}")
+            for line in fitted.lines:
+                worst = max(worst, fitted.font.getlength(line) - width)
+    if worst > 0:
+        raise SystemExit(f"a line overflows its box by {worst:.1f} px")
+    print(f"all lines fit, the tightest with {max(0.0, -worst):.2f} px to spare")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""In-process stand-in for the subset of the boto3 S3 client the app uses.
+
+Objects live in a dict, ETags are MD5 hex digests like real S3, and the
+conditional ``IfMatch`` / ``IfNoneMatch`` writes are checked atomically, so
+races between simulated replicas behave the way they would against S3. An
+optional injected latency is applied outside the lock to let calls overlap.
+"""
+import hashlib
+import io
+import random
+import threading
+import time
+from collections import Counter
+
+from botocore.exceptions import ClientError
+
+
+def _client_error(code, status, operation):
+    return ClientError({'Error': {'Code': code, 'Message': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}, operation)
+
+
+class FakeS3Client:
+    def __init__(self, latency=0.0, jitter=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = Counter()
+        self.bytes_written = 0
+        self._objects = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def _delay(self, operation):
+        self.calls[operation] += 1
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self._random.uniform(0, self.jitter))
+
+    def list_buckets(self):
+        self._delay('ListBuckets')
+        return {'Buckets': [{'Name': bucket} for bucket in sorted({b for b, _ in self._objects})]}
+
+    def head_bucket(self, Bucket):
+        self._delay('HeadBucket')
+        return {}
+
+    def put_object(self, Bucket, Key, Body=b'', IfMatch=None, IfNoneMatch=None, **extra):
+        self._delay('PutObject')
+        if hasattr(Body, 'read'):
+            Body = Body.read()
+        if isinstance(Body, str):
+            Body = Body.encode('utf-8')
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        with self._lock:
+            existing = self._objects.get((Bucket, Key))
+            if IfNoneMatch == '*' and existing is not None:
+                raise _client_error('PreconditionFailed', 412, 'PutObject')
+            if IfMatch is not None and (existing is None or existing['ETag'] != IfMatch):
+                raise _client_error('PreconditionFailed' if existing else 'NoSuchKey', 412 if existing else 404, 'PutObject')
+            self._objects[(Bucket, Key)] = {'Body': Body, 'ETag': etag, **extra}
+            self.bytes_written += len(Body)
+        return {'ETag': etag}
+
+    def get_object(self, Bucket, Key, **_):
+        self._delay('GetObject')
+        with self._lock:
+            stored = self._objects.get((Bucket, Key))
+        if stored is None:
+            raise _client_error('NoSuchKey', 404, 'GetObject')
+        response = {k: v for k, v in stored.items() if k != 'Body'}
+        response['Body'] = io.BytesIO(stored['Body'])
+        response['ContentLength'] = len(stored['Body'])
+        return response
+
+    def head_object(self, Bucket, Key, **_):
+        self._delay('HeadObject')
+        with self._lock:
+            stored = self._objects.get((Bucket, Key))
+        if stored is None:
+            raise _client_error('404', 404, 'HeadObject')
+        response = {k: v for k, v in stored.items() if k != 'Body'}
+        response['ContentLength'] = len(stored['Body'])
+        return response
+
+    def list_objects_v2(self, Bucket, Prefix='', ContinuationToken=None, MaxKeys=1000, **_):
+        self._delay('ListObjectsV2')
+        with self._lock:
+            keys = sorted(key for b, key in self._objects if b == Bucket and key.startswith(Prefix))
+        # The continuation token is the last key of the previous page
+        if ContinuationToken is not None:
+            keys = [key for key in keys if key > ContinuationToken]
+        page = keys[:MaxKeys]
+        response = {'Contents': [{'Key': key} for key in page], 'KeyCount': len(page),
+                    'IsTruncated': len(keys) > MaxKeys}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = page[-1]
+        return response
+
+    def objects(self, bucket):
+        """Return {key: stored object} for inspection by benchmarks"""
+        with self._lock:
+            return {key: stored for (b, key), stored in self._objects.items() if b == bucket}
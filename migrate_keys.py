@@ -0,0 +1,184 @@
+"""Move reminders published under flat keys to the sharded key layout and index them.
+
+Reminders used to be published as ``calendars/<id>.ics``, ``pages/<id>.html``
+and ``images/<id>_reminder_image.<ext>``. New ones go under hashed prefixes
+(``calendars/<shard>/<id>.ics``, see reminder_core.storage.reminder_keys) and
+are recorded in the reminder index. This script brings older reminders in
+line:
+
+    python migrate_keys.py                # copy flat objects to sharded keys, then index them
+    python migrate_keys.py --index-only   # index every reminder where it is; copy nothing
+    python migrate_keys.py --dry-run      # report what would be done
+
+Printed cards and shared links point at the flat URLs, so flat objects are
+never deleted or changed. Copies are decoded and re-encoded with the current
+upload settings. Pages get their shared asset links rewritten for the
+deeper prefix. Reminders already stored under sharded keys are only
+indexed, so the script also rebuilds a lost or incomplete index.
+
+The run lists each artifact prefix once, and that should be the last scan
+the bucket needs. Running it again is safe: existing copies are skipped and
+index appends are idempotent.
+"""
+import argparse
+import gzip
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from reminder_core.config import Settings
+from reminder_core.encoding import profile_extension
+from reminder_core.pipeline import get_generator
+from reminder_core.reminder_index import BufferedIndexWriter, IndexEntry, ReminderIndex
+from reminder_core.storage import (
+    ARTIFACT_PREFIXES,
+    FLAT_KEY_LAYOUT,
+    SHARDED_KEY_LAYOUT,
+    calendar_upload,
+    key_shard,
+    reminder_image_upload,
+    web_page_upload,
+)
+
+# Reminder object keys in either layout; encoded variants (<key>.br) do not match
+KEY_PATTERNS = {
+    'calendar': re.compile(r'calendars/(?:(?P<shard>[0-9a-f]+)/)?(?P<id>[^/]+)\.ics'),
+    'page': re.compile(r'pages/(?:(?P<shard>[0-9a-f]+)/)?(?P<id>[^/]+)\.html'),
+    'image': re.compile(r'images/(?:(?P<shard>[0-9a-f]+)/)?(?P<id>[^/]+)_reminder_image\.(?P<ext>[a-z0-9]+)'),
+}
+# Flat pages sit one level below the bucket root, sharded ones two
+FLAT_ASSET_LINK = re.compile(r'="\.\./static/')
+SHARDED_ASSET_LINK = '="../../static/'
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def parse_key(kind, key):
+    """``(meaningful_id, layout, image_extension)`` of a reminder object key, or None for anything else"""
+    match = KEY_PATTERNS[kind].fullmatch(key)
+    if match is None:
+        return None
+    meaningful_id, shard = match['id'], match['shard']
+    if shard is None:
+        layout = FLAT_KEY_LAYOUT
+    elif shard == key_shard(meaningful_id):
+        layout = SHARDED_KEY_LAYOUT
+    else:
+        return None
+    return meaningful_id, layout, match.groupdict().get('ext')
+
+
+def scan_reminders(store):
+    """{meaningful_id: {layout: {kind: key}}} plus each ID's card extension, from one listing per prefix"""
+    reminders, extensions = {}, {}
+    for kind, prefix in ARTIFACT_PREFIXES.items():
+        for key in store.list_keys(prefix):
+            parsed = parse_key(kind, key)
+            if parsed is None:
+                continue
+            meaningful_id, layout, extension = parsed
+            reminders.setdefault(meaningful_id, {}).setdefault(layout, {})[kind] = key
+            if extension:
+                extensions[meaningful_id] = extension
+    return reminders, extensions
+
+
+def pet_names(meaningful_id):
+    """The cleaned pet name inside an ID such as ``QR0042_Daisy_NexGardSPE``"""
+    parts = meaningful_id.split('_')
+    return parts[1:2]
+
+
+def _decoded(store, key):
+    body = store.get(key).body
+    return gzip.decompress(body) if body[:2] == _GZIP_MAGIC else body
+
+
+def sharded_uploads(store, meaningful_id, flat_keys, settings, extension):
+    """Upload specs that re-publish a reminder's flat objects under their sharded keys"""
+    compress, brotli_variant = settings.compress_uploads, settings.brotli_variants
+    uploads = {}
+    if 'calendar' in flat_keys:
+        calendar_data = _decoded(store, flat_keys['calendar']).decode('utf-8')
+        uploads['calendar'] = calendar_upload(calendar_data, meaningful_id, compress, brotli_variant)
+    if 'page' in flat_keys:
+        html = _decoded(store, flat_keys['page']).decode('utf-8')
+        uploads['page'] = web_page_upload(FLAT_ASSET_LINK.sub(SHARDED_ASSET_LINK, html), meaningful_id, compress,
+                                          brotli_variant)
+    if 'image' in flat_keys:
+        stored = store.get(flat_keys['image'])
+        uploads['image'] = reminder_image_upload(stored.body, meaningful_id,
+                                                 stored.content_type or f"image/{extension}", extension)
+    return uploads
+
+
+def migrate_reminder(publisher, meaningful_id, layouts, extension, index_only=False, dry_run=False):
+    """Copy one reminder's missing sharded objects; returns ``(IndexEntry, objects copied)``"""
+    store = publisher.store
+    flat_keys = layouts.get(FLAT_KEY_LAYOUT, {})
+    sharded_keys = layouts.get(SHARDED_KEY_LAYOUT, {})
+    missing = {kind: key for kind, key in flat_keys.items() if kind not in sharded_keys}
+    if index_only or not missing:
+        layout = SHARDED_KEY_LAYOUT if sharded_keys else FLAT_KEY_LAYOUT
+        return IndexEntry(meaningful_id, layout, extension, pet_names(meaningful_id)), 0
+    if not dry_run:
+        _, errors = publisher.upload_artifacts(sharded_uploads(store, meaningful_id, missing, publisher.settings,
+                                                               extension))
+        if errors:
+            raise next(iter(errors.values()))
+    return IndexEntry(meaningful_id, SHARDED_KEY_LAYOUT, extension, pet_names(meaningful_id)), len(missing)
+
+
+def run_migration(publisher, index, index_only=False, dry_run=False, workers=8, batch_size=256):
+    """Migrate and index every reminder in ``publisher``'s store; returns counts and per-ID errors"""
+    writer = BufferedIndexWriter(index, batch_size)
+    reminders, extensions = scan_reminders(publisher.store)
+    default_extension = profile_extension(publisher.settings.card_image_profile)
+    stats = {'reminders': len(reminders), 'copied': 0, 'indexed': 0, 'errors': {}}
+
+    def migrate(item):
+        meaningful_id, layouts = item
+        return migrate_reminder(publisher, meaningful_id, layouts, extensions.get(meaningful_id, default_extension),
+                                index_only, dry_run)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="migrate") as pool:
+        futures = {meaningful_id: pool.submit(migrate, (meaningful_id, layouts))
+                   for meaningful_id, layouts in sorted(reminders.items())}
+        for meaningful_id, future in futures.items():
+            try:
+                entry, copied = future.result()
+            except Exception as e:
+                stats['errors'][meaningful_id] = f"{type(e).__name__}: {e}"
+                continue
+            stats['copied'] += copied
+            if not dry_run:
+                writer.add(entry)
+            stats['indexed'] += 1
+    if not dry_run:
+        writer.flush()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move flat-keyed reminders to the sharded layout and index them.")
+    parser.add_argument('--index-only', action='store_true', help="index reminders where they are; copy nothing")
+    parser.add_argument('--dry-run', action='store_true', help="scan and report, but write nothing")
+    parser.add_argument('--workers', type=int, default=8, help="reminders migrated at once")
+    args = parser.parse_args(argv)
+
+    generator = get_generator(Settings.from_mapping())
+    configured, error = generator.s3_status()
+    if not configured:
+        parser.error(f"the artifact store is not available ({error})")
+
+    index = generator.reminder_index or ReminderIndex(generator.publisher.store)
+    stats = run_migration(generator.publisher, index, args.index_only, args.dry_run, max(1, args.workers))
+    verb = "would copy" if args.dry_run else "copied"
+    print(f"{stats['reminders']} reminders: {verb} {stats['copied']} objects, "
+          f"indexed {stats['indexed']}, {len(stats['errors'])} failed")
+    for meaningful_id, message in sorted(stats['errors'].items()):
+        print(f"  {meaningful_id}: {message}", file=sys.stderr)
+    return 1 if stats['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
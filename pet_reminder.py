@@ -1,63 +1,76 @@
 import streamlit as st
-import qrcode
-from icalendar import Calendar, Event, Alarm, vDate
-from datetime import datetime, timedelta, date, time
-import io
+from datetime import datetime, date
 import base64
-from PIL import Image, ImageDraw, ImageFont
-import uuid
 import os
-import urllib.parse
-import hashlib
-import boto3
-import math
-import re
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from reminder_core.config import Settings
+from reminder_core.dedup import request_fingerprint
+from reminder_core.metrics import REGISTRY
+from reminder_core.warmup import StartupWarmup
+# The pipeline (PIL, qrcode, icalendar, boto3) is imported by the warm-up thread
+# and by the functions that need it, so the form renders before it has loaded
 
 # Configure page with mobile optimization
 st.set_page_config(
     page_title="Pet Reminder - NexGard SPECTRA",
-    page_icon="🐾",
+    # A paw like 🐾, but an emoji icon makes Streamlit compile its whole emoji catalog before the form renders
+    page_icon=":material/pets:",
     layout="centered"
 )
 
-# AWS Configuration - Use Streamlit secrets for cloud deployment
-if "AWS_REGION" in st.secrets:
-    # Production: Use Streamlit secrets
-    AWS_REGION = st.secrets["AWS_REGION"]
-    S3_BUCKET = st.secrets["S3_BUCKET_NAME"]
-    aws_access_key_id = st.secrets["AWS_ACCESS_KEY_ID"]
-    aws_secret_access_key = st.secrets["AWS_SECRET_ACCESS_KEY"]
-    
-else:
-    # Development: Use environment variables
-    AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
-    S3_BUCKET = os.getenv('S3_BUCKET_NAME', 'pet-reminder')
-    aws_access_key_id = os.getenv('AWS_ACCESS_KEY_ID')
-    aws_secret_access_key = os.getenv('AWS_SECRET_ACCESS_KEY')
+def load_settings():
+    """AWS and generation settings: Streamlit secrets for cloud deployment, environment variables otherwise"""
+    try:
+        # Production: Use Streamlit secrets
+        secrets = dict(st.secrets) if "AWS_REGION" in st.secrets else {}
+    except FileNotFoundError:
+        # Development: no secrets.toml at all, use environment variables
+        secrets = {}
+    return Settings.from_mapping({**os.environ, **secrets})
+
+SETTINGS = load_settings()
+
+@st.cache_resource(show_spinner=False)
+def get_warmup():
+    """Imports the pipeline, connects to S3 and loads fonts, logo and card templates in the background"""
+    return StartupWarmup(SETTINGS)
+
+WARMUP = get_warmup()
+
+def s3_status():
+    """(configured, error) once the warm-up has probed the store; assume configured until then"""
+    if not WARMUP.done():
+        return True, None
+    from reminder_core.pipeline import get_generator
+    try:
+        return get_generator(SETTINGS).s3_status()
+    except Exception as e:
+        return False, e
 
-# Initialize AWS client
-try:
-    s3_client = boto3.client(
-        's3',
-        region_name=AWS_REGION,
-        aws_access_key_id=aws_access_key_id,
-        aws_secret_access_key=aws_secret_access_key
-    )
-    # Test AWS connection
-    s3_client.list_buckets()
-    AWS_CONFIGURED = True
-except Exception as e:
-    AWS_CONFIGURED = False
-    st.error(f"⚠️ AWS S3 not configured properly: {str(e)}")
+AWS_CONFIGURED, aws_error = s3_status()
+if not AWS_CONFIGURED:
+    st.error(f"⚠️ AWS S3 not configured properly: {str(aws_error)}")
     st.info("Some features may be limited without S3 configuration.")
 
+# Generations running at once across all sessions; a session's reruns wait on its own
+SUBMIT_WORKERS = 4
+# Submissions remembered per session (most recent forms win)
+SUBMISSION_MEMO_SIZE = 8
+# While a reminder's objects are still spooled for upload, how often its result checks whether they are in S3
+PUBLISH_POLL_SECONDS = 1
+
+SUBMIT_MEMO = REGISTRY.counter(
+    'reminder_submit_memo_total', "Submits by whether they started a generation or reused one", ('result',)
+)
+
+@st.cache_resource(show_spinner=False)
+def get_submit_executor():
+    """Generation runs off the script thread so a rerun cannot orphan it"""
+    return ThreadPoolExecutor(max_workers=SUBMIT_WORKERS, thread_name_prefix="reminder-submit")
+
 # Initialize session state for persistence
 def init_session_state():
     """Initialize all session state variables"""
-    if 'pet_counter' not in st.session_state:
-        st.session_state.pet_counter = 1
-    
     # Form data persistence
     if 'form_data' not in st.session_state:
         st.session_state.form_data = {}
@@ -69,34 +82,12 @@ def init_session_state():
     # Generation status
     if 'content_generated' not in st.session_state:
         st.session_state.content_generated = False
-
-def generate_qr_svg(web_page_url):
-    """Generate QR code as SVG string for HTML embedding"""
-    import qrcode.image.svg
-    
-    factory = qrcode.image.svg.SvgPathImage
-    qr = qrcode.QRCode(
-        version=2,
-        error_correction=qrcode.constants.ERROR_CORRECT_M,
-        box_size=10,
-        border=4,
-        image_factory=factory
-    )
     
-    qr.add_data(web_page_url)
-    qr.make(fit=True)
-    
-    # Generate SVG
-    img = qr.make_image()
-    svg_string = img.to_string().decode('utf-8')
-    
-    # Customize SVG colors to match theme
-    svg_string = svg_string.replace('fill="black"', 'fill="#000000"')
-    svg_string = svg_string.replace('fill="white"', 'fill="#00e47c"')
-    
-    return svg_string
+    # In-flight and finished generations by form fingerprint
+    if 'submissions' not in st.session_state:
+        st.session_state.submissions = {}
 
-def save_form_data(pet_name, product_name, start_date, dosage, selected_time, notes):
+def save_form_data(pet_name, product_name, start_date, dosage, selected_time, notes, household=False):
     """Save current form data to session state"""
     st.session_state.form_data = {
         'pet_name': pet_name,
@@ -104,919 +95,90 @@ def save_form_data(pet_name, product_name, start_date, dosage, selected_time, no
         'start_date': start_date,
         'dosage': dosage,
         'selected_time': selected_time,
-        'notes': notes
+        'notes': notes,
+        'household': household
     }
 
 def get_form_data(key, default=None):
     """Get form data from session state"""
     return st.session_state.form_data.get(key, default)
 
-def format_duration_text(start_date, dosage):
-    """Format duration text for display"""
-    total_days = dosage * 30
-    
-    if total_days <= 7:
-        return f"{total_days} day{'s' if total_days > 1 else ''}"
-    elif total_days <= 31:
-        weeks = math.ceil(total_days / 7)
-        return f"≈ {weeks} week{'s' if weeks > 1 else ''}"
-    elif total_days <= 365:
-        months = math.ceil(total_days / 30)
-        return f"≈ {months} month{'s' if months > 1 else ''}"
-    else:
-        years = total_days / 365
-        if years >= 2:
-            return f"≈ {years:.1f} years"
-        else:
-            months = math.ceil(total_days / 30)
-            return f"≈ {months} months"
-
-def get_fallback_font(size):
-    """Get the best available font for the system"""
-    font_paths = [
-        # Common Windows fonts
-        "C:/Windows/Fonts/arial.ttf",
-        "C:/Windows/Fonts/calibri.ttf",
-        "C:/Windows/Fonts/segoeui.ttf",
-        # Common macOS fonts
-        "/System/Library/Fonts/Arial.ttf",
-        "/System/Library/Fonts/Helvetica.ttc",
-        # Common Linux fonts
-        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-        "/usr/share/fonts/TTF/arial.ttf",
-        # Streamlit Cloud / Ubuntu fonts
-        "/usr/share/fonts/truetype/ubuntu/Ubuntu-R.ttf",
-        "/usr/share/fonts/truetype/ubuntu/Ubuntu-B.ttf",
-    ]
-    
-    for font_path in font_paths:
-        if os.path.exists(font_path):
-            try:
-                return ImageFont.truetype(font_path, size)
-            except:
-                continue
-    
-    # If no fonts found, use default
-    return ImageFont.load_default()
-
-def get_next_sequence_number():
-    """Get next sequence number from S3 or start from 1"""
-    if not AWS_CONFIGURED:
-        # Fallback to session state if S3 not available
-        if 'pet_counter' not in st.session_state:
-            st.session_state.pet_counter = 1
-        else:
-            st.session_state.pet_counter += 1
-        return st.session_state.pet_counter
-    
-    try:
-        # Try to get current counter from S3
-        response = s3_client.get_object(Bucket=S3_BUCKET, Key='system/counter.txt')
-        current_count = int(response['Body'].read().decode('utf-8'))
-    except:
-        # If file doesn't exist, start from 1
-        current_count = 0
-    
-    # Increment counter
-    next_count = current_count + 1
-    
-    # Save updated counter back to S3
-    try:
-        s3_client.put_object(
-            Bucket=S3_BUCKET,
-            Key='system/counter.txt',
-            Body=str(next_count).encode('utf-8'),
-            ContentType='text/plain'
-        )
-    except Exception as e:
-        st.warning(f"Could not save counter to S3: {e}")
-        # Fall back to session state if S3 fails
-        if 'pet_counter' not in st.session_state:
-            st.session_state.pet_counter = 1
-        next_count = st.session_state.pet_counter
-        st.session_state.pet_counter += 1
-    
-    return next_count
-
-def generate_meaningful_id(pet_name, product_name):
-    """Generate meaningful ID with sequence number"""
-    # Get next sequence number from S3 (persistent)
-    current_count = get_next_sequence_number()
-    
-    # Clean names for URL (remove special characters, spaces)
-    clean_pet = ''.join(c for c in pet_name if c.isalnum())[:10]
-    clean_product = ''.join(c for c in product_name.split('(')[0] if c.isalnum())[:10]
-    
-    # Format: QR0001_PetName_ProductName
-    meaningful_id = f"QR{current_count:04d}_{clean_pet}_{clean_product}"
-    
-    return meaningful_id
-
-def create_calendar_reminder(pet_name, product_name, dosage, reminder_time, start_date, notes=""):
-    
-    # Calculate reminder count for RRULE
-    reminder_count = dosage
-    
-    # Create calendar
-    cal = Calendar()
-    cal.add('prodid', '-//Pet Medication Reminder//Boehringer Ingelheim//EN')
-    cal.add('version', '2.0')
-    cal.add('calscale', 'GREGORIAN')
-    cal.add('method', 'PUBLISH')
-
-    # Create event
-    event = Event()
-    event_title = f"{pet_name} - {product_name}"
-    
-    event.add('summary', event_title)
-    if reminder_time == '':
-        event.add('description', f"NexGard reminver: {product_name}\nPet: {pet_name}\n{notes}")
-    else:
-        event.add('description', f"Nexgard reminder: {product_name}\nPet: {pet_name}\nTime: {reminder_time}\n{notes}")
-    
-    if reminder_time == '':
-        event.add('dtstart', vDate(start_date))
-        event.add('dtend', vDate(start_date + timedelta(days=1)))
-    else:
-        start_time = datetime.combine(start_date, datetime.strptime(reminder_time, "%H:%M").time())
-        event.add('dtstart', start_time)
-        event.add('dtend', start_time + timedelta(hours=1))
-    event.add('dtstamp', datetime.now())
-    event.add('uid', str(uuid.uuid4()))
-    
-    # Add recurrence rule with count limit
-    rrule = {}
-    rrule['freq'] = 'monthly'
-    
-    if reminder_count > 0:
-        rrule['count'] = reminder_count
-    
-    event.add('rrule', rrule)
-    
-    alarm = Alarm()
-    alarm.add('action', 'DISPLAY')
-    alarm.add('description', f'Time to give {product_name} to {pet_name}!')
-    alarm.add('trigger', timedelta(minutes=-15))  # 15 minutes before
-    event.add_component(alarm)
-    
-    cal.add_component(event)
-    
-    return cal.to_ical().decode('utf-8')
-
-def upload_to_s3(calendar_data, file_id):
-    """Upload calendar file to S3 and return public URL"""
-    if not AWS_CONFIGURED:
-        st.warning("⚠️ S3 not configured. Calendar file will be available for download only.")
-        return None
-        
-    try:
-        s3_client.put_object(
-            Bucket=S3_BUCKET,
-            Key=f"calendars/{file_id}.ics",
-            Body=calendar_data.encode('utf-8'),
-            ContentType='text/calendar',
-            ContentDisposition=f'attachment; filename="{file_id}.ics"'
-        )
-        
-        return f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/calendars/{file_id}.ics"
-    except Exception as e:
-        st.error(f"Error uploading to S3: {e}")
-        return None
-
-def upload_reminder_image_to_s3(image_bytes, file_id):
-    """Upload reminder image to S3 and return public URL"""
-    if not AWS_CONFIGURED:
-        return None
-        
-    try:
-        s3_client.put_object(
-            Bucket=S3_BUCKET,
-            Key=f"images/{file_id}_reminder_image.png",
-            Body=image_bytes,
-            ContentType='image/png',
-            ContentDisposition=f'attachment; filename="{file_id}_reminder_image.png"'
-        )
-        
-        return f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/images/{file_id}_reminder_image.png"
-    except Exception as e:
-        st.error(f"Error uploading image to S3: {e}")
-        return None
-
-def create_web_page_html(pet_name, product_name, calendar_url, reminder_details, qr_image_bytes):
-    """Create HTML page that serves calendar with device detection"""
-    # Base64 encode the web page specific logo
-    logo_data_url = ""
-    if os.path.exists("BI-Logo-2.png"):
-        try:
-            with open("BI-Logo-2.png", "rb") as f:
-                logo_bytes = f.read()
-                logo_b64 = base64.b64encode(logo_bytes).decode()
-                logo_data_url = f"data:image/png;base64,{logo_b64}"
-        except:
-            pass
-    
-    # Format reminder times for display
-    times_html_list = ""
-    if reminder_details['times'] != '':
-        times_html_list += f"• {reminder_details['times']}<br>"
-        times_html_list = times_html_list.rstrip('<br>')
-    
-    
-    qr_base64 = base64.b64encode(qr_image_bytes).decode()
-
-
-    html_content = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>🐾 {pet_name.upper()} - Medication Reminder</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            margin: 0;
-            padding: 20px;
-            background: #08312a;
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: #ffffff;
-        }}
-        
-        .container {{
-            background: linear-gradient(135deg, #0a3d33, #08312a);
-            border: 2px solid #00e47c;
-            border-radius: 20px;
-            padding: 30px;
-            max-width: 420px;
-            width: 100%;
-            text-align: center;
-            box-shadow: 0 20px 40px rgba(0, 0, 0, 0.3);
-        }}
-        
-        .header {{
-            margin-bottom: 25px;
-        }}
-        
-        .logo-container {{
-            width: 100px;
-            height: 100px;
-            margin: 0 auto 20px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }}
-        
-        .logo-img {{
-            max-width: 100px;
-            max-height: 100px;
-            object-fit: contain;
-        }}
-        
-        .logo-fallback {{
-            font-size: 40px;
-            color: #00e47c;
-        }}
-        
-        .pet-name {{
-            font-size: 32px;
-            font-weight: bold;
-            color: #00e47c;
-            margin-bottom: 8px;
-            text-transform: uppercase;
-            letter-spacing: 2px;
-        }}
-        
-        .medication {{
-            font-size: 20px;
-            color: #ffffff;
-            margin-bottom: 25px;
-            opacity: 0.9;
-        }}
-        
-        .details {{
-            background: rgba(0, 228, 124, 0.1);
-            border: 1px solid #00e47c;
-            border-radius: 15px;
-            padding: 20px;
-            margin-bottom: 25px;
-            text-align: left;
-        }}
-        
-        .detail-row {{
-            display: flex;
-            justify-content: space-between;
-            margin-bottom: 10px;
-            font-size: 15px;
-        }}
-        
-        .detail-label {{
-            color: #00e47c;
-            font-weight: 600;
-        }}
-        
-        .detail-value {{
-            color: #ffffff;
-            flex: 1;
-            text-align: right;
-        }}
-        
-        .times-section {{
-            background: rgba(0, 228, 124, 0.05);
-            border: 1px dashed #00e47c;
-            border-radius: 10px;
-            padding: 15px;
-            margin-top: 15px;
-            text-align: left;
-        }}
-        
-        .times-title {{
-            color: #00e47c;
-            font-weight: 600;
-            margin-bottom: 8px;
-            font-size: 14px;
-        }}
-        
-        .times-list {{
-            color: #ffffff;
-            font-size: 14px;
-            line-height: 1.6;
-        }}
-        
-        .notes-section {{
-            background: rgba(0, 228, 124, 0.05);
-            border: 1px dashed #00e47c;
-            border-radius: 10px;
-            padding: 15px;
-            margin-top: 15px;
-            text-align: left;
-        }}
-        
-        .notes-title {{
-            color: #00e47c;
-            font-weight: 600;
-            margin-bottom: 8px;
-            font-size: 14px;
-        }}
-        
-        .notes-text {{
-            color: #ffffff;
-            font-size: 14px;
-            line-height: 1.4;
-            opacity: 0.9;
-        }}
-        
-        .btn {{
-            display: block;
-            width: 100%;
-            padding: 18px;
-            margin: 15px 0;
-            border: none;
-            border-radius: 12px;
-            font-size: 16px;
-            font-weight: 600;
-            cursor: pointer;
-            text-decoration: none;
-            transition: all 0.3s ease;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-        
-        .btn:hover {{
-            transform: translateY(-2px);
-            box-shadow: 0 8px 20px rgba(0, 228, 124, 0.3);
-        }}
-        
-        .btn-primary {{
-            background: linear-gradient(45deg, #00e47c, #00b85c);
-            color: #08312a;
-            font-weight: 700;
-        }}
-        
-        .instructions {{
-            background: rgba(255, 255, 255, 0.05);
-            border-radius: 10px;
-            padding: 20px;
-            margin-top: 20px;
-            font-size: 14px;
-            color: #ffffff;
-            line-height: 1.5;
-        }}
-        
-        .instructions-title {{
-            color: #00e47c;
-            font-weight: 600;
-            margin-bottom: 10px;
-            font-size: 16px;
-        }}
-        
-        .device-specific {{
-            margin-top: 15px;
-            padding: 15px;
-            background: rgba(0, 228, 124, 0.1);
-            border-radius: 8px;
-            border-left: 4px solid #00e47c;
-        }}
-
-        /* QR Code section - Simplified for mobile */
-        .qr-section {{
-            background-color: #f8f9fa;
-            padding: 20px;
-            text-align: center;
-            border: 3px solid #00e47c;
-        }}
-        
-        .qr-title {{
-            color: #08312a;
-            font-size: 20px;
-            font-weight: bold;
-            margin-bottom: 15px;
-        }}
-
-        .qr-image {{
-            width: 200px;
-            height: 200px;
-            margin: 10px auto;
-            background-color: #ffffff;
-            border: 2px solid #00e47c;
-            padding: 10px;
-            display: block;
-        }}
-
-         .qr-instructions {{
-            color: #08312a;
-            font-size: 16px;
-            font-weight: bold;
-            margin: 15px 0 10px 0;
-        }}
-        
-        .qr-link {{
-            color: #08312a;
-            margin: 10px 0;
-        }}
-        
-        .qr-link a {{
-            color: #007bff;
-            text-decoration: underline;
-            font-weight: bold;
-            font-size: 14px;
-        }}
-        
-        .scan-tip {{
-            background-color: #fff3cd;
-            border: 1px solid #ffeaa7;
-            padding: 10px;
-            margin: 15px 0;
-            border-radius: 5px;
-            color: #856404;
-            font-size: 13px;
-        }}
-        
-        @media (max-width: 480px) {{
-            body {{
-                padding: 15px;
-            }}
-            
-            .container {{
-                padding: 25px 20px;
-            }}
-            
-            .pet-name {{
-                font-size: 26px;
-            }}
-            
-            .medication {{
-                font-size: 18px;
-            }}
-            
-            .btn {{
-                padding: 16px;
-                font-size: 15px;
-            }}
-            
-            .logo-container {{
-                width: 80px;
-                height: 80px;
-            }}
-            
-            .logo-img {{
-                max-width: 80px;
-                max-height: 80px;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <div class="logo-container">
-                {f'<img src="{logo_data_url}" alt="BI Logo" class="logo-img">' if logo_data_url else '<div class="logo-fallback">🐾</div>'}
-            </div>
-            <div class="pet-name">{pet_name.upper()}</div>
-            <div class="medication">({product_name})</div>
-        </div>
-        
-        <div class="details">
-            <div class="detail-row">
-                <span class="detail-label">Frequency:</span>
-                <span class="detail-value">{reminder_details['frequency']}</span>
-            </div>
-            <div class="detail-row">
-                <span class="detail-label">Start Date:</span>
-                <span class="detail-value">{reminder_details['start_date']}</span>
-            </div>
-            <div class="detail-row">
-                <span class="detail-label">Duration:</span>
-                <span class="detail-value">{reminder_details['duration']}</span>
-            </div>
-            <div class="detail-row">
-                <span class="detail-label">Total Reminders:</span>
-                <span class="detail-value">{reminder_details['total_reminders']}</span>
-            </div>
-            {f"""<div class="times-section">
-                <div class="times-title">⏰ Reminder Times:</div>
-                <div class="times-list">
-                    {times_html_list}
-                </div>
-            </div>
-            """ if times_html_list != "" else ""}
-            
-            
-            {f'''
-            <div class="notes-section">
-                <div class="notes-title">📝 Additional Notes:</div>
-                <div class="notes-text">{reminder_details['notes']}</div>
-            </div>
-            ''' if reminder_details.get('notes') and reminder_details['notes'].strip() else ''}
-        </div>
-        
-        <a href="{calendar_url}" class="btn btn-primary" download="{pet_name.upper()}_{product_name}_reminder.ics">
-            📅 Add to My Calendar
-        </a>
-
-        <!-- QR Code Section -->
-        <div class="qr-section">
-            <div class="qr-title">📱 Scan QR Code</div>
-            <div style="text-align: center; margin: 15px 0;">
-                <img src="data:image/png;base64,{qr_base64}"
-                    alt="QR Code for Pet Reminder"
-                    class="qr-image"
-                    style="width: 200px; height: 200px; display: block; margin: 0 auto; border: 2px solid #00e47c; padding: 10px; background-color: white;" />
-            </div>
-            <div class="qr-link">
-                Can't scan? <a href="{calendar_url}">Click here instead</a>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        // Device detection and instructions
-        function showDeviceInstructions() {{
-            const userAgent = navigator.userAgent;
-            
-            if (/iPhone|iPad|iPod/i.test(userAgent)) {{
-                document.querySelector('.ios-instructions').style.display = 'block';
-            }} else if (/Android/i.test(userAgent)) {{
-                document.querySelector('.android-instructions').style.display = 'block';
-            }}
-        }}
-        
-        // Auto-redirect to calendar download on mobile for better UX
-        function handleMobileDownload() {{
-            const userAgent = navigator.userAgent;
-            const downloadBtn = document.querySelector('.btn-primary');
-            
-            if (/iPhone|iPad|iPod|Android/i.test(userAgent)) {{
-                downloadBtn.addEventListener('click', function(e) {{
-                    // Let the default download behavior work
-                    setTimeout(function() {{
-                        // Optional: Show a brief success message
-                        downloadBtn.innerHTML = '✅ Calendar File Ready!';
-                        downloadBtn.style.background = '#28a745';
-                        
-                        setTimeout(function() {{
-                            downloadBtn.innerHTML = '📅 Add to My Calendar';
-                            downloadBtn.style.background = 'linear-gradient(45deg, #00e47c, #00b85c)';
-                        }}, 2000);
-                    }}, 500);
-                }});
-            }}
-        }}
-        
-        window.addEventListener('load', function() {{
-            showDeviceInstructions();
-            handleMobileDownload();
-        }});
-    </script>
-</body>
-</html>
-"""
-    return html_content
-
-def upload_web_page_to_s3(html_content, page_id):
-    """Upload HTML page to S3 and return public URL"""
-    if not AWS_CONFIGURED:
-        return None
-        
-    try:
-        s3_client.put_object(
-            Bucket=S3_BUCKET,
-            Key=f"pages/{page_id}.html",
-            Body=html_content.encode('utf-8'),
-            ContentType='text/html'
-        )
-        
-        return f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/pages/{page_id}.html"
-    except Exception as e:
-        st.error(f"Error uploading page to S3: {e}")
-        return None
-
-def generate_qr_code(web_page_url):
-    """Generate QR code that points to the web page"""
-    qr = qrcode.QRCode(
-        version=2,
-        error_correction=qrcode.constants.ERROR_CORRECT_M,
-        box_size=12,
-        border=6,
-    )
-    
-    qr.add_data(web_page_url)
-    qr.make(fit=True)
-    
-    # Create QR code with green background
-    qr_img = qr.make_image(fill_color="black", back_color="#00e47c")
-    
-    img_buffer = io.BytesIO()
-    qr_img.save(img_buffer, format='PNG')
-    img_buffer.seek(0)
-    
-    return img_buffer.getvalue()
-
-def create_reminder_image(pet_name, product_name, reminder_details, qr_code_bytes):
-    """Create a professional business card style reminder image with cloud-compatible fonts"""
-    
-    # Business card dimensions (landscape orientation for sharing)
-    width, height = 1200, 800
-    
-    # Colors matching your web design
-    bg_color = (8, 49, 42)  # #08312a
-    accent_color = (0, 228, 124)  # #00e47c
-    text_color = (255, 255, 255)  # white
-    light_accent = (0, 228, 124, 40)  # Semi-transparent accent
-    
-    # Create image with high quality
-    img = Image.new('RGB', (width, height), bg_color)
-    draw = ImageDraw.Draw(img)
-    
-    # Get fallback fonts with better sizing for cloud deployment
-    try:
-        large_font = get_fallback_font(48)
-        title_font = get_fallback_font(32)
-        subtitle_font = get_fallback_font(24)
-        detail_font = get_fallback_font(20)
-        small_font = get_fallback_font(18)
-    except Exception as e:
-        # Ultimate fallback - use default font
-        base_font = ImageFont.load_default()
-        large_font = base_font
-        title_font = base_font
-        subtitle_font = base_font
-        detail_font = base_font
-        small_font = base_font
-    
-    # Draw gradient background effect
-    for i in range(height):
-        color_factor = i / height
-        r = int(8 + (10 - 8) * color_factor)
-        g = int(49 + (61 - 49) * color_factor)
-        b = int(42 + (51 - 42) * color_factor)
-        draw.line([(0, i), (width, i)], fill=(r, g, b))
-    
-    # Draw decorative border
-    border_width = 8
-    draw.rectangle([0, 0, width-1, height-1], outline=accent_color, width=border_width)
-    
-    # Draw BI Logo at top left corner (BIGGER and better handling)
-    logo_size = 172  # Increased from 70 to 120
-    logo_x = 30
-    logo_y = 30
-    
-    logo_drawn = False
-    if os.path.exists("BI-Logo-2.png"):
-        try:
-            logo_img = Image.open("BI-Logo-2.png")
-            # Use thumbnail to maintain aspect ratio properly
-            logo_img.thumbnail((logo_size, logo_size), Image.Resampling.LANCZOS)
-            actual_w, actual_h = logo_img.size
-            
-            # Center the logo in the allocated space if it's smaller
-            center_x = logo_x + (logo_size - actual_w) // 2
-            center_y = logo_y + (logo_size - actual_h) // 2
-            
-            if logo_img.mode == 'RGBA':
-                img.paste(logo_img, (center_x, center_y), logo_img)
-            else:
-                img.paste(logo_img, (center_x, center_y))
-            logo_drawn = True
-        except Exception as e:
-            print(f"Error loading BI-Logo-2.png: {e}")
-            pass
-    
-    if not logo_drawn and os.path.exists("BI-Logo.png"):
-        try:
-            logo_img = Image.open("BI-Logo.png")
-            logo_img.thumbnail((logo_size, logo_size), Image.Resampling.LANCZOS)
-            actual_w, actual_h = logo_img.size
-            
-            center_x = logo_x + (logo_size - actual_w) // 2
-            center_y = logo_y + (logo_size - actual_h) // 2
-            
-            if logo_img.mode == 'RGBA':
-                img.paste(logo_img, (center_x, center_y), logo_img)
-            else:
-                img.paste(logo_img, (center_x, center_y))
-            logo_drawn = True
-        except Exception as e:
-            print(f"Error loading BI-Logo.png: {e}")
-            pass
-    
-    if not logo_drawn:
-        # Fallback: draw simple text instead of emoji
-        draw.text((logo_x, logo_y), "BI", fill=accent_color, font=large_font)
-    
-    # LEFT SIDE: Pet info and details (REDUCED SPACING)
-    left_section_width = width // 2 - 50
-    left_x = 60
-    
-    # Pet name (move up to reduce space)
-    pet_y = 180  # Reduced from higher value
-    draw.text((left_x, pet_y), pet_name.upper(), fill=accent_color, font=large_font)
-    
-    # Product name (tighter spacing)
-    product_y = pet_y + 60  # Reduced spacing
-    draw.text((left_x, product_y), '('+product_name+')', fill=text_color, font=title_font)
-    
-    # Details section (tighter spacing) - REPLACE ICONS WITH TEXT SYMBOLS
-    details_y = product_y + 60  # Reduced spacing
-    
-    # Format frequency better
-    frequency_text = reminder_details['frequency']
-
-    details = [
-        f" ",
-        f"• Frequency: {frequency_text}",
-        f"• Starts: {reminder_details['start_date']}",
-        f"• Duration: {reminder_details['duration']}",
-        f"• Total: {reminder_details['total_reminders']} reminders",
-        f" "
-    ]
-    
-    for i, detail in enumerate(details):
-        draw.text((left_x, details_y + i * 25), detail, fill=text_color, font=detail_font)
-    
-    # Times section (tighter spacing) - REPLACE ICON WITH TEXT
-    times_y = details_y + len(details) * 25 + 15  # Reduced spacing
-    draw.text((left_x, times_y), "Reminder Time:", fill=accent_color, font=detail_font)
-    
-    times_text = reminder_details['times']
-    draw.text((left_x + 20, times_y + 30), f"{times_text}", fill=text_color, font=small_font)
-    
-    # Notes if present (tighter spacing) - REPLACE ICON WITH TEXT
-    if reminder_details.get('notes') and reminder_details['notes'].strip():
-        notes_y = times_y + 80  # Adjusted spacing for new layout
-        draw.text((left_x, notes_y), "Additional Notes:", fill=accent_color, font=detail_font)
-        
-        # Wrap notes text
-        notes_text = reminder_details['notes']
-        max_chars = 40
-        if len(notes_text) > max_chars:
-            notes_text = notes_text[:max_chars-3] + "..."
-        
-        draw.text((left_x + 20, notes_y + 30), notes_text, fill=text_color, font=small_font)
-    
-    # RIGHT SIDE: QR Code section
-    qr_section_x = width // 2 + 50
-    qr_section_width = width // 2 - 100
-    
-    # Load and resize QR code
-    qr_img = Image.open(io.BytesIO(qr_code_bytes))
-    qr_size = 280  # Slightly larger QR code
-    qr_img = qr_img.resize((qr_size, qr_size), Image.Resampling.LANCZOS)
-    
-    # Center QR code in right section
-    qr_x = qr_section_x + (qr_section_width - qr_size) // 2
-    qr_y = (height - qr_size) // 2 - 20  # Better centering
-    
-    # Draw QR code background (white rounded rectangle)
-    qr_bg_padding = 25
-    qr_bg_rect = [qr_x - qr_bg_padding, qr_y - qr_bg_padding, 
-                  qr_x + qr_size + qr_bg_padding, qr_y + qr_size + qr_bg_padding]
-    draw.rectangle(qr_bg_rect, fill=text_color, outline=accent_color, width=3)
-    
-    # Add QR code
-    img.paste(qr_img, (qr_x, qr_y))
-    
-    # Instruction text below QR code
-    instruction_y = qr_y + qr_size + 35
-    #instruction_lines = [
-    #    "Scan (or) long press using Mobile",
-    #    "to add reminder to your Calendar"
-    #]
-    
-    #for i, line in enumerate(instruction_lines):
-    #    # Calculate text width for centering (improved method)
-    #    try:
-    #        bbox = draw.textbbox((0, 0), line, font=detail_font)
-    #        line_width = bbox[2] - bbox[0]
-    #    except:
-    #        # Fallback calculation
-    #        line_width = len(line) * 12
-    #    
-    #    line_x = qr_section_x + (qr_section_width - line_width) // 2
-    #    draw.text((line_x, instruction_y + i * 25), line, fill=text_color, font=detail_font)
-    
-    # Add decorative elements
-    # Top right corner accent
-    corner_size = 100
-    draw.rectangle([width - corner_size, 0, width, corner_size], fill=accent_color)
-    
-    # Bottom left corner accent
-    draw.rectangle([0, height - corner_size, corner_size, height], fill=accent_color)
-    
-    return img
-
-def generate_content(pet_name, product_name, start_date, dosage, selected_time, notes):
+def generate_for_session(request):
+    """Submit-pool task: generate, share the artifacts through the cache and return the session's reference"""
+    from reminder_core.artifact_cache import artifact_reference, get_artifact_cache
+    from reminder_core.pipeline import get_generator
+    generator = get_generator(SETTINGS)
+    artifacts = generator.generate(request)
+    # Full artifacts are shared by all sessions in a size-bounded cache; sessions keep references
+    cache_key = get_artifact_cache(SETTINGS).put_artifacts(artifacts)
+    reference = artifact_reference(artifacts, SETTINGS.card_preview_profile, cache_key)
+    # Spooled uploads may not be in S3 yet; until they are, the page URL is a 404
+    reference['publishing'] = is_publishing(reference)
+    return reference
+
+def is_published(reference):
+    """Whether a finished submit's reminder is in the store with every artifact"""
+    return bool(reference['calendar_url']) and not reference['upload_errors']
+
+def is_publishing(reference):
+    """Whether a published reminder's objects are still spooled, so its URLs do not work yet"""
+    from reminder_core.pipeline import get_generator
+    return is_published(reference) and get_generator(SETTINGS).is_spooled(reference['meaningful_id'])
+
+def show_publishing_notice(content):
+    """Polled while the reminder is spooled; reruns the app once its validation page is up"""
+    if is_publishing(content):
+        st.info("⏳ Your reminder is still being published, so its validation page is not up yet. "
+                "It will be linked here in a moment; the downloads below work already.")
+        return
+    content['publishing'] = False
+    st.rerun(scope="app")
+
+def submit_generation(request):
+    """Start generating ``request``, or return this session's pending or finished run of the same form.
+
+    Double clicks and reruns while a submit is in flight wait on the same
+    future instead of allocating another ID and uploading everything again.
+    Failed or unpublished runs are not reused, so submitting again retries.
+    """
+    submissions = st.session_state.submissions
+    fingerprint = request_fingerprint(request, SETTINGS.card_image_profile)
+    future = submissions.get(fingerprint)
+    if future is not None and not (future.done() and (future.exception() or not is_published(future.result()))):
+        SUBMIT_MEMO.inc(result='reused')
+        return future
+    
+    SUBMIT_MEMO.inc(result='started')
+    future = get_submit_executor().submit(generate_for_session, request)
+    submissions.pop(fingerprint, None)
+    submissions[fingerprint] = future
+    while len(submissions) > SUBMISSION_MEMO_SIZE:
+        submissions.pop(next(iter(submissions)))
+    return future
+
+def build_request(pet_name, product_name, start_date, dosage, selected_time, notes, household=False):
+    """One reminder, or one shared household reminder for comma-separated pet names"""
+    from reminder_core.pipeline import HouseholdRequest, ReminderRequest
+    names = [name.strip() for name in pet_name.split(',') if name.strip()] if household else []
+    if len(names) > 1:
+        return HouseholdRequest(tuple(
+            ReminderRequest(name, product_name, start_date, dosage, selected_time, notes) for name in names
+        ))
+    return ReminderRequest(names[0] if names else pet_name, product_name, start_date, dosage, selected_time, notes)
+
+def generate_content(pet_name, product_name, start_date, dosage, selected_time, notes, household=False):
     """Generate all content and save to session state"""
     try:
-        # Calculate reminder count
-        duration_text = format_duration_text(start_date, dosage)
+        request = build_request(pet_name, product_name, start_date, dosage, selected_time, notes, household)
+        reference = submit_generation(request).result()
         
-        calendar_data = create_calendar_reminder(
-            pet_name=pet_name,
-            product_name=product_name,
-            dosage=dosage,
-            reminder_time=selected_time,
-            start_date=start_date,
-            notes=notes
-        )
-        
-        meaningful_id = generate_meaningful_id(pet_name, product_name)
-        
-        # Create calendar URL (may be None if S3 not configured)
-        calendar_url = upload_to_s3(calendar_data, meaningful_id)
-        
-        reminder_details = {
-            'frequency': 'Monthly',
-            'start_date': start_date.strftime('%Y-%m-%d'),
-            'duration': duration_text,
-            'total_reminders': dosage,
-            'times': selected_time,
-            'notes': notes
-        }
-        # Generate QR code (use a fallback URL if web page not available)
-        qr_target = calendar_url if calendar_url else f"data:text/plain,{pet_name} - {product_name} Reminder"
-        qr_image_bytes = generate_qr_code(qr_target)
-
-        # Create web page (may be None if S3 not configured)
-        web_page_url = None
-        if calendar_url:
-            html_content = create_web_page_html(pet_name, product_name, calendar_url, reminder_details, qr_image_bytes)
-            web_page_url = upload_web_page_to_s3(html_content, meaningful_id)
+        for warning in reference['warnings']:
+            st.warning(warning)
+        if reference['upload_errors']:
+            st.error("Error uploading to S3: " + "; ".join(f"{name}: {e}" for name, e in reference['upload_errors'].items()))
         
-        # Generate the combined reminder image
-        reminder_image = create_reminder_image(pet_name, product_name, reminder_details, qr_image_bytes)
-        
-        # Convert PIL image to bytes for download
-        img_buffer = io.BytesIO()
-        reminder_image.save(img_buffer, format='PNG', quality=95, dpi=(300, 300))
-        reminder_image_bytes = img_buffer.getvalue()
-        
-        # Upload reminder image to S3 (optional)
-        reminder_image_url = upload_reminder_image_to_s3(reminder_image_bytes, meaningful_id)
-        
-        # Save everything to session state
-        st.session_state.generated_content = {
-            'meaningful_id': meaningful_id,
-            'reminder_image_bytes': reminder_image_bytes,
-            'qr_image_bytes': qr_image_bytes,
-            'calendar_data': calendar_data,
-            'web_page_url': web_page_url,
-            'calendar_url': calendar_url,
-            'reminder_image_url': reminder_image_url,
-            'reminder_details': reminder_details,
-            'pet_name': pet_name,
-            'product_name': product_name,
-            'html_content': html_content
-        }
+        # Only IDs, URLs and a small preview; downloads come from the shared cache
+        st.session_state.generated_content = reference
         st.session_state.content_generated = True
         return True
         
@@ -1030,8 +192,46 @@ def display_generated_content():
     
     content = st.session_state.generated_content
     
-    # Display reminder card
-    st.image(content['reminder_image_bytes'], use_container_width=True)
+    if content.get('publishing'):
+        # Checks the spool on its own timer, without rerunning the form
+        st.fragment(show_publishing_notice, run_every=PUBLISH_POLL_SECONDS)(content)
+    elif is_published(content):
+        st.markdown(f"🔗 [Open the validation page]({content['web_page_url']})")
+    
+    # Deduplicated reminders were published earlier; only their URLs are at hand
+    if content.get('preview_bytes') is None:
+        if content.get('reminder_image_url'):
+            st.image(content['reminder_image_url'], width='stretch')
+    else:
+        # Display reminder card
+        st.image(content['preview_bytes'], width='stretch')
+    
+    # Bodies are fetched from the shared cache (or the store) only when a download is clicked
+    from reminder_core.artifact_cache import get_artifact_cache
+    from reminder_core.encoding import profile_extension
+    artifact_cache = get_artifact_cache(SETTINGS)
+    meaningful_id = content['meaningful_id']
+    cache_key = content.get('cache_key', meaningful_id)
+    extension = profile_extension(SETTINGS.card_image_profile)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "📅 Download Calendar",
+            data=lambda: artifact_cache.get(cache_key, 'calendar_data') or '',
+            file_name=f"{meaningful_id}.ics",
+            mime="text/calendar",
+            key="download_calendar",
+            on_click="ignore"
+        )
+    with col2:
+        st.download_button(
+            "🖼️ Download Card",
+            data=lambda: artifact_cache.get(cache_key, 'reminder_image_bytes') or b'',
+            file_name=f"{meaningful_id}_reminder_image.{extension}",
+            mime=f"image/{extension}",
+            key="download_card",
+            on_click="ignore"
+        )
 
 def main():
     # Initialize session state
@@ -1111,6 +311,12 @@ def main():
         key="pet_name_input"
     )
 
+    household = st.checkbox(
+        "🏠 Several pets, one calendar (separate names with commas)",
+        value=get_form_data('household', False),
+        key="household_input"
+    )
+
     product_name = "NexGard SPECTRA"
     
     # Date Range Selection
@@ -1173,17 +379,24 @@ def main():
     if st.button("🔄 Submit", type="primary", key="submit_btn"):
         if pet_name:
             # Save form data to session state
-            save_form_data(pet_name, product_name, start_date, dosage, selected_time, notes)
+            save_form_data(pet_name, product_name, start_date, dosage, selected_time, notes, household)
             
             with st.spinner("Submitting ...."):
-                success = generate_content(pet_name, product_name, start_date, dosage, selected_time, notes)
+                success = generate_content(pet_name, product_name, start_date, dosage, selected_time, notes, household)
                 if success:
-                    st.success("✅ Calendar reminder generated successfully!  \n🔀 **Redirecting to Validation Page...**")
                     web_page_url = st.session_state.generated_content.get("web_page_url")
-                    st.markdown(f"""
-                        <meta http-equiv="refresh" content="2;url={web_page_url}">
-                            """,  
-                            unsafe_allow_html=True)
+                    if web_page_url and not st.session_state.generated_content.get("publishing"):
+                        st.success("✅ Calendar reminder generated successfully!  \n🔀 **Redirecting to Validation Page...**")
+                        st.markdown(f"""
+                            <meta http-equiv="refresh" content="2;url={web_page_url}">
+                                """,
+                                unsafe_allow_html=True)
+                    elif web_page_url:
+                        # Still spooled: the page is a 404 until the outbox uploads it
+                        st.success("✅ Calendar reminder generated successfully!  \n"
+                                   "⏳ **Publishing the Validation Page...** it is linked below once it is up.")
+                    else:
+                        st.success("✅ Calendar reminder generated successfully!")
                     
                     # Method 2: Show a redirection html block
                     
@@ -1203,8 +416,7 @@ def main():
                     #         """,  
                     #         unsafe_allow_html=True)
                     # st.session_state['redirect'] = True
-                    
-                    st.rerun()
+                    # No rerun here: it would wipe the message above before the browser shows it
         else:
             st.warning("⚠️ Please fill in Pet Name")
     
@@ -1216,6 +428,12 @@ def main():
         st.session_state.content_generated = False
         st.rerun()
     
+    # Preview and downloads of the last reminder, on the submit run and every rerun after it
+    if st.session_state.content_generated:
+        display_generated_content()
+    
 	    
 if __name__ == "__main__":
     main()
+    # Only now, with the form on its way to the browser, load what the first submit needs
+    WARMUP.start()
@@ -0,0 +1,42 @@
+"""Reminder generation building blocks shared by the Streamlit app and tooling.
+
+Importing the package is cheap and has no side effects: the public names
+below are loaded from their submodules (PIL, qrcode, icalendar, ...) on first
+access, and boto3 only when S3 is actually used.
+"""
+import importlib
+
+_EXPORTS = {
+    'Settings': 'reminder_core.config',
+    'ReminderRequest': 'reminder_core.pipeline',
+    'HouseholdRequest': 'reminder_core.pipeline',
+    'ReminderArtifacts': 'reminder_core.pipeline',
+    'ReminderGenerator': 'reminder_core.pipeline',
+    'generate_reminder': 'reminder_core.pipeline',
+    'get_generator': 'reminder_core.pipeline',
+    'render_artifacts': 'reminder_core.pipeline',
+    'create_calendar_reminder': 'reminder_core.ics',
+    'create_reminder_image': 'reminder_core.card',
+    'create_web_page_html': 'reminder_core.page',
+    'generate_qr_code': 'reminder_core.qr',
+    'generate_qr_svg': 'reminder_core.qr',
+    'ArtifactStore': 'reminder_core.stores',
+    'S3Store': 'reminder_core.stores',
+    'LocalStore': 'reminder_core.stores',
+    'MemoryStore': 'reminder_core.stores',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,211 @@
+"""Generated artifacts shared by every session, bounded by size.
+
+A Streamlit session only needs a reminder's ID, URLs, schedule and a small
+card preview to show the result; the full card, QR code, calendar and page
+are only needed when the owner downloads one of them. Sessions therefore keep
+an ``artifact_reference()`` and the bodies go into one process-wide
+ArtifactCache, a byte-bounded LRU. An evicted body is fetched back from the
+artifact store on the next download (the QR code is re-rendered from the
+reminder's calendar URL), so eviction costs a round trip, not the artifact.
+
+Bodies are keyed by reminder ID. An unpublished reminder's ID comes from a
+process-local counter and may repeat, so its bodies get a key of their own
+(see ArtifactCache.put_artifacts()) and are never looked up in the store.
+"""
+import gzip
+import io
+import threading
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+
+from PIL import Image
+
+from reminder_core.encoding import encode_image, profile_extension
+from reminder_core.metrics import REGISTRY
+from reminder_core.qr import get_qr_matrix
+from reminder_core.reminder_index import ReminderIndex
+from reminder_core.storage import calendar_key, get_artifact_store, get_publisher, reminder_keys
+from reminder_core.stores import ObjectMissing
+
+# ReminderArtifacts fields held in the cache; the text ones are str, the rest bytes
+CACHED_FIELDS = ('reminder_image_bytes', 'qr_image_bytes', 'calendar_data', 'html_content')
+TEXT_FIELDS = ('calendar_data', 'html_content')
+# Artifact kind (see storage.reminder_keys) each stored field is published as
+FIELD_KINDS = {'calendar_data': 'calendar', 'html_content': 'page', 'reminder_image_bytes': 'image'}
+# ReminderArtifacts fields a session keeps
+REFERENCE_FIELDS = (
+    'meaningful_id', 'pet_name', 'product_name', 'reminder_details', 'calendar_url', 'web_page_url',
+    'reminder_image_url', 'deduplicated'
+)
+_GZIP_MAGIC = b'\x1f\x8b'
+# Cache keys of reminders that were not published
+UNPUBLISHED_KEY_PREFIX = 'unpublished:'
+
+ARTIFACT_CACHE_REQUESTS = REGISTRY.counter(
+    'reminder_artifact_cache_requests_total', "Artifact cache reads by result (hit, loaded, miss)", ('result',)
+)
+ARTIFACT_CACHE_EVICTIONS = REGISTRY.counter(
+    'reminder_artifact_cache_evictions_total', "Artifacts evicted from the cache to stay within its byte budget"
+)
+SESSION_REFERENCE_BYTES = REGISTRY.histogram(
+    'reminder_session_reference_bytes', "Size of the reminder reference each session keeps",
+    buckets=(1024, 4096, 16384, 32768, 65536, 131072, 262144, 524288)
+)
+
+
+def _size(value):
+    return len(value.encode('utf-8')) if isinstance(value, str) else len(value)
+
+
+def reference_size(reference):
+    """Approximate bytes a reference holds (bodies and strings; container overhead is ignored)"""
+    total = 0
+    for value in reference.values():
+        if isinstance(value, (str, bytes)):
+            total += _size(value)
+        elif isinstance(value, dict):
+            total += reference_size(value)
+        elif isinstance(value, (list, tuple)):
+            total += sum(_size(item) for item in value if isinstance(item, (str, bytes)))
+    return total
+
+
+def card_preview(image_bytes, preview_profile):
+    """The smaller of the card as uploaded and the card re-encoded with ``preview_profile``"""
+    preview = encode_image(Image.open(io.BytesIO(image_bytes)), preview_profile).data
+    return preview if len(preview) < len(image_bytes) else image_bytes
+
+
+def artifact_reference(artifacts, preview_profile, cache_key=None):
+    """What a session keeps for ``artifacts``: IDs, URLs, schedule, messages, a small preview and the cache key"""
+    reference = {name: getattr(artifacts, name) for name in REFERENCE_FIELDS}
+    reference['cache_key'] = cache_key or artifacts.meaningful_id
+    reference['warnings'] = list(artifacts.warnings)
+    reference['upload_errors'] = {name: str(e) for name, e in artifacts.upload_errors.items()}
+    image_bytes = artifacts.reminder_image_bytes
+    reference['preview_bytes'] = card_preview(image_bytes, preview_profile) if image_bytes else None
+    SESSION_REFERENCE_BYTES.observe(reference_size(reference))
+    return reference
+
+
+class StoreArtifactLoader:
+    """Loads an evicted artifact back from the store by reminder ID and field name.
+
+    Keys are derived from the ID; a reminder published under another layout
+    or card format is found through ``index`` (a ReminderIndex), if given.
+    """
+
+    def __init__(self, publisher, card_image_profile, index=None):
+        self.publisher = publisher
+        self.card_image_profile = card_image_profile
+        self.index = index
+
+    def _get(self, meaningful_id, kind):
+        key = reminder_keys(meaningful_id, profile_extension(self.card_image_profile))[kind]
+        try:
+            return self.publisher.store.get(key).body
+        except ObjectMissing:
+            keys = self.index.lookup(meaningful_id) if self.index is not None else None
+            if keys is None or keys[kind] == key:
+                raise
+        return self.publisher.store.get(keys[kind]).body
+
+    def __call__(self, meaningful_id, name):
+        if meaningful_id.startswith(UNPUBLISHED_KEY_PREFIX):
+            # Never stored; its ID may name another owner's published reminder
+            return None
+        if name == 'qr_image_bytes':
+            # Published QR codes always encode the calendar URL (see render_artifacts)
+            return get_qr_matrix(self.publisher.object_url(calendar_key(meaningful_id))).to_png(box_size=12)
+        body = self._get(meaningful_id, FIELD_KINDS[name])
+        # Text artifacts are usually stored gzip-encoded; PNG and WebP never start with the gzip magic
+        if body[:2] == _GZIP_MAGIC:
+            body = gzip.decompress(body)
+        return body.decode('utf-8') if name in TEXT_FIELDS else body
+
+
+class ArtifactCache:
+    """Thread-safe LRU of artifact bodies keyed by (reminder ID, field), bounded by total bytes"""
+
+    def __init__(self, max_bytes, loader=None):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counts = {'hit': 0, 'loaded': 0, 'miss': 0, 'evicted': 0}
+
+    def put(self, meaningful_id, name, value):
+        """Cache one body; bodies larger than the whole budget are not kept"""
+        size = _size(value)
+        if size > self.max_bytes:
+            return
+        key = (meaningful_id, name)
+        evicted = 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= _size(previous)
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, dropped = self._entries.popitem(last=False)
+                self._bytes -= _size(dropped)
+                evicted += 1
+            self._counts['evicted'] += evicted
+        if evicted:
+            ARTIFACT_CACHE_EVICTIONS.inc(evicted)
+
+    def put_artifacts(self, artifacts):
+        """Cache every body ReminderArtifacts carries (deduplicated ones carry none); returns their cache key"""
+        key = artifacts.meaningful_id if artifacts.calendar_url else UNPUBLISHED_KEY_PREFIX + uuid.uuid4().hex
+        for name in CACHED_FIELDS:
+            value = getattr(artifacts, name)
+            if value is not None:
+                self.put(key, name, value)
+        return key
+
+    def _count(self, result):
+        with self._lock:
+            self._counts[result] += 1
+        ARTIFACT_CACHE_REQUESTS.inc(result=result)
+
+    def get(self, meaningful_id, name):
+        """The body, from the cache or else the loader; None if neither has it"""
+        key = (meaningful_id, name)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        if value is not None:
+            self._count('hit')
+            return value
+        try:
+            value = self.loader(meaningful_id, name) if self.loader else None
+        except Exception:
+            # Not published (S3 was down) or not reachable right now
+            value = None
+        if value is None:
+            self._count('miss')
+            return None
+        self._count('loaded')
+        self.put(meaningful_id, name, value)
+        return value
+
+    def stats(self):
+        """Entry and byte counts, read counts and the hit rate for this process"""
+        with self._lock:
+            counts = dict(self._counts)
+            entries, size = len(self._entries), self._bytes
+        reads = counts['hit'] + counts['loaded'] + counts['miss']
+        return {**counts, 'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes, 'reads': reads,
+                'hit_rate': counts['hit'] / reads if reads else 0.0}
+
+
+@lru_cache(maxsize=None)
+def get_artifact_cache(settings):
+    """Process-wide cache for ``settings``, reloading evicted artifacts from the configured store"""
+    index = ReminderIndex(get_artifact_store(settings)) if settings.reminder_index_enabled else None
+    loader = StoreArtifactLoader(get_publisher(settings), settings.card_image_profile, index)
+    return ArtifactCache(settings.artifact_cache_mb * 1024 * 1024, loader)
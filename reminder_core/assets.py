@@ -0,0 +1,173 @@
+"""Process-level cache of the fonts and logos used to render reminder cards.
+
+Font lookup probes a list of well-known paths; doing that and parsing the
+TrueType file on every render is wasted work, as is decoding and LANCZOS
+scaling the logo. RenderAssets resolves everything once, keeps the results
+for the life of the process and drops them again when one of the files it
+depends on changes on disk.
+"""
+import os
+import threading
+from collections import namedtuple
+from time import monotonic
+
+from PIL import Image, ImageFont
+
+ASSET_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FONT_CANDIDATES = (
+    # Common Windows fonts
+    "C:/Windows/Fonts/arial.ttf",
+    "C:/Windows/Fonts/calibri.ttf",
+    "C:/Windows/Fonts/segoeui.ttf",
+    # Common macOS fonts
+    "/System/Library/Fonts/Arial.ttf",
+    "/System/Library/Fonts/Helvetica.ttc",
+    # Common Linux fonts
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/arial.ttf",
+    # Streamlit Cloud / Ubuntu fonts
+    "/usr/share/fonts/truetype/ubuntu/Ubuntu-R.ttf",
+    "/usr/share/fonts/truetype/ubuntu/Ubuntu-B.ttf",
+)
+
+# Card logo first, the header logo as a fallback
+LOGO_CANDIDATES = (
+    os.path.join(ASSET_DIR, "BI-Logo-2.png"),
+    os.path.join(ASSET_DIR, "BI-Logo.png"),
+)
+
+CARD_LOGO_SIZE = 172
+CARD_FONT_SIZES = (48, 32, 24, 20, 18)
+
+# Scaled logo ready to paste; mask is None for logos without transparency
+CardLogo = namedtuple('CardLogo', ['image', 'mask', 'path'])
+
+_UNRESOLVED = object()
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class RenderAssets:
+    """Thread-safe registry of resolved fonts and the pre-scaled card logo"""
+
+    def __init__(self, font_candidates=FONT_CANDIDATES, logo_candidates=LOGO_CANDIDATES,
+                 logo_size=CARD_LOGO_SIZE, check_interval=5.0):
+        self.font_candidates = tuple(font_candidates)
+        self.logo_candidates = tuple(logo_candidates)
+        self.logo_size = logo_size
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._last_check = monotonic()
+        self._clear()
+
+    def _clear(self):
+        self._font_path = _UNRESOLVED
+        self._fonts = {}
+        self._logo = _UNRESOLVED
+        self._stamps = self._watched_stamps()
+
+    def _watched_stamps(self):
+        paths = self.logo_candidates
+        if isinstance(self._font_path, str):
+            paths += (self._font_path,)
+        return {path: _file_stamp(path) for path in paths}
+
+    def font_path(self):
+        """Path of the first usable TrueType font, or None to use PIL's default font"""
+        with self._lock:
+            if self._font_path is _UNRESOLVED:
+                self._font_path = None
+                for path in self.font_candidates:
+                    if not os.path.exists(path):
+                        continue
+                    try:
+                        font = ImageFont.truetype(path, CARD_FONT_SIZES[-1])
+                    except Exception:
+                        continue
+                    self._font_path = path
+                    self._fonts[(path, CARD_FONT_SIZES[-1])] = font
+                    break
+                self._stamps = self._watched_stamps()
+            return self._font_path
+
+    def font(self, size):
+        """Return a cached font of the given pixel size"""
+        path = self.font_path()
+        with self._lock:
+            font = self._fonts.get((path, size))
+            if font is None:
+                font = ImageFont.truetype(path, size) if path else ImageFont.load_default()
+                self._fonts[(path, size)] = font
+            return font
+
+    def card_logo(self):
+        """Return the decoded logo scaled to fit the card's logo box, or None"""
+        with self._lock:
+            if self._logo is _UNRESOLVED:
+                self._logo = self._load_logo()
+            return self._logo
+
+    def _load_logo(self):
+        for path in self.logo_candidates:
+            if not os.path.exists(path):
+                continue
+            try:
+                with Image.open(path) as source:
+                    logo = source.copy()
+                # Use thumbnail to maintain aspect ratio properly
+                logo.thumbnail((self.logo_size, self.logo_size), Image.Resampling.LANCZOS)
+            except Exception as e:
+                print(f"Error loading {os.path.basename(path)}: {e}")
+                continue
+            if logo.mode == 'RGBA':
+                return CardLogo(logo.convert('RGB'), logo.getchannel('A'), path)
+            return CardLogo(logo, None, path)
+        return None
+
+    def warm(self, sizes=CARD_FONT_SIZES):
+        """Resolve the font, load every card font size and the logo ahead of the first render"""
+        for size in sizes:
+            self.font(size)
+        self.card_logo()
+
+    def add_invalidation_listener(self, callback):
+        """Call ``callback()`` whenever cached assets are dropped because files changed"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def invalidate(self):
+        """Drop every cached asset and notify listeners"""
+        with self._lock:
+            self._clear()
+            listeners = list(self._listeners)
+        for callback in listeners:
+            callback()
+
+    def check_for_changes(self, force=False):
+        """Invalidate if a watched asset file changed; stats at most once per check_interval"""
+        now = monotonic()
+        with self._lock:
+            if not force and now - self._last_check < self.check_interval:
+                return False
+            self._last_check = now
+            changed = self._watched_stamps() != self._stamps
+        if changed:
+            self.invalidate()
+        return changed
+
+
+_render_assets = RenderAssets()
+
+
+def get_render_assets():
+    """Process-wide asset registry"""
+    return _render_assets
@@ -0,0 +1,256 @@
+"""The shareable reminder card: a 1200x800 business-card style PNG.
+
+The static layer (gradient, border, logo, labels, QR backing and corner
+accents) is rendered once per process and theme; each request copies it and
+draws only its own text and QR code.
+"""
+import threading
+
+from PIL import Image, ImageDraw, ImageFont
+
+from reminder_core.assets import CARD_LOGO_SIZE, get_render_assets
+from reminder_core.gradient import linear_gradient
+from reminder_core.text_layout import get_text_layout
+
+
+def get_fallback_font(size):
+    """Get the best available font for the system (cached per process)"""
+    return get_render_assets().font(size)
+
+
+# Business card dimensions (landscape orientation for sharing)
+CARD_WIDTH, CARD_HEIGHT = 1200, 800
+
+# Colors matching your web design
+CARD_THEMES = {
+    'spectra': {
+        'background': (8, 49, 42),  # #08312a
+        'gradient_end': (10, 61, 51),  # #0a3d33
+        'gradient_direction': 'down',
+        'accent': (0, 228, 124),  # #00e47c
+        'text': (255, 255, 255)  # white
+    }
+}
+DEFAULT_CARD_THEME = 'spectra'
+
+# Card layout shared by the static template and the per-request text
+CARD_LEFT_X = 60
+CARD_PET_Y = 180  # Reduced from higher value
+CARD_PRODUCT_Y = CARD_PET_Y + 60  # Reduced spacing
+CARD_DETAILS_Y = CARD_PRODUCT_Y + 60  # Reduced spacing
+CARD_DETAIL_LINES = 6
+CARD_TIMES_Y = CARD_DETAILS_Y + CARD_DETAIL_LINES * 25 + 15  # Reduced spacing
+CARD_NOTES_Y = CARD_TIMES_Y + 80  # Adjusted spacing for new layout
+CARD_QR_SIZE = 280  # Slightly larger QR code
+CARD_QR_X = (CARD_WIDTH // 2 + 50) + ((CARD_WIDTH // 2 - 100) - CARD_QR_SIZE) // 2  # Center QR code in right section
+CARD_QR_Y = (CARD_HEIGHT - CARD_QR_SIZE) // 2 - 20  # Better centering
+CARD_QR_PADDING = 25
+CARD_CORNER_SIZE = 100
+# Text stops short of the QR backing; names shrink and notes wrap to stay inside
+CARD_TEXT_RIGHT = CARD_QR_X - CARD_QR_PADDING - 20
+CARD_PET_SIZES = tuple(range(48, 27, -2))
+CARD_PRODUCT_SIZES = tuple(range(32, 19, -2))
+CARD_NOTES_X = CARD_LEFT_X + 20
+CARD_NOTES_SIZES = (18, 17, 16, 15, 14)
+CARD_NOTE_LINES = 4
+CARD_NOTE_LINE_SPACING = 6
+
+
+def get_card_fonts():
+    """Fonts used on the reminder card, keyed by role"""
+    # Get fallback fonts with better sizing for cloud deployment
+    try:
+        return {
+            'large': get_fallback_font(48),
+            'title': get_fallback_font(32),
+            'subtitle': get_fallback_font(24),
+            'detail': get_fallback_font(20),
+            'small': get_fallback_font(18)
+        }
+    except Exception as e:
+        # Ultimate fallback - use default font
+        base_font = ImageFont.load_default()
+        return dict.fromkeys(['large', 'title', 'subtitle', 'detail', 'small'], base_font)
+
+
+def draw_card_background(img, draw, theme, fonts, with_notes):
+    """Draw the parts of the card that never change: gradient, border, logo and labels"""
+    width, height = img.size
+
+    # Draw gradient background effect
+    img.paste(linear_gradient(img.size, theme['background'], theme['gradient_end'], theme['gradient_direction']), (0, 0))
+
+    # Draw decorative border
+    border_width = 8
+    draw.rectangle([0, 0, width-1, height-1], outline=theme['accent'], width=border_width)
+
+    # Draw BI Logo at top left corner (BIGGER and better handling)
+    logo_size = CARD_LOGO_SIZE  # Increased from 70 to 120
+    logo_x = 30
+    logo_y = 30
+
+    logo = get_render_assets().card_logo()
+    if logo is not None:
+        actual_w, actual_h = logo.image.size
+
+        # Center the logo in the allocated space if it's smaller
+        center_x = logo_x + (logo_size - actual_w) // 2
+        center_y = logo_y + (logo_size - actual_h) // 2
+
+        img.paste(logo.image, (center_x, center_y), logo.mask)
+    else:
+        # Fallback: draw simple text instead of emoji
+        draw.text((logo_x, logo_y), "BI", fill=theme['accent'], font=fonts['large'])
+
+    # Section labels - REPLACE ICONS WITH TEXT
+    draw.text((CARD_LEFT_X, CARD_TIMES_Y), "Reminder Time:", fill=theme['accent'], font=fonts['detail'])
+    if with_notes:
+        draw.text((CARD_LEFT_X, CARD_NOTES_Y), "Additional Notes:", fill=theme['accent'], font=fonts['detail'])
+
+
+def draw_card_overlays(draw, theme):
+    """Draw the static elements that sit above the text and return their boxes"""
+    width, height = CARD_WIDTH, CARD_HEIGHT
+
+    # Draw QR code background (white rounded rectangle)
+    qr_bg_rect = [CARD_QR_X - CARD_QR_PADDING, CARD_QR_Y - CARD_QR_PADDING,
+                  CARD_QR_X + CARD_QR_SIZE + CARD_QR_PADDING, CARD_QR_Y + CARD_QR_SIZE + CARD_QR_PADDING]
+    draw.rectangle(qr_bg_rect, fill=theme['text'], outline=theme['accent'], width=3)
+
+    # Add decorative elements
+    # Top right corner accent
+    corner_size = CARD_CORNER_SIZE
+    top_right = [width - corner_size, 0, width, corner_size]
+    draw.rectangle(top_right, fill=theme['accent'])
+
+    # Bottom left corner accent
+    bottom_left = [0, height - corner_size, corner_size, height]
+    draw.rectangle(bottom_left, fill=theme['accent'])
+
+    # Rectangles include their end coordinates; crop boxes do not
+    return [(x0, y0, min(x1 + 1, width), min(y1 + 1, height)) for x0, y0, x1, y1 in (qr_bg_rect, top_right, bottom_left)]
+
+
+def draw_card_text(draw, theme, fonts, pet_name, product_name, reminder_details):
+    """Draw the per-request text: pet, product, schedule details, time and notes"""
+    text_color = theme['text']
+    left_x = CARD_LEFT_X
+
+    layout = get_text_layout()
+
+    # Pet name (move up to reduce space), shrunk to fit and kept centred in its row
+    pet = layout.fit_line(pet_name.upper(), CARD_TEXT_RIGHT - left_x, CARD_PET_SIZES)
+    pet_y = CARD_PET_Y + (CARD_PET_SIZES[0] - pet.size) // 2
+    draw.text((left_x, pet_y), pet.lines[0], fill=theme['accent'], font=pet.font)
+
+    # Product name (tighter spacing)
+    product = layout.fit_line('('+product_name+')', CARD_TEXT_RIGHT - left_x, CARD_PRODUCT_SIZES)
+    product_y = CARD_PRODUCT_Y + (CARD_PRODUCT_SIZES[0] - product.size) // 2
+    draw.text((left_x, product_y), product.lines[0], fill=text_color, font=product.font)
+
+    # Format frequency better
+    frequency_text = reminder_details['frequency']
+
+    details = [
+        f" ",
+        f"• Frequency: {frequency_text}",
+        f"• Starts: {reminder_details['start_date']}",
+        f"• Duration: {reminder_details['duration']}",
+        f"• Total: {reminder_details['total_reminders']} reminders",
+        f" "
+    ]
+
+    for i, detail in enumerate(details):
+        draw.text((left_x, CARD_DETAILS_Y + i * 25), detail, fill=text_color, font=fonts['detail'])
+
+    times_text = reminder_details['times']
+    draw.text((left_x + 20, CARD_TIMES_Y + 30), f"{times_text}", fill=text_color, font=fonts['small'])
+
+    if card_has_notes(reminder_details):
+        # Wrap notes text, shrinking it if it needs more than CARD_NOTE_LINES lines
+        notes = layout.fit_lines(reminder_details['notes'], CARD_TEXT_RIGHT - CARD_NOTES_X, CARD_NOTE_LINES,
+                                 CARD_NOTES_SIZES)
+        for i, line in enumerate(notes.lines):
+            y = CARD_NOTES_Y + 30 + i * (notes.size + CARD_NOTE_LINE_SPACING)
+            draw.text((CARD_NOTES_X, y), line, fill=text_color, font=notes.font)
+
+
+def card_has_notes(reminder_details):
+    return bool(reminder_details.get('notes') and reminder_details['notes'].strip())
+
+
+_card_templates = {}
+_card_templates_lock = threading.Lock()
+
+
+def get_card_template(theme_name, with_notes):
+    """Static layer of the card, rendered once per process, theme and notes layout.
+
+    Returns the base image plus patches of the elements that are drawn above
+    the text, so long text gets clipped by them exactly as before.
+    """
+    key = (theme_name, with_notes)
+    with _card_templates_lock:
+        template = _card_templates.get(key)
+    if template is None:
+        template = render_card_template(theme_name, with_notes)
+        with _card_templates_lock:
+            template = _card_templates.setdefault(key, template)
+    return template
+
+
+def clear_card_templates():
+    """Drop cached templates; they bake in the fonts and logo"""
+    with _card_templates_lock:
+        _card_templates.clear()
+
+
+def render_card_template(theme_name, with_notes):
+    theme = CARD_THEMES[theme_name]
+    fonts = get_card_fonts()
+    img = Image.new('RGB', (CARD_WIDTH, CARD_HEIGHT), theme['background'])
+    draw = ImageDraw.Draw(img)
+    draw_card_background(img, draw, theme, fonts, with_notes)
+    overlay_boxes = draw_card_overlays(draw, theme)
+    return {
+        'image': img,
+        'overlays': [(box, img.crop(box)) for box in overlay_boxes]
+    }
+
+
+def create_reminder_image(pet_name, product_name, reminder_details, qr_matrix,
+                          theme_name=DEFAULT_CARD_THEME, use_template=True):
+    """Create a professional business card style reminder image with cloud-compatible fonts.
+
+    The static layer comes from get_card_template(); ``use_template=False``
+    draws every layer from scratch instead, for benchmarks and comparisons.
+    """
+    theme = CARD_THEMES[theme_name]
+    with_notes = card_has_notes(reminder_details)
+
+    # Pick up replaced font/logo files without restarting the server
+    get_render_assets().check_for_changes()
+    fonts = get_card_fonts()
+
+    if use_template:
+        template = get_card_template(theme_name, with_notes)
+        img = template['image'].copy()
+        draw = ImageDraw.Draw(img)
+        draw_card_text(draw, theme, fonts, pet_name, product_name, reminder_details)
+        # Restore the elements that sit above the text
+        for box, patch in template['overlays']:
+            img.paste(patch, box[:2])
+    else:
+        img = Image.new('RGB', (CARD_WIDTH, CARD_HEIGHT), theme['background'])
+        draw = ImageDraw.Draw(img)
+        draw_card_background(img, draw, theme, fonts, with_notes)
+        draw_card_text(draw, theme, fonts, pet_name, product_name, reminder_details)
+        draw_card_overlays(draw, theme)
+
+    # Rasterize the QR code straight to its card size (whole-pixel modules)
+    img.paste(qr_matrix.to_image(pixel_size=CARD_QR_SIZE), (CARD_QR_X, CARD_QR_Y))
+
+    return img
+
+# Card templates go stale together with the assets they were drawn with
+get_render_assets().add_invalidation_listener(clear_card_templates)
@@ -0,0 +1,78 @@
+"""Runtime settings for reminder generation.
+
+Settings are read from a plain mapping (environment variables by default), so
+the core never touches Streamlit. The app passes its secrets in on top of the
+environment.
+"""
+import os
+from dataclasses import dataclass, field
+
+from reminder_core.id_allocator import DEFAULT_BLOCK_SIZE
+
+
+def _flag(value):
+    """Boolean from a setting such as 'true', '0' or an actual bool"""
+    return str(value).strip().lower() not in ('0', 'false', 'no', 'off', '')
+
+
+@dataclass(frozen=True)
+class Settings:
+    aws_region: str = 'us-east-1'
+    s3_bucket: str = 'pet-reminder'
+    # Where artifacts are stored: 's3', 'local' (files under local_store_path) or 'memory'
+    storage_backend: str = 's3'
+    local_store_path: str = 'published'
+    # Public URL prefix for the local and memory backends (local defaults to file:// URLs)
+    store_base_url: str = None
+    aws_access_key_id: str = field(default=None, repr=False)
+    aws_secret_access_key: str = field(default=None, repr=False)
+    # How long a connectivity check result is trusted before it is refreshed
+    s3_health_ttl_seconds: int = 300
+    # Number of IDs each server process reserves from the S3 counter at a time
+    id_lease_block_size: int = DEFAULT_BLOCK_SIZE
+    # Concurrent PUTs allowed across all sessions of this process
+    s3_upload_workers: int = 8
+    # Encoding profiles (see reminder_core.encoding) for the uploaded card and the in-app preview
+    card_image_profile: str = 'png-palette'
+    card_preview_profile: str = 'webp-lossless'
+    # Byte budget of the process-wide cache of generated artifacts sessions download from
+    artifact_cache_mb: int = 64
+    # Store text artifacts gzip-encoded, plus brotli copies at <key>.br (needs the brotli package)
+    compress_uploads: bool = True
+    brotli_variants: bool = False
+    # Return the already published reminder for identical submissions
+    dedup_enabled: bool = True
+    # Record published reminders in the sharded ID / pet index (see reminder_core.reminder_index)
+    reminder_index_enabled: bool = True
+    # Prometheus textfile the metrics are written to (disabled when unset), and how often
+    metrics_textfile: str = None
+    metrics_interval_seconds: int = 15
+    # SQLite spool uploads are written to and drained from in the background (uploads are inline when unset)
+    upload_outbox_path: str = None
+
+    @classmethod
+    def from_mapping(cls, values=None):
+        """Build settings from environment-style keys, e.g. ``S3_BUCKET_NAME``"""
+        values = os.environ if values is None else values
+        return cls(
+            aws_region=values.get('AWS_REGION', cls.aws_region),
+            s3_bucket=values.get('S3_BUCKET_NAME', cls.s3_bucket),
+            storage_backend=values.get('STORAGE_BACKEND', cls.storage_backend).strip().lower(),
+            local_store_path=values.get('LOCAL_STORE_PATH', cls.local_store_path),
+            store_base_url=values.get('STORE_BASE_URL') or None,
+            aws_access_key_id=values.get('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=values.get('AWS_SECRET_ACCESS_KEY'),
+            s3_health_ttl_seconds=int(values.get('S3_HEALTH_TTL_SECONDS', cls.s3_health_ttl_seconds)),
+            id_lease_block_size=int(values.get('ID_LEASE_BLOCK_SIZE', cls.id_lease_block_size)),
+            s3_upload_workers=int(values.get('S3_UPLOAD_WORKERS', cls.s3_upload_workers)),
+            card_image_profile=values.get('CARD_IMAGE_PROFILE', cls.card_image_profile),
+            card_preview_profile=values.get('CARD_PREVIEW_PROFILE', cls.card_preview_profile),
+            artifact_cache_mb=int(values.get('ARTIFACT_CACHE_MB', cls.artifact_cache_mb)),
+            compress_uploads=_flag(values.get('COMPRESS_UPLOADS', cls.compress_uploads)),
+            brotli_variants=_flag(values.get('BROTLI_VARIANTS', cls.brotli_variants)),
+            dedup_enabled=_flag(values.get('DEDUP_ENABLED', cls.dedup_enabled)),
+            reminder_index_enabled=_flag(values.get('REMINDER_INDEX_ENABLED', cls.reminder_index_enabled)),
+            metrics_textfile=values.get('METRICS_TEXTFILE') or None,
+            metrics_interval_seconds=int(values.get('METRICS_INTERVAL_SECONDS', cls.metrics_interval_seconds)),
+            upload_outbox_path=values.get('UPLOAD_OUTBOX_PATH') or None,
+        )
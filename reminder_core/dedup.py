@@ -0,0 +1,134 @@
+"""Content-addressed deduplication of published reminders.
+
+A reminder is fully determined by its request and the card encoding, so the
+SHA-256 of the normalized request identifies it. Once a reminder is
+published, an entry with its ID and URLs is stored at
+``dedup/{fingerprint}.json`` in the artifact store. An identical submission, from
+this process or any other, then gets the existing reminder back without
+allocating an ID, rendering or uploading anything.
+"""
+import hashlib
+import json
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from reminder_core.metrics import REGISTRY
+from reminder_core.stores import ObjectMissing, PreconditionFailed
+
+DEDUP_PREFIX = 'dedup/'
+# Bump when rendering changes so old entries stop matching
+FINGERPRINT_VERSION = 1
+# Fields stored in an entry and copied back onto the artifacts on a hit
+ENTRY_FIELDS = ('meaningful_id', 'calendar_url', 'web_page_url', 'reminder_image_url', 'reminder_details')
+
+DEDUP_LOOKUPS = REGISTRY.counter(
+    'reminder_dedup_lookups_total', "Deduplication lookups by result (local_hit, remote_hit, miss)", ('result',)
+)
+
+
+def _normalize(value):
+    return unicodedata.normalize('NFC', str(value or '')).strip()
+
+
+def _request_fields(request):
+    return [
+        _normalize(request.pet_name),
+        _normalize(request.product_name),
+        request.start_date.isoformat(),
+        int(request.dosage),
+        _normalize(request.selected_time),
+        _normalize(request.notes),
+    ]
+
+
+def request_fingerprint(request, image_profile):
+    """Hex SHA-256 of everything that determines a reminder's (or a household's) artifacts"""
+    pets = getattr(request, 'pets', None)
+    if pets is None:
+        fields = _request_fields(request)
+    else:
+        fields = ['household', _normalize(request.household_name), [_request_fields(pet) for pet in pets]]
+    payload = json.dumps([FINGERPRINT_VERSION, *fields, image_profile], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def dedup_key(fingerprint):
+    return f"{DEDUP_PREFIX}{fingerprint}.json"
+
+
+class DedupIndex:
+    """Fingerprint -> published reminder, from a bounded local LRU backed by the artifact store"""
+
+    def __init__(self, store, max_local_entries=10000):
+        self.store = store
+        self.max_local_entries = max_local_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {'local_hit': 0, 'remote_hit': 0, 'miss': 0}
+
+    def _remember(self, fingerprint, entry):
+        with self._lock:
+            self._entries[fingerprint] = entry
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_local_entries:
+                self._entries.popitem(last=False)
+
+    def _count(self, result):
+        with self._lock:
+            self._counts[result] += 1
+        DEDUP_LOOKUPS.inc(result=result)
+
+    def _fetch(self, fingerprint):
+        try:
+            stored = self.store.get(dedup_key(fingerprint))
+        except ObjectMissing:
+            return None
+        return json.loads(stored.body.decode('utf-8'))
+
+    def lookup(self, fingerprint):
+        """The stored entry for ``fingerprint``, or None.
+
+        Store errors count as a miss: deduplication must never block a submit.
+        """
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                self._entries.move_to_end(fingerprint)
+        if entry is not None:
+            self._count('local_hit')
+            return entry
+        try:
+            entry = self._fetch(fingerprint)
+        except Exception:
+            entry = None
+        if entry is None:
+            self._count('miss')
+            return None
+        self._remember(fingerprint, entry)
+        self._count('remote_hit')
+        return entry
+
+    def record(self, fingerprint, entry):
+        """Store the entry for a newly published reminder.
+
+        When identical requests race, the first entry written wins and later
+        lookups everywhere return that one. Failures are ignored, as in lookup().
+        """
+        body = json.dumps(entry, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        try:
+            self.store.put(dedup_key(fingerprint), body, 'application/json', if_none_match=True)
+        except PreconditionFailed:
+            # Another writer won; let the next lookup load its entry
+            return
+        except Exception:
+            pass
+        self._remember(fingerprint, entry)
+
+    def stats(self):
+        """Lookup counts and the overall hit rate for this process"""
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = sum(counts.values())
+        hits = counts['local_hit'] + counts['remote_hit']
+        return {**counts, 'lookups': lookups, 'hit_rate': hits / lookups if lookups else 0.0}
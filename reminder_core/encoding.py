@@ -0,0 +1,49 @@
+"""Encoding profiles for the reminder card and QR images.
+
+Each profile trades encoded size against encode CPU differently. Run
+``python -m benchmarks.bench_encoding`` for a size/time report on real cards.
+"""
+import io
+from collections import namedtuple
+
+from PIL import Image
+
+EncodedImage = namedtuple('EncodedImage', ['data', 'content_type', 'extension'])
+
+ENCODING_PROFILES = {
+    # Full-colour PNG with zlib's default level
+    'png': {'format': 'PNG', 'params': {}},
+    # Fastest PNG; larger files
+    'png-fast': {'format': 'PNG', 'params': {'compress_level': 1}},
+    # Full-colour PNG with the best zlib settings PIL can find
+    'png-optimized': {'format': 'PNG', 'params': {'optimize': True}},
+    # Adaptive 256-colour palette: exact for flat artwork like QR codes,
+    # near-lossless for the card (only text antialiasing gets quantized)
+    'png-palette': {'format': 'PNG', 'params': {'optimize': True}, 'palette': True},
+    # Lossless WebP, used for in-app previews
+    'webp-lossless': {'format': 'WEBP', 'params': {'lossless': True, 'quality': 80, 'method': 4}},
+}
+
+_CONTENT_TYPES = {'PNG': ('image/png', 'png'), 'WEBP': ('image/webp', 'webp')}
+
+
+def profile_extension(profile):
+    """File extension of images encoded with ``profile``"""
+    return _CONTENT_TYPES[ENCODING_PROFILES[profile]['format']][1]
+
+
+def encode_image(img, profile='png', dpi=(300, 300)):
+    """Encode a PIL image with the named profile and return an EncodedImage"""
+    try:
+        spec = ENCODING_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown encoding profile {profile!r}; choose from {', '.join(ENCODING_PROFILES)}")
+    if spec.get('palette') and img.mode not in ('P', 'L', '1'):
+        img = img.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+    params = dict(spec['params'])
+    if spec['format'] == 'PNG' and dpi:
+        params['dpi'] = dpi
+    img_buffer = io.BytesIO()
+    img.save(img_buffer, format=spec['format'], **params)
+    content_type, extension = _CONTENT_TYPES[spec['format']]
+    return EncodedImage(img_buffer.getvalue(), content_type, extension)
@@ -0,0 +1,184 @@
+"""iCalendar (RFC 5545) files for monthly medication reminders.
+
+Every reminder has the same shape (one VEVENT with a monthly RRULE and one
+DISPLAY alarm), so ``create_calendar_reminder`` writes the text directly from
+a fixed line layout, with TEXT escaping and 75-octet folding done the way
+``icalendar`` does them. ``create_calendar_reminder_reference`` keeps the
+``icalendar`` object-graph implementation as the reference the fast writer
+is checked against (see ``benchmarks/bench_ics.py``). Households get one
+file with such an event per pet from ``create_household_calendar``.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+PRODID = '-//Pet Medication Reminder//Boehringer Ingelheim//EN'
+ALARM_TRIGGER = '-PT15M'  # 15 minutes before
+FOLD_LIMIT = 75
+
+_CALENDAR_HEADER = (
+    'BEGIN:VCALENDAR',
+    'VERSION:2.0',
+    f'PRODID:{PRODID}',
+    'CALSCALE:GREGORIAN',
+    'METHOD:PUBLISH',
+)
+_ALARM_HEADER = ('BEGIN:VALARM', 'ACTION:DISPLAY')
+_EVENT_FOOTER = (f'TRIGGER:{ALARM_TRIGGER}', 'END:VALARM', 'END:VEVENT')
+_CALENDAR_FOOTER = ('END:VCALENDAR',)
+
+
+def escape_text(text):
+    """Escape a TEXT value (RFC 5545 section 3.3.11); order matters to avoid double escaping"""
+    return (
+        text.replace(r"\N", "\n")
+        .replace("\\", "\\\\")
+        .replace(";", r"\;")
+        .replace(",", r"\,")
+        .replace("\r\n", r"\n")
+        .replace("\n", r"\n")
+        .replace("\r", r"\n")
+    )
+
+
+def fold_line(line, limit=FOLD_LIMIT):
+    """Fold a content line so no physical line reaches ``limit`` octets.
+
+    Multi-byte characters are never split, and an escape backslash is moved
+    to the next line together with the character it escapes.
+    """
+    if len(line) < limit and (line.isascii() or len(line.encode('utf-8')) < limit):
+        return line
+    folded, current, byte_count = [], [], 0
+    for char in line:
+        char_bytes = 1 if char < '\x80' else len(char.encode('utf-8'))
+        if current and byte_count + char_bytes >= limit:
+            if len(current) > 1 and current[-1] in '\\^':
+                escaped_prefix = current.pop()
+                folded.append(''.join(current))
+                current, byte_count = [escaped_prefix], 1
+            else:
+                folded.append(''.join(current))
+                current, byte_count = [], 0
+        current.append(char)
+        byte_count += char_bytes
+    if current:
+        folded.append(''.join(current))
+    return '\r\n '.join(folded)
+
+
+def _utc_stamp(value):
+    """DTSTAMP text; naive datetimes are taken as UTC, like icalendar does"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event_description(pet_name, product_name, reminder_time, notes):
+    if reminder_time == '':
+        return f"NexGard reminver: {product_name}\nPet: {pet_name}\n{notes}"
+    return f"Nexgard reminder: {product_name}\nPet: {pet_name}\nTime: {reminder_time}\n{notes}"
+
+
+def _event_lines(pet_name, product_name, dosage, reminder_time, start_date, notes, uid, dtstamp):
+    """Content lines of one VEVENT, from BEGIN:VEVENT to END:VEVENT"""
+    if reminder_time == '':
+        dtstart = start_date.strftime('%Y%m%d')
+        dtend = (start_date + timedelta(days=1)).strftime('%Y%m%d')
+    else:
+        start_time = datetime.combine(start_date, datetime.strptime(reminder_time, "%H:%M").time())
+        dtstart = start_time.strftime('%Y%m%dT%H%M%S')
+        dtend = (start_time + timedelta(hours=1)).strftime('%Y%m%dT%H%M%S')
+
+    rrule = f'FREQ=MONTHLY;COUNT={dosage}' if dosage > 0 else 'FREQ=MONTHLY'
+    return (
+        'BEGIN:VEVENT',
+        fold_line('SUMMARY:' + escape_text(f"{pet_name} - {product_name}")),
+        'DTSTART:' + dtstart,
+        'DTEND:' + dtend,
+        'DTSTAMP:' + _utc_stamp(dtstamp or datetime.now()),
+        fold_line('UID:' + escape_text(uid or str(uuid.uuid4()))),
+        'RRULE:' + rrule,
+        fold_line('DESCRIPTION:' + escape_text(_event_description(pet_name, product_name, reminder_time, notes))),
+        *_ALARM_HEADER,
+        fold_line('DESCRIPTION:' + escape_text(f'Time to give {product_name} to {pet_name}!')),
+        *_EVENT_FOOTER,
+    )
+
+
+def create_calendar_reminder(pet_name, product_name, dosage, reminder_time, start_date, notes="", uid=None,
+                             dtstamp=None):
+    """Build a monthly recurring event (``dosage`` occurrences) with a display alarm"""
+    lines = (
+        *_CALENDAR_HEADER,
+        *_event_lines(pet_name, product_name, dosage, reminder_time, start_date, notes, uid, dtstamp),
+        *_CALENDAR_FOOTER,
+    )
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def create_household_calendar(pets, uids=None, dtstamp=None):
+    """One calendar with a recurring event and alarm per pet.
+
+    ``pets`` are ReminderRequest-like objects (pet_name, product_name, dosage,
+    selected_time, start_date, notes); ``uids`` optionally fixes each event's UID.
+    """
+    dtstamp = dtstamp or datetime.now()
+    uids = uids or [None] * len(pets)
+    lines = list(_CALENDAR_HEADER)
+    for pet, uid in zip(pets, uids):
+        lines.extend(_event_lines(pet.pet_name, pet.product_name, pet.dosage, pet.selected_time, pet.start_date,
+                                  pet.notes, uid, dtstamp))
+    lines.extend(_CALENDAR_FOOTER)
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def create_calendar_reminder_reference(pet_name, product_name, dosage, reminder_time, start_date, notes="", uid=None,
+                                       dtstamp=None):
+    """The same calendar built with icalendar; slower, kept to verify create_calendar_reminder()"""
+    from icalendar import Alarm, Calendar, Event, vDate
+
+    # Calculate reminder count for RRULE
+    reminder_count = dosage
+
+    # Create calendar
+    cal = Calendar()
+    cal.add('prodid', PRODID)
+    cal.add('version', '2.0')
+    cal.add('calscale', 'GREGORIAN')
+    cal.add('method', 'PUBLISH')
+
+    # Create event
+    event = Event()
+    event_title = f"{pet_name} - {product_name}"
+
+    event.add('summary', event_title)
+    event.add('description', _event_description(pet_name, product_name, reminder_time, notes))
+
+    if reminder_time == '':
+        event.add('dtstart', vDate(start_date))
+        event.add('dtend', vDate(start_date + timedelta(days=1)))
+    else:
+        start_time = datetime.combine(start_date, datetime.strptime(reminder_time, "%H:%M").time())
+        event.add('dtstart', start_time)
+        event.add('dtend', start_time + timedelta(hours=1))
+    event.add('dtstamp', dtstamp or datetime.now())
+    event.add('uid', uid or str(uuid.uuid4()))
+
+    # Add recurrence rule with count limit
+    rrule = {}
+    rrule['freq'] = 'monthly'
+
+    if reminder_count > 0:
+        rrule['count'] = reminder_count
+
+    event.add('rrule', rrule)
+
+    alarm = Alarm()
+    alarm.add('action', 'DISPLAY')
+    alarm.add('description', f'Time to give {product_name} to {pet_name}!')
+    alarm.add('trigger', timedelta(minutes=-15))  # 15 minutes before
+    event.add_component(alarm)
+
+    cal.add_component(event)
+
+    return cal.to_ical().decode('utf-8')
@@ -0,0 +1,83 @@
+"""Sequence numbers for reminder IDs.
+
+The counter object (``system/counter.txt`` in the artifact store) holds the
+highest number that has been handed out to any server process. A process
+leases a whole block of numbers with a single conditional write and then
+serves IDs from memory until the block runs out, so concurrent sessions and
+replicas never share a number.
+"""
+import random
+import threading
+import time
+
+from reminder_core.stores import ObjectMissing, PreconditionFailed
+
+COUNTER_KEY = 'system/counter.txt'
+DEFAULT_BLOCK_SIZE = 10
+
+
+class LeaseConflictError(RuntimeError):
+    """Raised when a block could not be leased after repeated write conflicts"""
+
+
+class LeasedIdAllocator:
+    """Thread-safe allocator that leases blocks of IDs from the counter in an ArtifactStore"""
+
+    def __init__(self, store, key=COUNTER_KEY, block_size=DEFAULT_BLOCK_SIZE, max_attempts=20):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.store = store
+        self.key = key
+        self.block_size = block_size
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._next = 1
+        self._end = 0  # empty lease until the first allocation
+
+    def allocate(self):
+        """Return the next unique sequence number"""
+        with self._lock:
+            if self._next > self._end:
+                self._next, self._end = self._lease_block()
+            number = self._next
+            self._next += 1
+            return number
+
+    def _read_counter(self):
+        """Return (high-water mark, ETag), or (0, None) if the counter does not exist yet"""
+        try:
+            stored = self.store.get(self.key)
+        except ObjectMissing:
+            return 0, None
+        return int(stored.body.decode('utf-8').strip() or 0), stored.etag
+
+    def _lease_block(self):
+        for attempt in range(self.max_attempts):
+            current, etag = self._read_counter()
+            end = current + self.block_size
+            try:
+                self.store.put(self.key, str(end).encode('utf-8'), 'text/plain', if_match=etag,
+                               if_none_match=etag is None)
+            except PreconditionFailed:
+                # Another process won the race; back off a little and re-read
+                time.sleep(random.uniform(0, 0.01 * (2 ** min(attempt, 6))))
+                continue
+            return current + 1, end
+        raise LeaseConflictError(f"Could not lease IDs from {self.store.url(self.key)} after {self.max_attempts} attempts")
+
+
+class LocalIdAllocator:
+    """Process-local counter for reminders that are not published.
+
+    It restarts at 1 in every process, so its numbers must never name stored objects.
+    """
+
+    def __init__(self, start=1):
+        self._lock = threading.Lock()
+        self._next = start
+
+    def allocate(self):
+        with self._lock:
+            number = self._next
+            self._next += 1
+            return number
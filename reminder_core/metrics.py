@@ -0,0 +1,248 @@
+"""In-process latency histograms and counters for the pipeline and S3 calls.
+
+Recording a sample is a ``perf_counter()`` pair, a bisect and a short locked
+update, so instrumentation stays on permanently. The registry renders the
+Prometheus text exposition format; there is no HTTP listener. Instead the text
+is written atomically to a file that node_exporter's textfile collector (or
+anything else) can pick up:
+
+    METRICS_TEXTFILE=/var/lib/node_exporter/pet_reminder.prom streamlit run pet_reminder.py
+"""
+import atexit
+import math
+import os
+import tempfile
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from time import perf_counter
+
+# Upper bounds in seconds; wide enough for a cold S3 connection
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels[name] for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, tuple(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        series = self._series.get(tuple(labels[name] for name in self.labelnames))
+        return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', labels + (('le', _format_value(float(bound))),), cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+class MetricsRegistry:
+    """Named metrics of one process, rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name!r} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {_escape(metric.documentation)}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'reminder_stage_duration_seconds', "Time spent in each reminder generation stage", ('stage',)
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'reminder_stage_errors_total', "Reminder generation stages that raised, by error type", ('stage', 'error')
+)
+S3_REQUEST_SECONDS = REGISTRY.histogram(
+    'reminder_s3_request_duration_seconds', "S3 call latency by operation and object kind", ('operation', 'target')
+)
+S3_ERRORS = REGISTRY.counter(
+    'reminder_s3_errors_total', "Failed S3 calls by operation, object kind and error code", ('operation', 'target', 'error')
+)
+S3_UPLOADED_BYTES = REGISTRY.counter(
+    'reminder_s3_uploaded_bytes_total', "Bytes written to S3 by object kind", ('target',)
+)
+
+
+def error_type(exc):
+    """S3 error code for botocore ClientErrors, the exception class name otherwise"""
+    response = getattr(exc, 'response', None) or {}
+    return str(response.get('Error', {}).get('Code', '')) or type(exc).__name__
+
+
+@contextmanager
+def timed_stage(stage):
+    """Record the duration, and any error, of one pipeline stage"""
+    started = perf_counter()
+    try:
+        yield
+    except Exception as e:
+        STAGE_ERRORS.inc(stage=stage, error=error_type(e))
+        raise
+    finally:
+        STAGE_SECONDS.observe(perf_counter() - started, stage=stage)
+
+
+@contextmanager
+def timed_s3_call(operation, target):
+    """Record the duration, and any error, of one S3 call"""
+    started = perf_counter()
+    try:
+        yield
+    except Exception as e:
+        S3_ERRORS.inc(operation=operation, target=target, error=error_type(e))
+        raise
+    finally:
+        S3_REQUEST_SECONDS.observe(perf_counter() - started, operation=operation, target=target)
+
+
+def write_textfile(path, registry=REGISTRY):
+    """Atomically replace ``path`` with the current metrics"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-', suffix='.prom.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(registry.render())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class TextfileExporter:
+    """Rewrites a metrics textfile every ``interval`` seconds and once more at exit"""
+
+    def __init__(self, path, interval=15, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-textfile", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        try:
+            write_textfile(self.path, self.registry)
+        except OSError:
+            # A full or read-only disk must never take generation down with it
+            pass
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+
+@lru_cache(maxsize=None)
+def start_textfile_exporter(path, interval=15):
+    """Process-wide exporter for ``path``; later calls return the running one"""
+    return TextfileExporter(path, interval).start()
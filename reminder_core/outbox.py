@@ -0,0 +1,269 @@
+"""Durable write-behind spool for S3 (or any artifact store) uploads.
+
+Object URLs are deterministic, so a submit does not have to wait for S3: its
+uploads are committed to a local SQLite database and the URLs are returned
+right away. A background thread claims due rows in batches, stores each batch
+with one put_many() on the publisher's upload pool and deletes the rows once
+the store has accepted them. Failed PUTs are retried with capped exponential
+backoff and never dropped; rows left over when the process stops are picked
+up by the next one. The one exception is a create-only PUT whose key already
+holds other bytes: it can never succeed, so it is counted and discarded.
+
+    UPLOAD_OUTBOX_PATH=/var/lib/pet-reminder/outbox.sqlite3 streamlit run pet_reminder.py
+
+Each row is one object, so an upload's encoded variants (``<key>.br``) are
+spooled as rows of their own.
+
+Whatever points at the objects (deduplication entries, the reminder index)
+must only be written once they exist: enqueue() takes an ``on_uploaded``
+callback for that. It runs in this process once every row of the enqueue
+was accepted. It is dropped if one of them is discarded, and lost if the
+process stops first. That only costs a deduplication hit, and
+migrate_keys.py rebuilds the index.
+"""
+import atexit
+import json
+import random
+import sqlite3
+import threading
+from functools import lru_cache, partial
+from time import time
+
+from reminder_core.metrics import REGISTRY, error_type
+from reminder_core.storage import get_publisher, object_puts, static_asset_upload
+from reminder_core.stores import PreconditionFailed
+
+# A claimed row is handed to another drainer if its PUT has not finished by then
+CLAIM_LEASE_SECONDS = 120
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 300.0
+# Upper bound on how long an idle drainer sleeps before looking again
+IDLE_POLL_SECONDS = 5.0
+# Object headers kept with each spooled body (put_artifact keyword arguments)
+HEADER_FIELDS = ('content_type', 'filename', 'cache_control', 'content_encoding', 'if_none_match')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    body BLOB NOT NULL,
+    headers TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    lease_until REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    enqueued_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS uploads_due ON uploads (next_attempt);
+"""
+
+OUTBOX_ENQUEUED = REGISTRY.counter('reminder_outbox_enqueued_total', "Objects spooled for upload")
+OUTBOX_UPLOADED = REGISTRY.counter('reminder_outbox_uploaded_total', "Spooled objects accepted by the artifact store")
+OUTBOX_RETRIES = REGISTRY.counter(
+    'reminder_outbox_retries_total', "Spooled uploads that failed and were rescheduled, by error type", ('error',)
+)
+OUTBOX_CONFLICTS = REGISTRY.counter(
+    'reminder_outbox_conflicts_total', "Spooled create-only uploads discarded because their key holds other bytes"
+)
+
+
+def retry_delay(attempts, base=RETRY_BASE_SECONDS, cap=RETRY_MAX_SECONDS):
+    """Seconds to wait after the ``attempts``-th failure: exponential, capped, with jitter"""
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+def object_rows(spec):
+    """``(key, body, headers_json)`` for an upload spec and each of its variants"""
+    headers = {name: spec.get(name) for name in HEADER_FIELDS}
+    rows = [(spec['key'], spec['body'], json.dumps(headers))]
+    for variant in spec.get('variants', ()):
+        rows.append((variant['key'], variant['body'],
+                     json.dumps({**headers, 'content_encoding': variant['content_encoding']})))
+    return rows
+
+
+class UploadOutbox:
+    """SQLite-backed queue of pending PUTs, drained to the store by a background thread"""
+
+    def __init__(self, path, publisher, batch_size=32):
+        self.path = path
+        self.publisher = publisher
+        self.batch_size = batch_size
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        # A submit is only acknowledged once its rows survive a power loss
+        self._db.execute('PRAGMA synchronous=FULL')
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._spooled_static = set()
+        # Row ID -> its enqueue's {'rows': row IDs not uploaded yet, 'callback': ...}, for on_uploaded callbacks
+        self._waiting = {}
+        self._thread = threading.Thread(target=self._run, name="s3-outbox", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout=5):
+        """Stop draining; whatever is still spooled is uploaded by the next process"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _insert(self, rows, callback=None):
+        now = time()
+        with self._lock:
+            with self._db:
+                row_ids = [
+                    self._db.execute(
+                        'INSERT INTO uploads (key, body, headers, next_attempt, enqueued_at) VALUES (?, ?, ?, ?, ?)',
+                        (key, body, headers, now, now)
+                    ).lastrowid
+                    for key, body, headers in rows
+                ]
+            # Registered under the lock the drainer settles rows with, so no row can finish before it is
+            if callback is not None and row_ids:
+                waiting = {'rows': set(row_ids), 'callback': callback}
+                self._waiting.update(dict.fromkeys(row_ids, waiting))
+        OUTBOX_ENQUEUED.inc(len(rows))
+        self._wakeup.set()
+
+    def enqueue(self, uploads, on_uploaded=None):
+        """Spool several artifacts in one transaction and return their URLs.
+
+        ``uploads`` maps a name to put_artifact() keyword arguments, as for
+        ArtifactPublisher.upload_artifacts(). ``on_uploaded(urls)`` is called
+        on the publisher's upload pool once the store has accepted all of
+        them (see the module docstring). Raises if the spool cannot be written.
+        """
+        urls = {name: self.publisher.object_url(spec['key']) for name, spec in uploads.items()}
+        callback = partial(on_uploaded, urls) if on_uploaded else None
+        self._insert([row for spec in uploads.values() for row in object_rows(spec)], callback)
+        return urls
+
+    def enqueue_static(self, assets):
+        """Spool the content-hashed shared assets once per process"""
+        with self._lock:
+            pending = [asset for asset in assets if asset.key not in self._spooled_static]
+        if not pending:
+            return
+        brotli_variant = self.publisher.settings.brotli_variants
+        self._insert([row for asset in pending for row in object_rows(static_asset_upload(asset, brotli_variant))])
+        with self._lock:
+            self._spooled_static.update(asset.key for asset in pending)
+
+    def _claim(self):
+        now = time()
+        with self._lock, self._db:
+            return self._db.execute(
+                'UPDATE uploads SET lease_until = ? WHERE id IN ('
+                '  SELECT id FROM uploads WHERE next_attempt <= ? AND lease_until <= ? ORDER BY id LIMIT ?'
+                ') RETURNING id, key, body, headers, attempts',
+                (now + CLAIM_LEASE_SECONDS, now, now, self.batch_size)
+            ).fetchall()
+
+    def drain_once(self):
+        """Upload one batch of due rows; returns how many were attempted"""
+        rows = self._claim()
+        if not rows:
+            return 0
+        # Each row is a single object, so it maps to exactly one put
+        puts = {row_id: object_puts(key=key, body=body, **json.loads(headers))[0]
+                for row_id, key, body, headers, _ in rows}
+        _, errors = self.publisher.store.put_many(puts, self.publisher.executor)
+        uploaded, discarded, failed = [], [], []
+        for row_id, _, _, _, attempts in rows:
+            error = errors.get(row_id)
+            if error is None:
+                uploaded.append((row_id,))
+            elif isinstance(error, PreconditionFailed):
+                discarded.append((row_id,))
+            else:
+                OUTBOX_RETRIES.inc(error=error_type(error))
+                failed.append((attempts + 1, time() + retry_delay(attempts + 1), str(error)[:500], row_id))
+        with self._lock, self._db:
+            self._db.executemany('DELETE FROM uploads WHERE id = ?', uploaded + discarded)
+            self._db.executemany(
+                'UPDATE uploads SET attempts = ?, next_attempt = ?, lease_until = 0, last_error = ? WHERE id = ?',
+                failed
+            )
+            callbacks = self._settle([row_id for row_id, in uploaded], [row_id for row_id, in discarded])
+        for callback in callbacks:
+            self.publisher.executor.submit(callback)
+        OUTBOX_UPLOADED.inc(len(uploaded))
+        OUTBOX_CONFLICTS.inc(len(discarded))
+        return len(rows)
+
+    def _settle(self, uploaded, discarded):
+        """Callbacks of enqueues whose last row was just uploaded; forgets those with a discarded row"""
+        for row_id in discarded:
+            waiting = self._waiting.pop(row_id, None)
+            for other in waiting['rows'] if waiting else ():
+                self._waiting.pop(other, None)
+        callbacks = []
+        for row_id in uploaded:
+            waiting = self._waiting.pop(row_id, None)
+            if waiting is None:
+                continue
+            waiting['rows'].discard(row_id)
+            if not waiting['rows']:
+                callbacks.append(waiting['callback'])
+        return callbacks
+
+    def _idle_seconds(self):
+        with self._lock:
+            (next_due,) = self._db.execute('SELECT MIN(MAX(next_attempt, lease_until)) FROM uploads').fetchone()
+        if next_due is None:
+            return IDLE_POLL_SECONDS
+        return min(IDLE_POLL_SECONDS, max(0.0, next_due - time()))
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            try:
+                if self.drain_once():
+                    continue
+                idle = self._idle_seconds()
+            except sqlite3.Error:
+                # A locked or briefly unwritable spool: nothing is lost, try again later
+                idle = IDLE_POLL_SECONDS
+            self._wakeup.wait(idle)
+
+    def pending(self, keys):
+        """How many rows for ``keys`` are still spooled"""
+        keys = list(keys)
+        if not keys:
+            return 0
+        with self._lock:
+            (count,) = self._db.execute(
+                f'SELECT COUNT(*) FROM uploads WHERE key IN ({", ".join("?" * len(keys))})', keys
+            ).fetchone()
+        return count
+
+    def flush(self, timeout=None, keys=None):
+        """Wait until the spool is empty, or holds none of ``keys``; returns False if ``timeout`` seconds pass first"""
+        deadline = None if timeout is None else time() + timeout
+        while self.pending(keys) if keys is not None else self.stats()['pending']:
+            if deadline is not None and time() >= deadline:
+                return False
+            self._wakeup.set()
+            self._stopped.wait(0.05)
+        return True
+
+    def stats(self):
+        """Pending and retrying object counts, and the age of the oldest pending object"""
+        with self._lock:
+            pending, retrying, oldest = self._db.execute(
+                'SELECT COUNT(*), COUNT(last_error), MIN(enqueued_at) FROM uploads'
+            ).fetchone()
+        return {'pending': pending, 'retrying': retrying, 'oldest_age': time() - oldest if oldest else 0.0}
+
+
+@lru_cache(maxsize=None)
+def get_upload_outbox(settings):
+    """Process-wide outbox at ``settings.upload_outbox_path``, draining to the shared publisher"""
+    return UploadOutbox(settings.upload_outbox_path, get_publisher(settings)).start()
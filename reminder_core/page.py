@@ -0,0 +1,286 @@
+"""Validation page served to pet owners after they scan the QR code.
+
+The stylesheet, script and logo are shared by every page. They are published
+once under content-hashed keys (``static/page.<hash>.css``) that can be cached
+forever, so each ``pages/<shard>/{id}.html`` only carries its own reminder. The page
+markup is a ``string.Template`` whose static parts are resolved once per
+process. Households get one page listing every pet.
+
+The QR code is inlined as SVG (one stroked path) rather than a base64 PNG:
+it is a fraction of the size, compresses well and stays sharp at any zoom.
+"""
+import hashlib
+import os
+from collections import namedtuple
+from functools import lru_cache
+from string import Template
+
+from reminder_core.assets import ASSET_DIR, get_render_assets
+from reminder_core.qr import QR_BORDER
+
+PAGE_LOGO_PATH = os.path.join(ASSET_DIR, "BI-Logo-2.png")
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_PREFIX = "static/"
+# Pages live under pages/<shard>/ (see storage.reminder_keys), so shared assets are two levels up
+PAGE_ASSET_BASE = "../../"
+
+StaticAsset = namedtuple('StaticAsset', 'key body content_type')
+
+PAGE_MARKUP = Template("""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>🐾 $pet_name_upper - Medication Reminder</title>
+    <link rel="stylesheet" href="$stylesheet_url">
+    <script src="$script_url" defer></script>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <div class="logo-container">
+                $logo_html
+            </div>
+            <div class="pet-name">$pet_name_upper</div>
+            <div class="medication">($product_name)</div>
+        </div>
+
+        <div class="details">
+            <div class="detail-row">
+                <span class="detail-label">Frequency:</span>
+                <span class="detail-value">$frequency</span>
+            </div>
+            <div class="detail-row">
+                <span class="detail-label">Start Date:</span>
+                <span class="detail-value">$start_date</span>
+            </div>
+            <div class="detail-row">
+                <span class="detail-label">Duration:</span>
+                <span class="detail-value">$duration</span>
+            </div>
+            <div class="detail-row">
+                <span class="detail-label">Total Reminders:</span>
+                <span class="detail-value">$total_reminders</span>
+            </div>
+            $times_section
+
+            $notes_section
+        </div>
+
+        <a href="$calendar_url" class="btn btn-primary" download="${pet_name_upper}_${product_name}_reminder.ics">
+            📅 Add to My Calendar
+        </a>
+
+        <!-- QR Code Section -->
+        <div class="qr-section">
+            <div class="qr-title">📱 Scan QR Code</div>
+            <div style="text-align: center; margin: 15px 0;">
+                <svg viewBox="0 0 $qr_side $qr_side" shape-rendering="crispEdges"
+                    role="img" aria-label="QR Code for Pet Reminder"
+                    class="qr-image"
+                    style="width: 200px; height: 200px; display: block; margin: 0 auto; border: 2px solid #00e47c; padding: 10px; background-color: white;">$qr_markup</svg>
+            </div>
+            <div class="qr-link">
+                Can't scan? <a href="$calendar_url">Click here instead</a>
+            </div>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+HOUSEHOLD_MARKUP = Template("""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>🐾 $title_upper - Medication Reminders</title>
+    <link rel="stylesheet" href="$stylesheet_url">
+    <script src="$script_url" defer></script>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <div class="logo-container">
+                $logo_html
+            </div>
+            <div class="pet-name">$title_upper</div>
+            <div class="medication">$pet_count_text, one calendar</div>
+        </div>
+
+        $pet_sections
+
+        <a href="$calendar_url" class="btn btn-primary" download="${title_file}_reminders.ics">
+            📅 Add All to My Calendar
+        </a>
+
+        <!-- QR Code Section -->
+        <div class="qr-section">
+            <div class="qr-title">📱 Scan QR Code</div>
+            <div style="text-align: center; margin: 15px 0;">
+                <svg viewBox="0 0 $qr_side $qr_side" shape-rendering="crispEdges"
+                    role="img" aria-label="QR Code for Pet Reminders"
+                    class="qr-image"
+                    style="width: 200px; height: 200px; display: block; margin: 0 auto; border: 2px solid #00e47c; padding: 10px; background-color: white;">$qr_markup</svg>
+            </div>
+            <div class="qr-link">
+                Can't scan? <a href="$calendar_url">Click here instead</a>
+            </div>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+PET_SECTION = Template("""<div class="details">
+            <div class="times-title">🐾 $pet_name_upper ($product_name)</div>
+            <div class="detail-row">
+                <span class="detail-label">Frequency:</span>
+                <span class="detail-value">$frequency</span>
+            </div>
+            <div class="detail-row">
+                <span class="detail-label">Start Date:</span>
+                <span class="detail-value">$start_date</span>
+            </div>
+            <div class="detail-row">
+                <span class="detail-label">Duration:</span>
+                <span class="detail-value">$duration</span>
+            </div>
+            <div class="detail-row">
+                <span class="detail-label">Total Reminders:</span>
+                <span class="detail-value">$total_reminders</span>
+            </div>
+            $times_section
+
+            $notes_section
+        </div>
+        """)
+
+PAGE_MARKUPS = {
+    'reminder': PAGE_MARKUP,
+    'household': HOUSEHOLD_MARKUP,
+}
+
+TIMES_SECTION = Template("""<div class="times-section">
+                <div class="times-title">⏰ Reminder Times:</div>
+                <div class="times-list">
+                    $times_html_list
+                </div>
+            </div>
+            """)
+
+NOTES_SECTION = Template("""
+            <div class="notes-section">
+                <div class="notes-title">📝 Additional Notes:</div>
+                <div class="notes-text">$notes</div>
+            </div>
+            """)
+
+
+def hashed_static_asset(name, body, content_type):
+    """StaticAsset for ``body`` keyed by its content hash, e.g. ``static/page.1a2b3c4d5e6f.css``"""
+    stem, extension = os.path.splitext(name)
+    digest = hashlib.sha256(body).hexdigest()[:12]
+    return StaticAsset(f"{STATIC_PREFIX}{stem}.{digest}{extension}", body, content_type)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@lru_cache(maxsize=1)
+def get_page_assets():
+    """Shared page assets by role ('stylesheet', 'script' and, if the file exists, 'logo')"""
+    assets = {
+        'stylesheet': hashed_static_asset('page.css', _read(os.path.join(STATIC_DIR, 'page.css')), 'text/css; charset=utf-8'),
+        'script': hashed_static_asset('page.js', _read(os.path.join(STATIC_DIR, 'page.js')), 'text/javascript; charset=utf-8'),
+    }
+    try:
+        assets['logo'] = hashed_static_asset('logo.png', _read(PAGE_LOGO_PATH), 'image/png')
+    except OSError:
+        pass
+    return assets
+
+
+@lru_cache(maxsize=None)
+def get_page_template(kind='reminder'):
+    """Page template (see PAGE_MARKUPS) with the shared asset URLs already filled in"""
+    assets = get_page_assets()
+    logo = assets.get('logo')
+    logo_html = (f'<img src="{PAGE_ASSET_BASE}{logo.key}" alt="BI Logo" class="logo-img">' if logo
+                 else '<div class="logo-fallback">🐾</div>')
+    return Template(PAGE_MARKUPS[kind].safe_substitute(
+        stylesheet_url=PAGE_ASSET_BASE + assets['stylesheet'].key,
+        script_url=PAGE_ASSET_BASE + assets['script'].key,
+        logo_html=logo_html
+    ))
+
+
+def clear_page_assets():
+    """Forget the shared assets so changed files are re-hashed on next use"""
+    get_page_assets.cache_clear()
+    get_page_template.cache_clear()
+
+
+def _detail_fields(reminder_details):
+    """Template fields for one pet's schedule, times and notes"""
+    # Format reminder times for display
+    times_section = ""
+    if reminder_details['times'] != '':
+        times_section = TIMES_SECTION.substitute(times_html_list=f"• {reminder_details['times']}")
+
+    notes_section = ""
+    if reminder_details.get('notes') and reminder_details['notes'].strip():
+        notes_section = NOTES_SECTION.substitute(notes=reminder_details['notes'])
+
+    return {
+        'frequency': reminder_details['frequency'],
+        'start_date': reminder_details['start_date'],
+        'duration': reminder_details['duration'],
+        'total_reminders': reminder_details['total_reminders'],
+        'times_section': times_section,
+        'notes_section': notes_section,
+    }
+
+
+def _qr_fields(qr_matrix):
+    """Template fields for the inline SVG QR code, with the same quiet zone as the PNG"""
+    side, markup = qr_matrix.svg_content(border=QR_BORDER)
+    return {'qr_side': side, 'qr_markup': markup}
+
+
+def create_web_page_html(pet_name, product_name, calendar_url, reminder_details, qr_matrix):
+    """Create HTML page that serves calendar with device detection"""
+    return get_page_template().substitute(
+        pet_name_upper=pet_name.upper(),
+        product_name=product_name,
+        calendar_url=calendar_url,
+        **_qr_fields(qr_matrix),
+        **_detail_fields(reminder_details)
+    )
+
+
+def create_household_page_html(title, pets, calendar_url, qr_matrix):
+    """One page for a household calendar; ``pets`` are dicts with pet_name, product_name and reminder_details"""
+    pet_sections = ''.join(
+        PET_SECTION.substitute(
+            pet_name_upper=pet['pet_name'].upper(),
+            product_name=pet['product_name'],
+            **_detail_fields(pet['reminder_details'])
+        )
+        for pet in pets
+    )
+    return get_page_template('household').substitute(
+        title_upper=title.upper(),
+        title_file=''.join(c for c in title.upper() if c.isalnum()) or 'HOUSEHOLD',
+        pet_count_text=f"{len(pets)} pet{'s' if len(pets) != 1 else ''}",
+        pet_sections=pet_sections,
+        calendar_url=calendar_url,
+        **_qr_fields(qr_matrix)
+    )
+
+
+get_render_assets().add_invalidation_listener(clear_page_assets)
@@ -0,0 +1,419 @@
+"""End-to-end reminder generation: ID, calendar, QR, page, card and upload.
+
+    from reminder_core import ReminderRequest, generate_reminder
+
+    artifacts = generate_reminder(ReminderRequest('Daisy', 'NexGard SPECTRA', date(2026, 1, 1)))
+
+Nothing here touches Streamlit; the app, the batch CLI and benchmarks all
+drive the same code.
+"""
+import math
+from dataclasses import dataclass, field
+from datetime import date
+from functools import lru_cache, partial
+
+from reminder_core.card import create_reminder_image
+from reminder_core.config import Settings
+from reminder_core.dedup import ENTRY_FIELDS, DedupIndex, request_fingerprint
+from reminder_core.encoding import encode_image, profile_extension
+from reminder_core.ics import create_calendar_reminder, create_household_calendar
+from reminder_core.id_allocator import LeasedIdAllocator, LocalIdAllocator
+from reminder_core.metrics import start_textfile_exporter, timed_stage
+from reminder_core.outbox import get_upload_outbox
+from reminder_core.page import create_household_page_html, create_web_page_html, get_page_assets
+from reminder_core.qr import get_qr_matrix
+from reminder_core.reminder_index import IndexEntry, ReminderIndex
+from reminder_core.storage import (
+    ARTIFACT_URL_FIELDS,
+    SHARDED_KEY_LAYOUT,
+    calendar_key,
+    calendar_upload,
+    get_artifact_store,
+    get_publisher,
+    get_store_health_probe,
+    reminder_image_upload,
+    reminder_keys,
+    web_page_upload,
+)
+
+DEFAULT_PRODUCT = "NexGard SPECTRA"
+S3_NOT_CONFIGURED_WARNING = "⚠️ S3 not configured. Calendar file will be available for download only."
+ID_UNAVAILABLE_WARNING = ("⚠️ Could not reserve a reminder ID ({error}). The reminder was not published and is "
+                          "available for download only; submit again in a moment for a shareable link.")
+
+
+@dataclass(frozen=True)
+class ReminderRequest:
+    """What the owner asked for; the same fields the form stores"""
+    pet_name: str
+    product_name: str = DEFAULT_PRODUCT
+    start_date: date = field(default_factory=date.today)
+    dosage: int = 12
+    selected_time: str = ''
+    notes: str = ''
+
+
+def join_names(names):
+    """'Daisy', 'Daisy & Rex', 'Daisy, Rex & Luna'"""
+    names = list(names)
+    if len(names) <= 1:
+        return ''.join(names)
+    return f"{', '.join(names[:-1])} & {names[-1]}"
+
+
+@dataclass(frozen=True)
+class HouseholdRequest:
+    """Several pets sharing one calendar, validation page, card and QR code.
+
+    ``pet_name`` and ``product_name`` summarize the household, so IDs, cards
+    and deduplication treat it like a single reminder.
+    """
+    pets: tuple
+    household_name: str = ''
+
+    def __post_init__(self):
+        if not self.pets:
+            raise ValueError("a household needs at least one pet")
+        object.__setattr__(self, 'pets', tuple(self.pets))
+
+    @property
+    def pet_name(self):
+        return self.household_name or join_names(pet.pet_name for pet in self.pets)
+
+    @property
+    def product_name(self):
+        return ' / '.join(dict.fromkeys(pet.product_name for pet in self.pets))
+
+
+@dataclass
+class ReminderArtifacts:
+    """Everything generated for one reminder, plus where it was published"""
+    meaningful_id: str
+    pet_name: str
+    product_name: str
+    reminder_details: dict
+    calendar_data: str
+    qr_image_bytes: bytes
+    reminder_image_bytes: bytes
+    html_content: str = None
+    uploads: dict = field(default_factory=dict, repr=False)
+    calendar_url: str = None
+    web_page_url: str = None
+    reminder_image_url: str = None
+    upload_errors: dict = field(default_factory=dict)
+    warnings: list = field(default_factory=list)
+    # True when an identical reminder was already published and is returned as is
+    deduplicated: bool = False
+    # Per-pet pet_name, product_name and reminder_details for households
+    pets: list = field(default_factory=list)
+
+
+def format_duration_text(start_date, dosage):
+    """Format duration text for display"""
+    total_days = dosage * 30
+
+    if total_days <= 7:
+        return f"{total_days} day{'s' if total_days > 1 else ''}"
+    elif total_days <= 31:
+        weeks = math.ceil(total_days / 7)
+        return f"≈ {weeks} week{'s' if weeks > 1 else ''}"
+    elif total_days <= 365:
+        months = math.ceil(total_days / 30)
+        return f"≈ {months} month{'s' if months > 1 else ''}"
+    else:
+        years = total_days / 365
+        if years >= 2:
+            return f"≈ {years:.1f} years"
+        else:
+            months = math.ceil(total_days / 30)
+            return f"≈ {months} months"
+
+
+def format_meaningful_id(sequence_number, pet_name, product_name):
+    """Build the public reminder ID for an already allocated sequence number"""
+    # Clean names for URL (remove special characters, spaces)
+    clean_pet = ''.join(c for c in pet_name if c.isalnum())[:10]
+    clean_product = ''.join(c for c in product_name.split('(')[0] if c.isalnum())[:10]
+
+    # Format: QR0001_PetName_ProductName
+    return f"QR{sequence_number:04d}_{clean_pet}_{clean_product}"
+
+
+def build_reminder_details(start_date, dosage, selected_time, notes):
+    """Schedule summary shown on the card and the validation page"""
+    return {
+        'frequency': 'Monthly',
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'duration': format_duration_text(start_date, dosage),
+        'total_reminders': dosage,
+        'times': selected_time,
+        'notes': notes
+    }
+
+
+def build_household_details(pets):
+    """Card summary of a household: earliest start, longest duration, every reminder"""
+    longest = max(pets, key=lambda pet: pet.dosage)
+    return {
+        'frequency': 'Monthly',
+        'start_date': min(pet.start_date for pet in pets).strftime('%Y-%m-%d'),
+        'duration': format_duration_text(longest.start_date, longest.dosage),
+        'total_reminders': sum(pet.dosage for pet in pets),
+        'times': ', '.join(dict.fromkeys(pet.selected_time for pet in pets if pet.selected_time)),
+        'notes': '; '.join(dict.fromkeys(pet.notes.strip() for pet in pets if pet.notes.strip()))
+    }
+
+
+def render_artifacts(meaningful_id, request, publisher=None, image_profile='png-palette'):
+    """Render the calendar, QR code, validation page and card for one reminder.
+
+    Object URLs are deterministic from the ID, so everything is rendered
+    before anything is uploaded. With a ``publisher`` the result carries the
+    put_artifact() arguments for each object under ``uploads``; without one
+    the QR falls back to plain text and no page is built. A HouseholdRequest
+    gets one calendar with an event per pet, one page listing them all and
+    one card, behind a single QR code.
+    """
+    household = isinstance(request, HouseholdRequest)
+    pet_name, product_name = request.pet_name, request.product_name
+    with timed_stage('calendar'):
+        if household:
+            calendar_data = create_household_calendar(request.pets)
+        else:
+            calendar_data = create_calendar_reminder(
+                pet_name=pet_name,
+                product_name=product_name,
+                dosage=request.dosage,
+                reminder_time=request.selected_time,
+                start_date=request.start_date,
+                notes=request.notes
+            )
+
+    pets = []
+    if household:
+        pets = [
+            {
+                'pet_name': pet.pet_name,
+                'product_name': pet.product_name,
+                'reminder_details': build_reminder_details(pet.start_date, pet.dosage, pet.selected_time, pet.notes)
+            }
+            for pet in request.pets
+        ]
+        reminder_details = build_household_details(request.pets)
+    else:
+        reminder_details = build_reminder_details(request.start_date, request.dosage, request.selected_time, request.notes)
+    calendar_url = publisher.object_url(calendar_key(meaningful_id)) if publisher else None
+
+    # Generate QR code (use a fallback URL if web page not available)
+    qr_target = calendar_url if calendar_url else f"data:text/plain,{pet_name} - {product_name} Reminder"
+    # Encode once; the card, the page and the download all render from this matrix
+    with timed_stage('qr_code'):
+        qr_matrix = get_qr_matrix(qr_target)
+        qr_image_bytes = qr_matrix.to_png(box_size=12)
+
+    # Create web page (only published when S3 is configured)
+    html_content = None
+    if calendar_url:
+        with timed_stage('web_page'):
+            if household:
+                html_content = create_household_page_html(pet_name, pets, calendar_url, qr_matrix)
+            else:
+                html_content = create_web_page_html(pet_name, product_name, calendar_url, reminder_details, qr_matrix)
+
+    # Generate the combined reminder image
+    with timed_stage('card_image'):
+        reminder_image = create_reminder_image(pet_name, product_name, reminder_details, qr_matrix)
+    with timed_stage('card_encode'):
+        encoded_image = encode_image(reminder_image, image_profile)
+
+    uploads = {}
+    if publisher:
+        compress, brotli_variant = publisher.settings.compress_uploads, publisher.settings.brotli_variants
+        uploads = {
+            'calendar': calendar_upload(calendar_data, meaningful_id, compress, brotli_variant),
+            'page': web_page_upload(html_content, meaningful_id, compress, brotli_variant),
+            'image': reminder_image_upload(encoded_image.data, meaningful_id, encoded_image.content_type, encoded_image.extension)
+        }
+
+    return ReminderArtifacts(
+        meaningful_id=meaningful_id,
+        pet_name=pet_name,
+        product_name=product_name,
+        reminder_details=reminder_details,
+        calendar_data=calendar_data,
+        qr_image_bytes=qr_image_bytes,
+        reminder_image_bytes=encoded_image.data,
+        html_content=html_content,
+        uploads=uploads,
+        pets=pets
+    )
+
+
+def deduplicated_artifacts(request, entry):
+    """Artifacts for an already published reminder; nothing is rendered, so no content bytes"""
+    return ReminderArtifacts(
+        pet_name=request.pet_name,
+        product_name=request.product_name,
+        calendar_data=None,
+        qr_image_bytes=None,
+        reminder_image_bytes=None,
+        deduplicated=True,
+        **{name: entry.get(name) for name in ENTRY_FIELDS}
+    )
+
+
+class ReminderGenerator:
+    """Allocates IDs for, renders and publishes reminders with one configuration"""
+
+    def __init__(self, settings, publisher=None, allocator=None, fallback_allocator=None, health_probe=None,
+                 dedup_index=None, outbox=None, reminder_index=None):
+        self.settings = settings
+        self.publisher = publisher
+        self.allocator = allocator
+        self.fallback_allocator = fallback_allocator or LocalIdAllocator()
+        self.health_probe = health_probe
+        self.dedup_index = dedup_index
+        self.outbox = outbox
+        self.reminder_index = reminder_index
+
+    def s3_status(self):
+        """(configured, error) for the artifact store, from the cached health probe"""
+        if self.publisher is None:
+            return False, None
+        if self.health_probe is None:
+            return True, None
+        return self.health_probe.status()
+
+    def next_sequence_number(self, publish=True):
+        """Next sequence number: from the leased block for a reminder that will be published, else a local counter.
+
+        Local numbers restart at 1 in every process, so they are never
+        published; raises when no number can be leased for publishing.
+        """
+        if not publish:
+            return self.fallback_allocator.allocate()
+        if self.allocator is None:
+            raise RuntimeError("no ID allocator to publish with")
+        with timed_stage('allocate_id'):
+            return self.allocator.allocate()
+
+    def generate(self, request):
+        """Generate, and publish when S3 is available, every artifact for ``request``"""
+        with timed_stage('generate'):
+            return self._generate(request)
+
+    def _generate(self, request):
+        warnings = []
+        configured, _ = self.s3_status()
+        # Only published reminders can be shared, so deduplication needs S3
+        fingerprint = None
+        if configured and self.dedup_index is not None:
+            fingerprint = request_fingerprint(request, self.settings.card_image_profile)
+            with timed_stage('dedup_lookup'):
+                entry = self.dedup_index.lookup(fingerprint)
+            if entry is not None:
+                return deduplicated_artifacts(request, entry)
+
+        publish = configured
+        try:
+            sequence_number = self.next_sequence_number(publish)
+        except Exception as e:
+            # A local number may already name another owner's reminder, so this one stays unpublished
+            warnings.append(ID_UNAVAILABLE_WARNING.format(error=e))
+            publish = False
+            sequence_number = self.next_sequence_number(publish)
+        meaningful_id = format_meaningful_id(sequence_number, request.pet_name, request.product_name)
+        if not configured:
+            warnings.append(S3_NOT_CONFIGURED_WARNING)
+
+        publisher = self.publisher if publish else None
+        artifacts = render_artifacts(meaningful_id, request, publisher, self.settings.card_image_profile)
+        artifacts.warnings.extend(warnings)
+        if publisher:
+            with timed_stage('upload'):
+                urls, artifacts.upload_errors = self.publish(publisher, artifacts.uploads, artifacts.warnings,
+                                                             partial(self.record_published, fingerprint, artifacts))
+            for name, url in urls.items():
+                setattr(artifacts, ARTIFACT_URL_FIELDS[name], url)
+        return artifacts
+
+    def record_published(self, fingerprint, artifacts, urls):
+        """Point identical requests and the reminder index at ``artifacts``, whose objects are now at ``urls``"""
+        if fingerprint:
+            entry = {name: getattr(artifacts, name) for name in ENTRY_FIELDS}
+            entry.update((ARTIFACT_URL_FIELDS[name], url) for name, url in urls.items())
+            self.dedup_index.record(fingerprint, entry)
+        if self.reminder_index is not None:
+            # A manifest append is a read and a conditional write; the owner need not wait for it
+            self.publisher.executor.submit(self.index_reminder, self.index_entry(artifacts))
+
+    def is_spooled(self, meaningful_id):
+        """Whether some of the reminder's objects are still waiting in the upload outbox; does not block"""
+        if self.outbox is None:
+            return False
+        keys = reminder_keys(meaningful_id, profile_extension(self.settings.card_image_profile)).values()
+        return self.outbox.pending(keys) > 0
+
+    def index_entry(self, artifacts):
+        """IndexEntry for freshly published ``artifacts``: the household's name and each pet's"""
+        pet_names = [artifacts.pet_name, *(pet['pet_name'] for pet in artifacts.pets)]
+        return IndexEntry(artifacts.meaningful_id, SHARDED_KEY_LAYOUT,
+                          profile_extension(self.settings.card_image_profile), pet_names)
+
+    def index_reminder(self, entry):
+        """Add ``entry`` to the reminder index; failures are only counted, migrate_keys.py re-indexes"""
+        try:
+            self.reminder_index.add([entry])
+        except Exception:
+            pass
+
+    def publish(self, publisher, uploads, warnings, on_published=None):
+        """``(urls, errors)`` for ``uploads``: spooled to the outbox when there is one, else uploaded now.
+
+        ``on_published(urls)`` runs once every upload is in the store: right
+        away when uploading directly, after the drain for spooled uploads.
+        """
+        # The page links the shared stylesheet, script and logo; a no-op once they are up
+        assets = get_page_assets().values()
+        if self.outbox is not None:
+            try:
+                self.outbox.enqueue_static(assets)
+                return self.outbox.enqueue(uploads, on_published), {}
+            except Exception as e:
+                warnings.append(f"Upload spool unavailable, uploading directly: {e}")
+        static_errors = publisher.publish_static(assets)
+        urls, errors = publisher.upload_artifacts(uploads)
+        if static_errors:
+            errors['static'] = next(iter(static_errors.values()))
+        if on_published and not errors:
+            on_published(urls)
+        return urls, errors
+
+
+@lru_cache(maxsize=None)
+def get_generator(settings):
+    """Process-wide generator for ``settings``: one store, allocator and upload pool"""
+    if settings.metrics_textfile:
+        start_textfile_exporter(settings.metrics_textfile, settings.metrics_interval_seconds)
+    store = get_artifact_store(settings)
+    return ReminderGenerator(
+        settings,
+        publisher=get_publisher(settings),
+        allocator=LeasedIdAllocator(store, block_size=settings.id_lease_block_size),
+        fallback_allocator=get_local_id_allocator(),
+        health_probe=get_store_health_probe(settings),
+        dedup_index=DedupIndex(store) if settings.dedup_enabled else None,
+        outbox=get_upload_outbox(settings) if settings.upload_outbox_path else None,
+        reminder_index=ReminderIndex(store) if settings.reminder_index_enabled else None
+    )
+
+
+@lru_cache(maxsize=None)
+def get_local_id_allocator():
+    """Process-wide counter for the IDs of reminders that are not published"""
+    return LocalIdAllocator()
+
+
+def generate_reminder(request, settings=None):
+    """Generate one reminder with the process-wide generator for ``settings`` (default: environment)"""
+    return get_generator(settings or Settings.from_mapping()).generate(request)
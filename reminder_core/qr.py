@@ -0,0 +1,136 @@
+"""QR codes for reminder links: encode once, render to any size.
+
+The module matrix for a URL is computed once and cached. Raster output
+scales each module by a whole number of pixels, so edges stay sharp and no
+resampling filter runs. SVG output is generated from the same matrix as a
+single stroked path with relative moves, small enough to inline in a page.
+"""
+from functools import lru_cache
+
+import qrcode
+from PIL import Image, ImageColor
+
+from reminder_core.encoding import encode_image
+
+QR_VERSION = 2
+QR_ERROR_CORRECTION = qrcode.constants.ERROR_CORRECT_M
+QR_BORDER = 6
+QR_FILL_COLOR = "#000000"
+QR_BACK_COLOR = "#00e47c"
+
+
+class QRMatrix:
+    """Module matrix of one encoded QR code, without its quiet zone"""
+
+    def __init__(self, data):
+        qr = qrcode.QRCode(
+            version=QR_VERSION,
+            error_correction=QR_ERROR_CORRECTION,
+            border=0,
+        )
+        qr.add_data(data)
+        qr.make(fit=True)
+        self.data = data
+        self.modules = tuple(tuple(row) for row in qr.get_matrix())
+        self.size = len(self.modules)
+        # One byte per module: palette index 0 is the fill colour, 1 the background
+        self._module_bytes = bytes(0 if dark else 1 for row in self.modules for dark in row)
+
+    def to_image(self, pixel_size=None, box_size=12, border=QR_BORDER,
+                 fill_color=QR_FILL_COLOR, back_color=QR_BACK_COLOR):
+        """Return a palette image of the code.
+
+        With ``pixel_size`` the largest whole-pixel module size that fits is
+        used and the rest is filled with background, centred; otherwise each
+        module is ``box_size`` pixels.
+        """
+        modules = self.size + 2 * border
+        if pixel_size is not None:
+            box_size = max(1, pixel_size // modules)
+        matrix = Image.frombytes('P', (self.size, self.size), self._module_bytes)
+        matrix.putpalette(ImageColor.getrgb(fill_color) + ImageColor.getrgb(back_color))
+        if box_size > 1:
+            matrix = matrix.resize((self.size * box_size, self.size * box_size), Image.Resampling.NEAREST)
+
+        side = modules * box_size
+        canvas_side = max(pixel_size or 0, side)
+        img = Image.new('P', (canvas_side, canvas_side), 1)
+        img.putpalette(matrix.getpalette())
+        offset = (canvas_side - side) // 2 + border * box_size
+        img.paste(matrix, (offset, offset))
+        if pixel_size is not None and side > pixel_size:
+            # More modules than target pixels: only possible for tiny targets
+            img = img.resize((pixel_size, pixel_size), Image.Resampling.NEAREST)
+        return img
+
+    def to_png(self, box_size=12, border=QR_BORDER, profile='png-palette', **colors):
+        """Encode the code as PNG bytes (see reminder_core.encoding for profiles)"""
+        return encode_image(self.to_image(box_size=box_size, border=border, **colors), profile, dpi=None).data
+
+    def dark_runs(self):
+        """Yield ``(x, y, length)`` for each horizontal run of dark modules"""
+        for y, row in enumerate(self.modules):
+            x = 0
+            while x < self.size:
+                if row[x]:
+                    start = x
+                    while x < self.size and row[x]:
+                        x += 1
+                    yield start, y, x - start
+                else:
+                    x += 1
+
+    def svg_path(self, border=0):
+        """Minimal path data: each dark run is a one-unit stroke, reached by a relative move"""
+        parts = []
+        x_at = y_at = None
+        for x, y, length in self.dark_runs():
+            x, y = x + border, y + border
+            if x_at is None:
+                parts.append(f"M{x} {y}.5h{length}")
+            else:
+                parts.append(f"m{x - x_at} {y - y_at}h{length}")
+            x_at, y_at = x + length, y
+        return "".join(parts)
+
+    def svg_content(self, border=4, fill_color=QR_FILL_COLOR, back_color=QR_BACK_COLOR):
+        """``(side, markup)``: the viewBox side and the elements inside ``<svg>``"""
+        side = self.size + 2 * border
+        markup = (
+            f'<rect width="{side}" height="{side}" fill="{short_color(back_color)}"/>'
+            f'<path stroke="{short_color(fill_color)}" d="{self.svg_path(border)}"/>'
+        )
+        return side, markup
+
+    def to_svg(self, border=4, fill_color=QR_FILL_COLOR, back_color=QR_BACK_COLOR, size=None):
+        """Return the code as an SVG document with one path, scalable to any size"""
+        side, markup = self.svg_content(border, fill_color, back_color)
+        dimensions = f' width="{size}" height="{size}"' if size else ""
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {side} {side}"{dimensions} shape-rendering="crispEdges">'
+            f'{markup}'
+            f'</svg>'
+        )
+
+
+def short_color(color):
+    """'#00ee77' -> '#0e7' where the shorthand means the same colour"""
+    if len(color) == 7 and color[1::2] == color[2::2]:
+        return '#' + color[1::2]
+    return color
+
+
+@lru_cache(maxsize=256)
+def get_qr_matrix(data):
+    """Encode ``data`` once per process; repeated URLs reuse the same matrix"""
+    return QRMatrix(data)
+
+
+def generate_qr_code(web_page_url):
+    """Generate QR code PNG that points to the web page (black on green)"""
+    return get_qr_matrix(web_page_url).to_png(box_size=12)
+
+
+def generate_qr_svg(web_page_url):
+    """Generate QR code as SVG string for HTML embedding"""
+    return get_qr_matrix(web_page_url).to_svg()
@@ -0,0 +1,207 @@
+"""Sharded, append-only index of published reminders in the artifact store.
+
+A reminder's keys follow from its ID, layout and card format (see
+storage.reminder_keys). The layout and the format depend on when and how the
+reminder was published, though, and which reminders belong to a pet cannot be
+derived at all. Without an index, both questions need a ListObjectsV2 scan.
+The index answers each with a single GET of one small manifest:
+
+    index/ids/<shard>.jsonl    ["QR0042_Daisy_NexGardSPE", "sharded", "webp"]
+    index/pets/<shard>.jsonl   ["daisy", "QR0042_Daisy_NexGardSPE"]
+
+A manifest's shard is a hash prefix of the ID or of the pet key (see
+pet_key()), so writers rarely touch the same one. Lines are only ever
+appended. An append reads the manifest and writes it back with ``if_match``,
+retrying when another writer got there first. An ID that was re-indexed
+(e.g. after migrating to the sharded layout) is resolved by its last line.
+
+Popular pet names ("max", "bella") would grow one pet manifest without bound,
+and every append rewrites the manifest it goes to. So a manifest is sealed
+once it reaches INDEX_SEGMENT_BYTES, and later lines go to the next segment
+(``index/pets/<shard>.1.jsonl``, ``.2.jsonl``, ...). An append therefore
+moves at most one segment's bytes, and a reader stops at the first segment
+that is not full. For almost every manifest that is the first one, so a
+lookup is still a single GET.
+"""
+import json
+import random
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from reminder_core.metrics import REGISTRY
+from reminder_core.storage import key_shard, reminder_keys
+from reminder_core.stores import ObjectMissing, PreconditionFailed
+
+INDEX_PREFIX = 'index/'
+# 4096 manifests per kind: about 250 lines each at a million reminders
+INDEX_SHARD_CHARS = 3
+# Same cleaning as format_meaningful_id(), so IDs and pet lookups agree
+PET_KEY_CHARS = 10
+# Size at which a manifest segment is sealed: about 1,500 pet lines
+INDEX_SEGMENT_BYTES = 64 * 1024
+
+# One published reminder: its ID, key layout, card file extension and the pets it is for
+IndexEntry = namedtuple('IndexEntry', 'meaningful_id layout image_extension pet_names')
+
+INDEX_APPENDS = REGISTRY.counter(
+    'reminder_index_appends_total', "Index manifest appends by result (ok, conflict, error)", ('result',)
+)
+INDEX_LOOKUPS = REGISTRY.counter(
+    'reminder_index_lookups_total', "Index lookups by kind (id, pet) and result (hit, miss)", ('kind', 'result')
+)
+
+
+class IndexConflictError(RuntimeError):
+    """Raised when a manifest could not be appended to after repeated write conflicts"""
+
+
+def pet_key(pet_name):
+    """Case-insensitive lookup key of a pet name, cleaned the way meaningful IDs clean it"""
+    return ''.join(c for c in str(pet_name) if c.isalnum())[:PET_KEY_CHARS].casefold()
+
+
+def _line(values):
+    return json.dumps(values, ensure_ascii=False, separators=(',', ':'))
+
+
+class ReminderIndex:
+    """ID -> object keys and pet -> IDs, kept in sharded manifests in an ArtifactStore"""
+
+    def __init__(self, store, shard_chars=INDEX_SHARD_CHARS, max_attempts=20, segment_bytes=INDEX_SEGMENT_BYTES):
+        self.store = store
+        self.shard_chars = shard_chars
+        self.max_attempts = max_attempts
+        self.segment_bytes = segment_bytes
+        # Manifest key -> the first segment that may still be open, so appends skip sealed ones
+        self._open_segments = {}
+
+    def id_manifest_key(self, meaningful_id):
+        return f"{INDEX_PREFIX}ids/{key_shard(meaningful_id, self.shard_chars)}.jsonl"
+
+    def pet_manifest_key(self, key):
+        return f"{INDEX_PREFIX}pets/{key_shard(key, self.shard_chars)}.jsonl"
+
+    def _read(self, key):
+        """(body, ETag) of a manifest, or (b'', None) if it does not exist yet"""
+        try:
+            stored = self.store.get(key)
+        except ObjectMissing:
+            return b'', None
+        return stored.body, stored.etag
+
+    @staticmethod
+    def segment_key(key, segment):
+        """Key of a manifest's ``segment``-th segment; the first is the manifest key itself"""
+        return key if segment == 0 else f"{key[:-len('.jsonl')]}.{segment}.jsonl"
+
+    def _lines(self, key):
+        lines, segment = [], 0
+        while True:
+            body, _ = self._read(self.segment_key(key, segment))
+            lines.extend(json.loads(line) for line in body.decode('utf-8').splitlines() if line)
+            if len(body) < self.segment_bytes:
+                return lines
+            segment += 1
+
+    def _append(self, key, lines):
+        segment = self._open_segments.get(key, 0)
+        lines = list(dict.fromkeys(lines))
+        for attempt in range(self.max_attempts):
+            while True:
+                body, etag = self._read(self.segment_key(key, segment))
+                existing = set(body.decode('utf-8').splitlines())
+                # Appending is idempotent, so a retried or repeated add() writes nothing twice (sealed
+                # segments this process has moved past are not re-read; a duplicate line there is harmless)
+                lines = [line for line in lines if line not in existing]
+                if not lines:
+                    return
+                if len(body) < self.segment_bytes:
+                    break
+                segment += 1
+            try:
+                self.store.put(self.segment_key(key, segment),
+                               body + ''.join(line + '\n' for line in lines).encode('utf-8'),
+                               'application/x-ndjson', if_match=etag, if_none_match=etag is None)
+            except PreconditionFailed:
+                INDEX_APPENDS.inc(result='conflict')
+                time.sleep(random.uniform(0, 0.01 * (2 ** min(attempt, 6))))
+                continue
+            self._open_segments[key] = max(segment, self._open_segments.get(key, 0))
+            INDEX_APPENDS.inc(result='ok')
+            return
+        raise IndexConflictError(f"Could not append to {self.store.url(key)} after {self.max_attempts} attempts")
+
+    def add(self, entries):
+        """Index several reminders with one append per manifest touched"""
+        appends = defaultdict(list)
+        for entry in entries:
+            appends[self.id_manifest_key(entry.meaningful_id)].append(
+                _line([entry.meaningful_id, entry.layout, entry.image_extension])
+            )
+            for key in dict.fromkeys(pet_key(name) for name in entry.pet_names):
+                if key:
+                    appends[self.pet_manifest_key(key)].append(_line([key, entry.meaningful_id]))
+        for key, lines in appends.items():
+            try:
+                self._append(key, lines)
+            except Exception:
+                INDEX_APPENDS.inc(result='error')
+                raise
+
+    def lookup(self, meaningful_id):
+        """Object keys of the reminder by kind ('calendar', 'page', 'image'), or None if it is not indexed"""
+        found = None
+        for line in self._lines(self.id_manifest_key(meaningful_id)):
+            if line[0] == meaningful_id:
+                found = line
+        INDEX_LOOKUPS.inc(kind='id', result='hit' if found else 'miss')
+        if found is None:
+            return None
+        _, layout, image_extension = found
+        return reminder_keys(meaningful_id, image_extension, layout)
+
+    def ids_for_pet(self, pet_name):
+        """IDs of the reminders indexed for ``pet_name``, oldest first"""
+        key = pet_key(pet_name)
+        ids = [line[1] for line in self._lines(self.pet_manifest_key(key)) if line[0] == key] if key else []
+        INDEX_LOOKUPS.inc(kind='pet', result='hit' if ids else 'miss')
+        return list(dict.fromkeys(ids))
+
+
+class BufferedIndexWriter:
+    """Collects entries from many threads and adds them to the index in batches.
+
+    For bulk runs: one manifest append per shard and batch instead of one per
+    reminder. A batch that fails stays pending and goes out with the next one;
+    call flush() when done, which raises if it still cannot be written.
+    """
+
+    def __init__(self, index, batch_size=256):
+        self.index = index
+        self.batch_size = batch_size
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            self._pending.append(entry)
+            if len(self._pending) < self.batch_size:
+                return
+        try:
+            self.flush()
+        except Exception:
+            # Still pending: retried with the next batch and by the final flush()
+            pass
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            self.index.add(batch)
+        except Exception:
+            with self._lock:
+                self._pending[:0] = batch
+            raise
@@ -0,0 +1,37 @@
+// Device detection and instructions
+function showDeviceInstructions() {
+    const userAgent = navigator.userAgent;
+
+    if (/iPhone|iPad|iPod/i.test(userAgent)) {
+        document.querySelector('.ios-instructions').style.display = 'block';
+    } else if (/Android/i.test(userAgent)) {
+        document.querySelector('.android-instructions').style.display = 'block';
+    }
+}
+
+// Auto-redirect to calendar download on mobile for better UX
+function handleMobileDownload() {
+    const userAgent = navigator.userAgent;
+    const downloadBtn = document.querySelector('.btn-primary');
+
+    if (/iPhone|iPad|iPod|Android/i.test(userAgent)) {
+        downloadBtn.addEventListener('click', function(e) {
+            // Let the default download behavior work
+            setTimeout(function() {
+                // Optional: Show a brief success message
+                downloadBtn.innerHTML = '✅ Calendar File Ready!';
+                downloadBtn.style.background = '#28a745';
+
+                setTimeout(function() {
+                    downloadBtn.innerHTML = '📅 Add to My Calendar';
+                    downloadBtn.style.background = 'linear-gradient(45deg, #00e47c, #00b85c)';
+                }, 2000);
+            }, 500);
+        });
+    }
+}
+
+window.addEventListener('load', function() {
+    showDeviceInstructions();
+    handleMobileDownload();
+});
@@ -0,0 +1,419 @@
+"""Publishing to the artifact store shared by every session and tool in a process.
+
+One store (see reminder_core.stores; S3 unless ``STORAGE_BACKEND`` says
+otherwise), one connectivity probe and one bounded upload pool serve the
+whole process. boto3 clients are thread-safe, and boto3 is imported on first
+use only; rendering never needs it.
+
+Text artifacts are stored gzip-encoded (``Content-Encoding: gzip``), with an
+optional brotli copy at ``<key>.br`` for a CDN that negotiates encodings, and
+every object carries an explicit ``Cache-Control`` and a ``Content-MD5``, so
+its ETag is the MD5 of exactly the stored bytes.
+
+Reminder keys are spread over hashed prefixes (``calendars/3f/QR0042_...ics``)
+rather than growing with the sequence number under one prefix; see
+reminder_keys().
+"""
+import gzip
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from time import monotonic
+
+from reminder_core.id_allocator import COUNTER_KEY
+from reminder_core.metrics import S3_UPLOADED_BYTES, timed_s3_call
+from reminder_core.stores import LocalStore, MemoryStore, S3Store
+
+# Where each uploaded artifact's URL is reported
+ARTIFACT_URL_FIELDS = {
+    'calendar': 'calendar_url',
+    'page': 'web_page_url',
+    'image': 'reminder_image_url'
+}
+
+# Content-hashed keys never change, so browsers and CDNs may keep them forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Delivery policy per artifact kind. Reminder keys carry a unique ID and are
+# never rewritten, so they are as cacheable as the content-hashed assets. They
+# are also written create-only (see object_puts), so even a duplicate ID can
+# never replace another owner's reminder.
+ARTIFACT_POLICIES = {
+    'calendar': {'cache_control': IMMUTABLE_CACHE_CONTROL, 'compress': True},
+    'page': {'cache_control': IMMUTABLE_CACHE_CONTROL, 'compress': True},
+    'image': {'cache_control': IMMUTABLE_CACHE_CONTROL, 'compress': False},
+}
+# Bodies smaller than this are not worth the Content-Encoding round trip
+MIN_COMPRESS_BYTES = 256
+BROTLI_SUFFIX = '.br'
+
+# 'sharded' puts reminder objects under <kind>/<shard>/, the shard being the first
+# KEY_SHARD_CHARS hex digits of the ID's SHA-256, so sequential IDs spread evenly
+# over 256 prefixes per kind. 'flat' (<kind>/<id>...) is how reminders were
+# published before; those objects stay where they are (see migrate_keys.py).
+SHARDED_KEY_LAYOUT = 'sharded'
+FLAT_KEY_LAYOUT = 'flat'
+KEY_SHARD_CHARS = 2
+# Key prefix of each reminder artifact kind
+ARTIFACT_PREFIXES = {
+    'calendar': 'calendars/',
+    'page': 'pages/',
+    'image': 'images/',
+}
+
+# Metrics label for objects under each key prefix
+S3_KEY_TARGETS = (
+    ('calendars/', 'calendar'),
+    ('pages/', 'page'),
+    ('images/', 'image'),
+    ('static/', 'static'),
+    ('dedup/', 'dedup'),
+    ('index/', 'index'),
+)
+
+
+def s3_target(key):
+    """Metrics label for the object an S3 call addresses"""
+    if key is None:
+        return 'bucket'
+    if key == COUNTER_KEY:
+        return 'counter'
+    for prefix, target in S3_KEY_TARGETS:
+        if key.startswith(prefix):
+            return target
+    return 'other'
+
+
+class InstrumentedS3Client:
+    """Wraps an S3 client so every call records latency, errors and uploaded bytes"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            target = s3_target(kwargs.get('Key'))
+            with timed_s3_call(name, target):
+                result = attr(*args, **kwargs)
+            if name == 'put_object':
+                body = kwargs.get('Body', b'')
+                if isinstance(body, str):
+                    body = body.encode('utf-8')
+                if isinstance(body, (bytes, bytearray)):
+                    S3_UPLOADED_BYTES.inc(len(body), target=target)
+            return result
+
+        # Cache the wrapper so later lookups skip __getattr__
+        self.__dict__[name] = call
+        return call
+
+
+@lru_cache(maxsize=None)
+def get_s3_client(region, access_key_id, secret_access_key):
+    """Create one instrumented S3 client per process and credential set"""
+    import boto3
+
+    return InstrumentedS3Client(boto3.client(
+        's3',
+        region_name=region,
+        aws_access_key_id=access_key_id,
+        aws_secret_access_key=secret_access_key
+    ))
+
+
+class StoreHealthProbe:
+    """Cached artifact store connectivity check.
+
+    Only the very first check in a process runs inline. Once the result is
+    older than the TTL it keeps being served while a background thread
+    refreshes it, so callers never wait on S3.
+    """
+
+    def __init__(self, store, ttl=300):
+        self._store = store
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._healthy = False
+        self._error = None
+        self._checked_at = None
+        self._refreshing = False
+
+    def _probe(self):
+        with self._probe_lock:
+            self._run_probe()
+
+    def _run_probe(self):
+        try:
+            self._store.check()
+            healthy, error = True, None
+        except Exception as e:
+            healthy, error = False, e
+        with self._lock:
+            self._healthy = healthy
+            self._error = error
+            self._checked_at = monotonic()
+            self._refreshing = False
+
+    def status(self):
+        """Return (healthy, error) from the cached probe result"""
+        with self._lock:
+            checked_at = self._checked_at
+            if checked_at is not None and not self._refreshing and monotonic() - checked_at >= self._ttl:
+                self._refreshing = True
+                threading.Thread(target=self._probe, name="s3-health-probe", daemon=True).start()
+
+        if checked_at is None:
+            # Nothing cached yet in this process; concurrent first callers share one probe
+            with self._probe_lock:
+                if self._checked_at is None:
+                    self._run_probe()
+
+        with self._lock:
+            return self._healthy, self._error
+
+
+@lru_cache(maxsize=None)
+def get_artifact_store(settings):
+    """Process-wide store for ``settings.storage_backend`` ('s3', 'local' or 'memory')"""
+    backend = settings.storage_backend
+    if backend == 's3':
+        return S3Store(settings.s3_bucket, settings.aws_region, connect=lambda: get_s3_client(
+            settings.aws_region, settings.aws_access_key_id, settings.aws_secret_access_key
+        ))
+    if backend == 'local':
+        return LocalStore(settings.local_store_path, settings.store_base_url)
+    if backend == 'memory':
+        return MemoryStore(settings.store_base_url or f"memory://{settings.s3_bucket}/")
+    raise ValueError(f"unknown storage backend {backend!r}")
+
+
+@lru_cache(maxsize=None)
+def get_store_health_probe(settings):
+    """Shared connectivity probe for the process-wide store; a client that cannot be created reports why"""
+    return StoreHealthProbe(get_artifact_store(settings), ttl=settings.s3_health_ttl_seconds)
+
+
+@lru_cache(maxsize=None)
+def get_upload_executor(max_workers):
+    """Bounded thread pool shared by every session for S3 uploads"""
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-upload")
+
+
+def key_shard(identifier, chars=KEY_SHARD_CHARS):
+    """Hex prefix of ``identifier``'s SHA-256: stable, and uniform even for sequential IDs"""
+    return hashlib.sha256(identifier.encode('utf-8')).hexdigest()[:chars]
+
+
+def _artifact_key(kind, file_id, name, layout):
+    if layout == SHARDED_KEY_LAYOUT:
+        return f"{ARTIFACT_PREFIXES[kind]}{key_shard(file_id)}/{name}"
+    if layout == FLAT_KEY_LAYOUT:
+        return f"{ARTIFACT_PREFIXES[kind]}{name}"
+    raise ValueError(f"unknown key layout {layout!r}")
+
+
+def calendar_key(file_id, layout=SHARDED_KEY_LAYOUT):
+    return _artifact_key('calendar', file_id, f"{file_id}.ics", layout)
+
+
+def reminder_image_key(file_id, extension='png', layout=SHARDED_KEY_LAYOUT):
+    return _artifact_key('image', file_id, f"{file_id}_reminder_image.{extension}", layout)
+
+
+def web_page_key(page_id, layout=SHARDED_KEY_LAYOUT):
+    return _artifact_key('page', page_id, f"{page_id}.html", layout)
+
+
+def reminder_keys(meaningful_id, image_extension='png', layout=SHARDED_KEY_LAYOUT):
+    """Key of each of a reminder's artifacts, by kind, in ``layout``"""
+    return {
+        'calendar': calendar_key(meaningful_id, layout),
+        'page': web_page_key(meaningful_id, layout),
+        'image': reminder_image_key(meaningful_id, image_extension, layout),
+    }
+
+
+def gzip_body(body):
+    """Deterministic gzip (no timestamp), so identical bodies get identical ETags"""
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+@lru_cache(maxsize=1)
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def brotli_available():
+    return _brotli() is not None
+
+
+def compress_upload(spec, compress=True, brotli_variant=False):
+    """Gzip an upload spec's body in place when that makes it smaller.
+
+    With ``brotli_variant`` (and the optional ``brotli`` package installed)
+    a brotli-encoded copy is added under ``variants`` for ``<key>.br``.
+    """
+    body = spec['body']
+    if not compress or len(body) < MIN_COMPRESS_BYTES:
+        return spec
+    if brotli_variant and brotli_available():
+        spec['variants'] = ({
+            'key': spec['key'] + BROTLI_SUFFIX,
+            'body': _brotli().compress(body, quality=11),
+            'content_encoding': 'br',
+        },)
+    compressed = gzip_body(body)
+    if len(compressed) < len(body):
+        spec['body'] = compressed
+        spec['content_encoding'] = 'gzip'
+    return spec
+
+
+def _artifact_upload(kind, spec, compress, brotli_variant):
+    policy = ARTIFACT_POLICIES[kind]
+    spec['cache_control'] = policy['cache_control']
+    spec['if_none_match'] = True
+    return compress_upload(spec, compress and policy['compress'], brotli_variant)
+
+
+def calendar_upload(calendar_data, file_id, compress=True, brotli_variant=False):
+    return _artifact_upload('calendar', {
+        'key': calendar_key(file_id),
+        'body': calendar_data.encode('utf-8'),
+        'content_type': 'text/calendar',
+        'filename': f"{file_id}.ics"
+    }, compress, brotli_variant)
+
+
+def reminder_image_upload(image_bytes, file_id, content_type='image/png', extension='png'):
+    return _artifact_upload('image', {
+        'key': reminder_image_key(file_id, extension),
+        'body': image_bytes,
+        'content_type': content_type,
+        'filename': f"{file_id}_reminder_image.{extension}"
+    }, False, False)
+
+
+def web_page_upload(html_content, page_id, compress=True, brotli_variant=False):
+    return _artifact_upload('page', {
+        'key': web_page_key(page_id),
+        'body': html_content.encode('utf-8'),
+        'content_type': 'text/html'
+    }, compress, brotli_variant)
+
+
+def static_asset_upload(asset, brotli_variant=False):
+    """Upload spec for a content-hashed shared asset; text assets are compressed"""
+    spec = {'key': asset.key, 'body': asset.body, 'content_type': asset.content_type,
+            'cache_control': IMMUTABLE_CACHE_CONTROL}
+    return compress_upload(spec, asset.content_type.startswith('text/'), brotli_variant)
+
+
+def object_puts(key, body, content_type, filename=None, cache_control=None, content_encoding=None, variants=(),
+                if_none_match=False):
+    """ArtifactStore.put() keyword arguments for an upload spec and each of its encoded variants.
+
+    With ``if_none_match`` every object is only created, never replaced (see ArtifactStore.put_once()).
+    """
+    headers = {
+        'content_type': content_type,
+        'cache_control': cache_control,
+        'content_disposition': f'attachment; filename="{filename}"' if filename else None,
+        'if_none_match': if_none_match,
+    }
+    return [
+        {'key': key, 'body': body, 'content_encoding': content_encoding, **headers},
+        *({'key': v['key'], 'body': v['body'], 'content_encoding': v['content_encoding'], **headers} for v in variants),
+    ]
+
+
+class ArtifactPublisher:
+    """Builds public URLs for, and uploads, reminder artifacts to the artifact store.
+
+    The store's client and the upload pool are resolved on first upload, so
+    a publisher is cheap to create where only URLs are needed.
+    """
+
+    def __init__(self, settings, store=None, executor=None):
+        self.settings = settings
+        self._store = store
+        self._executor = executor
+        self._published_static = set()
+        self._static_lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = get_artifact_store(self.settings)
+        return self._store
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = get_upload_executor(self.settings.s3_upload_workers)
+        return self._executor
+
+    def object_url(self, key):
+        """Public URL of an object in the artifact store"""
+        return self.store.url(key)
+
+    def put_artifact(self, **spec):
+        """Store one object, and any encoded variants of it, and return its public URL (raises on failure)"""
+        for put in object_puts(**spec):
+            self.store.put_once(**put)
+        return self.object_url(spec['key'])
+
+    def upload_artifacts(self, uploads):
+        """Upload several artifacts, and their variants, as one batch.
+
+        ``uploads`` maps a name to put_artifact() keyword arguments. Returns
+        ``(urls, errors)`` keyed by the same names, so one failed PUT does not
+        hide the outcome of the others.
+        """
+        puts = {(name, i): put for name, spec in uploads.items() for i, put in enumerate(object_puts(**spec))}
+        _, put_errors = self.store.put_many(puts, self.executor)
+        urls, errors = {}, {}
+        for (name, _), error in put_errors.items():
+            errors.setdefault(name, error)
+        for name, spec in uploads.items():
+            if name not in errors:
+                urls[name] = self.object_url(spec['key'])
+        return urls, errors
+
+    def publish_static(self, assets):
+        """Make sure content-hashed shared assets exist in the store.
+
+        Each key is checked (and stored if missing) once per process; the
+        key changes whenever the content does, so an existing object is
+        always current. Returns ``{key: error}`` for assets that could not be
+        published; they are retried on the next call.
+        """
+        with self._static_lock:
+            pending = [asset for asset in assets if asset.key not in self._published_static]
+        errors = {}
+        for asset in pending:
+            try:
+                if self.store.head(asset.key) is None:
+                    self.put_artifact(**static_asset_upload(asset, self.settings.brotli_variants))
+            except Exception as e:
+                errors[asset.key] = e
+                continue
+            with self._static_lock:
+                self._published_static.add(asset.key)
+        return errors
+
+
+@lru_cache(maxsize=None)
+def get_publisher(settings):
+    """Process-wide publisher for the configured store"""
+    return ArtifactPublisher(settings)
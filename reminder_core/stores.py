@@ -0,0 +1,376 @@
+"""Artifact stores: where reminders, the ID counter and index entries live.
+
+Every backend offers the same small API (put, optionally conditional, get,
+head, batch put, public URLs and, for maintenance, a key listing), so generation code never knows whether
+objects go to S3, a local directory or memory:
+
+    STORAGE_BACKEND=local LOCAL_STORE_PATH=./published streamlit run pet_reminder.py
+
+Conditional writes follow S3 semantics: ``if_none_match=True`` only creates
+an object and ``if_match=etag`` only replaces that exact version; a lost race
+raises PreconditionFailed. ETags are quoted MD5 digests of the stored bytes,
+so put_once() can tell a retried create from a clash with another object.
+"""
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:  # Windows: conditional writes are atomic within one process only
+    fcntl = None
+
+# S3 answers a lost compare-and-swap with 412, or 409 when two conditional
+# writes race on the same key
+_CONFLICT_CODES = {'PreconditionFailed', 'ConditionalRequestConflict', '412', '409'}
+_MISSING_CODES = {'NoSuchKey', 'NotFound', '404'}
+
+StoredObject = namedtuple('StoredObject', 'body etag content_type')
+
+
+def _error_code(exc):
+    """Return the S3 error code carried by a botocore ClientError, if any"""
+    response = getattr(exc, 'response', None) or {}
+    return str(response.get('Error', {}).get('Code', ''))
+
+
+def etag_of(body):
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+class StoreError(Exception):
+    """Base class for the errors every backend raises alike"""
+
+
+class ObjectMissing(StoreError):
+    """The key does not exist"""
+
+
+class PreconditionFailed(StoreError):
+    """A conditional put lost: the object exists, is gone, or has another ETag"""
+
+
+class ArtifactStore(ABC):
+    """Keyed bytes with conditional writes and public URLs; see the module docstring"""
+
+    @abstractmethod
+    def put(self, key, body, content_type, cache_control=None, content_encoding=None, content_disposition=None,
+            if_match=None, if_none_match=False):
+        """Store ``body`` at ``key`` and return its ETag"""
+
+    @abstractmethod
+    def get(self, key):
+        """StoredObject for ``key``; raises ObjectMissing"""
+
+    @abstractmethod
+    def head(self, key):
+        """ETag of ``key``, or None if it does not exist"""
+
+    @abstractmethod
+    def url(self, key):
+        """Public URL of ``key``"""
+
+    def check(self):
+        """Raise if the store cannot currently be used"""
+
+    def put_once(self, key, body, content_type, if_none_match=False, **headers):
+        """put(); with ``if_none_match``, the same bytes already at ``key`` count as stored.
+
+        That makes a retried create-only upload succeed when an earlier try
+        went through, while different bytes still raise PreconditionFailed.
+        """
+        try:
+            return self.put(key, body, content_type, if_none_match=if_none_match, **headers)
+        except PreconditionFailed:
+            etag = etag_of(bytes(body))
+            if not if_none_match or self.head(key) != etag:
+                raise
+            return etag
+
+    @abstractmethod
+    def list_keys(self, prefix=''):
+        """Every key starting with ``prefix``, in key order.
+
+        A full scan, for migrations and repairs; lookups go through
+        reminder_core.reminder_index instead.
+        """
+
+    def put_many(self, puts, executor=None):
+        """Run several put_once()s, in parallel on ``executor`` when one is given.
+
+        ``puts`` maps a name to put() keyword arguments. Returns ``(etags,
+        errors)`` keyed by the same names, so one failure does not hide the
+        outcome of the others.
+        """
+        # Zero-argument callables returning each put's ETag (or raising its error)
+        outcomes = {
+            name: executor.submit(self.put_once, **kwargs).result if executor else partial(self.put_once, **kwargs)
+            for name, kwargs in puts.items()
+        }
+        etags, errors = {}, {}
+        for name, outcome in outcomes.items():
+            try:
+                etags[name] = outcome()
+            except Exception as e:
+                errors[name] = e
+        return etags, errors
+
+
+class S3Store(ArtifactStore):
+    """Objects in an S3 bucket; the client is created by ``connect()`` on first use"""
+
+    def __init__(self, bucket, region='us-east-1', client=None, connect=None):
+        self.bucket = bucket
+        self.region = region
+        self._client = client
+        self._connect = connect
+
+    def __repr__(self):
+        return f"S3Store(s3://{self.bucket})"
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._connect()
+        return self._client
+
+    def put(self, key, body, content_type, cache_control=None, content_encoding=None, content_disposition=None,
+            if_match=None, if_none_match=False):
+        extra = {}
+        if cache_control:
+            extra['CacheControl'] = cache_control
+        if content_encoding:
+            extra['ContentEncoding'] = content_encoding
+        if content_disposition:
+            extra['ContentDisposition'] = content_disposition
+        if if_match:
+            extra['IfMatch'] = if_match
+        if if_none_match:
+            extra['IfNoneMatch'] = '*'
+        try:
+            response = self.client.put_object(
+                Bucket=self.bucket,
+                Key=key,
+                Body=body,
+                ContentType=content_type,
+                # S3 rejects a corrupted body, and the ETag becomes its MD5
+                ContentMD5=base64.b64encode(hashlib.md5(body).digest()).decode('ascii'),
+                **extra
+            )
+        except Exception as e:
+            code = _error_code(e)
+            if code in _CONFLICT_CODES or (if_match and code in _MISSING_CODES):
+                raise PreconditionFailed(key) from e
+            raise
+        return (response or {}).get('ETag') or etag_of(body)
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            if _error_code(e) in _MISSING_CODES:
+                raise ObjectMissing(key) from e
+            raise
+        return StoredObject(response['Body'].read(), response['ETag'], response.get('ContentType'))
+
+    def head(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)['ETag']
+        except Exception as e:
+            if _error_code(e) in _MISSING_CODES:
+                return None
+            raise
+
+    def url(self, key):
+        return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{key}"
+
+    def check(self):
+        self.client.list_buckets()
+
+    def list_keys(self, prefix=''):
+        kwargs = {'Bucket': self.bucket, 'Prefix': prefix}
+        while True:
+            response = self.client.list_objects_v2(**kwargs)
+            for item in response.get('Contents', ()):
+                yield item['Key']
+            if not response.get('IsTruncated'):
+                return
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+
+class MemoryStore(ArtifactStore):
+    """Objects in a dict: for tests, benchmarks and development without a network"""
+
+    def __init__(self, base_url='memory://pet-reminder/'):
+        self.base_url = base_url
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"MemoryStore({self.base_url})"
+
+    def put(self, key, body, content_type, cache_control=None, content_encoding=None, content_disposition=None,
+            if_match=None, if_none_match=False):
+        body = bytes(body)
+        etag = etag_of(body)
+        with self._lock:
+            existing = self._objects.get(key)
+            if (if_none_match and existing is not None) or (if_match and (existing is None or existing.etag != if_match)):
+                raise PreconditionFailed(key)
+            self._objects[key] = StoredObject(body, etag, content_type)
+        return etag
+
+    def get(self, key):
+        with self._lock:
+            stored = self._objects.get(key)
+        if stored is None:
+            raise ObjectMissing(key)
+        return stored
+
+    def head(self, key):
+        with self._lock:
+            stored = self._objects.get(key)
+        return stored.etag if stored else None
+
+    def url(self, key):
+        return self.base_url + quote(key)
+
+    def put_many(self, puts, executor=None):
+        # A dict insert is faster than handing work to a thread
+        return super().put_many(puts)
+
+    def keys(self):
+        with self._lock:
+            return sorted(self._objects)
+
+    def list_keys(self, prefix=''):
+        return [key for key in self.keys() if key.startswith(prefix)]
+
+
+class LocalStore(ArtifactStore):
+    """Objects as files under ``root``, with their headers alongside in ``root/.meta``.
+
+    Writes are atomic (temporary file, then rename). Conditional writes hold
+    a lock on ``root/.lock``, so they are safe across processes where fcntl
+    is available. Bodies are kept exactly as stored, so gzip-encoded pages
+    stay gzipped on disk; set ``COMPRESS_UPLOADS=0`` to open them directly.
+    """
+
+    META_DIR = '.meta'
+
+    def __init__(self, root, base_url=None):
+        self.root = Path(root).resolve()
+        self.base_url = base_url
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"LocalStore({self.root})"
+
+    def _path(self, key):
+        path = (self.root / key).resolve()
+        if self.root not in path.parents or key.startswith(self.META_DIR + '/'):
+            raise ValueError(f"key {key!r} is outside the store")
+        return path
+
+    def _meta_path(self, key):
+        return self.root / self.META_DIR / f"{key}.json"
+
+    @contextmanager
+    def _exclusive(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root / '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _write_atomic(path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _write(self, key, body, headers):
+        path = self._path(key)
+        self._write_atomic(self._meta_path(key), json.dumps(headers).encode('utf-8'))
+        self._write_atomic(path, body)
+
+    def put(self, key, body, content_type, cache_control=None, content_encoding=None, content_disposition=None,
+            if_match=None, if_none_match=False):
+        body = bytes(body)
+        headers = {'content_type': content_type, 'cache_control': cache_control,
+                   'content_encoding': content_encoding, 'content_disposition': content_disposition}
+        if not (if_match or if_none_match):
+            self._write(key, body, headers)
+            return etag_of(body)
+        with self._exclusive():
+            current = self.head(key)
+            if (if_none_match and current is not None) or (if_match and current != if_match):
+                raise PreconditionFailed(key)
+            self._write(key, body, headers)
+        return etag_of(body)
+
+    def get(self, key):
+        try:
+            body = self._path(key).read_bytes()
+        except FileNotFoundError:
+            raise ObjectMissing(key) from None
+        try:
+            content_type = json.loads(self._meta_path(key).read_bytes())['content_type']
+        except (OSError, ValueError, KeyError):
+            content_type = None
+        return StoredObject(body, etag_of(body), content_type)
+
+    def head(self, key):
+        try:
+            return etag_of(self._path(key).read_bytes())
+        except FileNotFoundError:
+            return None
+
+    def url(self, key):
+        if self.base_url:
+            return self.base_url + quote(key)
+        return (self.root / key).as_uri()
+
+    def list_keys(self, prefix=''):
+        keys = []
+        for directory, subdirectories, files in os.walk(self.root):
+            relative = Path(directory).relative_to(self.root).as_posix()
+            if relative == '.':
+                # Headers and the lock file are not objects
+                subdirectories[:] = [name for name in subdirectories if name != self.META_DIR]
+                relative = ''
+            else:
+                relative += '/'
+            keys.extend(relative + name for name in files
+                        if not name.startswith('.tmp-') and relative + name != '.lock'
+                        and (relative + name).startswith(prefix))
+        return sorted(keys)
+
+    def check(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        if not os.access(self.root, os.W_OK):
+            raise StoreError(f"{self.root} is not writable")
@@ -0,0 +1,214 @@
+"""Fitting card text into its box: glyph advances cached per font and size.
+
+Measuring a string with FreeType costs a fraction of a millisecond, and
+naive wrapping or shrink-to-fit measures every candidate prefix at every
+candidate size. GlyphMetrics instead measures each character once per font
+and size. From then on a string's width is a sum of cached advances, so one
+greedy pass wraps, shrinks or ellipsizes text in O(length). Finished
+layouts are memoized too, since the same pet and product names come back
+all the time.
+
+Widths ignore kerning and rounding, so the per-character sum can come out
+slightly (under a pixel) narrower than ``font.getlength()``. The lines a
+fit settles on are therefore measured once more with the font itself. A
+line that overflows backs off one step: to the next smaller size, or at the
+smallest size to wrapping a pixel narrower and a shorter ellipsized prefix.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+from PIL import ImageFont
+
+from reminder_core.assets import get_render_assets
+
+ELLIPSIS = '...'
+
+# lines: the text to draw, one entry per line; size: the font size it fits at
+FittedText = namedtuple('FittedText', ['lines', 'size', 'font'])
+
+
+class GlyphMetrics:
+    """Advance width of each character of one font, measured on first use"""
+
+    def __init__(self, font):
+        self.font = font
+        # Concurrent renders may both measure a new character; they store the same value
+        self._advances = {}
+
+    def advance(self, char):
+        width = self._advances.get(char)
+        if width is None:
+            width = self._advances[char] = self.font.getlength(char)
+        return width
+
+    def width(self, text):
+        return sum(self.advance(char) for char in text)
+
+    def lines_fit(self, lines, max_width):
+        """Whether every line fits ``max_width`` as the font itself measures it"""
+        return all(self.font.getlength(line) <= max_width for line in lines)
+
+    def ellipsize(self, text, max_width):
+        """The longest prefix of ``text`` that fits ``max_width`` with ELLIPSIS appended"""
+        budget = max_width - self.width(ELLIPSIS)
+        used, end = 0, 0
+        for end, char in enumerate(text):
+            used += self.advance(char)
+            if used > budget:
+                break
+        else:
+            end = len(text)
+        line = text[:end].rstrip() + ELLIPSIS
+        while end and not self.lines_fit([line], max_width):
+            end -= 1
+            line = text[:end].rstrip() + ELLIPSIS
+        return line
+
+    def wrap(self, text, max_width):
+        """Greedy word wrap; words wider than a line are broken between characters"""
+        space = self.advance(' ')
+        lines, line, line_width = [], [], 0
+        for word in text.split():
+            word_width = self.width(word)
+            if line and line_width + space + word_width <= max_width:
+                line.append(word)
+                line_width += space + word_width
+                continue
+            if line:
+                lines.append(' '.join(line))
+            while word_width > max_width:
+                head, head_width = self._split(word, max_width)
+                lines.append(head)
+                word, word_width = word[len(head):], word_width - head_width
+            line, line_width = [word], word_width
+        if line:
+            lines.append(' '.join(line))
+        return lines
+
+    def _split(self, word, max_width):
+        used = 0
+        for end, char in enumerate(word):
+            advance = self.advance(char)
+            if used + advance > max_width:
+                # Always make progress, even if one character is wider than the line
+                end = max(end, 1)
+                return word[:end], self.width(word[:end])
+            used += advance
+        return word, used
+
+
+class TextLayout:
+    """Shrink-to-fit and wrapping for card text, with metrics and results cached.
+
+    ``font_for_size(size)`` returns the font to lay out with. ``sizes`` passed
+    to the fit methods run from the preferred (largest) size down to the
+    smallest acceptable one.
+    """
+
+    def __init__(self, font_for_size, max_layouts=1024):
+        self.font_for_size = font_for_size
+        self.max_layouts = max_layouts
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._layouts = OrderedDict()
+
+    def metrics(self, size):
+        with self._lock:
+            metrics = self._metrics.get(size)
+        if metrics is None:
+            try:
+                font = self.font_for_size(size)
+            except Exception:
+                # Same last resort as get_card_fonts(): PIL's built-in font
+                font = ImageFont.load_default()
+            with self._lock:
+                metrics = self._metrics.setdefault(size, GlyphMetrics(font))
+        return metrics
+
+    def _memoized(self, key, compute):
+        with self._lock:
+            fitted = self._layouts.get(key)
+            if fitted is not None:
+                self._layouts.move_to_end(key)
+                return fitted
+        fitted = compute()
+        with self._lock:
+            self._layouts[key] = fitted
+            if len(self._layouts) > self.max_layouts:
+                self._layouts.popitem(last=False)
+        return fitted
+
+    def _fitted(self, lines, size):
+        return FittedText(tuple(lines), size, self.metrics(size).font)
+
+    def _candidate_sizes(self, text, max_width, sizes, lines=1):
+        """Sizes worth trying, largest first.
+
+        Advances grow roughly in proportion to the font size, so the width at
+        the largest size rules out every size whose text cannot fit without
+        measuring at that size.
+        """
+        width = self.metrics(sizes[0]).width(text)
+        limit = lines * max_width
+        return [size for size in sizes if width * size / sizes[0] <= limit * 1.05]
+
+    def fit_line(self, text, max_width, sizes):
+        """``text`` on one line at the largest size that fits, else ellipsized at the smallest"""
+        sizes = tuple(sizes)
+        return self._memoized(('line', text, max_width, sizes), lambda: self._fit_line(text, max_width, sizes))
+
+    def _fit_line(self, text, max_width, sizes):
+        for size in self._candidate_sizes(text, max_width, sizes):
+            metrics = self.metrics(size)
+            if metrics.width(text) <= max_width and metrics.lines_fit([text], max_width):
+                return self._fitted([text], size)
+        smallest = sizes[-1]
+        return self._fitted([self.metrics(smallest).ellipsize(text, max_width)], smallest)
+
+    def fit_lines(self, text, max_width, max_lines, sizes):
+        """``text`` wrapped to at most ``max_lines`` at the largest size that fits.
+
+        If it does not fit even at the smallest size, the last line is ellipsized.
+        """
+        sizes = tuple(sizes)
+        return self._memoized(('lines', text, max_width, max_lines, sizes),
+                              lambda: self._fit_lines(' '.join(text.split()), max_width, max_lines, sizes))
+
+    def _fit_lines(self, text, max_width, max_lines, sizes):
+        for size in self._candidate_sizes(text, max_width, sizes, max_lines):
+            metrics = self.metrics(size)
+            lines = metrics.wrap(text, max_width)
+            if len(lines) <= max_lines and metrics.lines_fit(lines, max_width):
+                return self._fitted(lines, size)
+        smallest = sizes[-1]
+        metrics = self.metrics(smallest)
+        # A pixel narrower makes up for a line the advance sum measured too narrow
+        for width in (max_width, max_width - 1):
+            lines = metrics.wrap(text, width)
+            if len(lines) <= max_lines and metrics.lines_fit(lines, max_width):
+                return self._fitted(lines, smallest)
+            if len(lines) > max_lines and metrics.lines_fit(lines[:max_lines - 1], max_width):
+                break
+        rest = ' '.join(lines[max_lines - 1:])
+        return self._fitted(lines[:max_lines - 1] + [metrics.ellipsize(rest, max_width)], smallest)
+
+    def clear(self):
+        """Drop measured advances and layouts; they depend on the font file"""
+        with self._lock:
+            self._metrics.clear()
+            self._layouts.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'fonts': len(self._metrics), 'layouts': len(self._layouts),
+                    'glyphs': sum(len(metrics._advances) for metrics in self._metrics.values())}
+
+
+_text_layout = TextLayout(lambda size: get_render_assets().font(size))
+# Advances measured with a replaced font file are wrong for the new one
+get_render_assets().add_invalidation_listener(_text_layout.clear)
+
+
+def get_text_layout():
+    """Process-wide layout for the card font"""
+    return _text_layout
@@ -0,0 +1,127 @@
+"""Background warm-up, so a new server worker shows the form before anything heavy loads.
+
+Everything a submit needs is expensive the first time in a process:
+- importing the pipeline (PIL, qrcode, icalendar);
+- creating the S3 client and probing the bucket;
+- loading the fonts and logo;
+- drawing the card template;
+- measuring glyphs.
+
+StartupWarmup does all of it, one step at a time, on a daemon thread. The
+entry point imports only the settings. It starts the warm-up once the form
+has rendered, so the form does not compete with it, and the first submit
+finds everything ready. A submit that arrives earlier loses nothing: each
+step only primes a process-wide cache, which the submit fills itself if it
+gets there first.
+
+Step durations go to ``reminder_warmup_seconds{step}`` and are kept on the
+object for the startup profile (``python -m benchmarks.bench_import``).
+"""
+import importlib
+import string
+import threading
+from time import perf_counter
+
+from reminder_core.metrics import REGISTRY
+
+WARMUP_SECONDS = REGISTRY.histogram(
+    'reminder_warmup_seconds', "Duration of each background warm-up step after a worker starts", ('step',)
+)
+
+# Characters whose advances are measured ahead of the first card
+WARM_GLYPHS = string.ascii_letters + string.digits + string.punctuation + ' '
+
+
+def _import_pipeline(settings):
+    for module in ('reminder_core.pipeline', 'reminder_core.artifact_cache', 'icalendar'):
+        importlib.import_module(module)
+
+
+def _generator(settings):
+    from reminder_core.pipeline import get_generator
+    get_generator(settings)
+
+
+def _store_status(settings):
+    # Creates the S3 client (importing boto3) and runs the first health probe
+    from reminder_core.pipeline import get_generator
+    get_generator(settings).s3_status()
+
+
+def _render_assets(settings):
+    from reminder_core.assets import get_render_assets
+    get_render_assets().warm()
+
+
+def _card_templates(settings):
+    from reminder_core.card import DEFAULT_CARD_THEME, get_card_template
+    for with_notes in (False, True):
+        get_card_template(DEFAULT_CARD_THEME, with_notes)
+
+
+def _glyphs(settings):
+    from reminder_core.card import CARD_NOTES_SIZES, CARD_PET_SIZES, CARD_PRODUCT_SIZES
+    from reminder_core.text_layout import get_text_layout
+    layout = get_text_layout()
+    for size in sorted({*CARD_PET_SIZES, *CARD_PRODUCT_SIZES, *CARD_NOTES_SIZES}, reverse=True):
+        layout.metrics(size).width(WARM_GLYPHS)
+
+
+def _artifact_cache(settings):
+    from reminder_core.artifact_cache import get_artifact_cache
+    get_artifact_cache(settings)
+
+
+# In order: the import first, everything else needs it; the S3 probe last, it may wait on the network
+WARMUP_STEPS = (
+    ('import_pipeline', _import_pipeline),
+    ('generator', _generator),
+    ('render_assets', _render_assets),
+    ('card_templates', _card_templates),
+    ('glyphs', _glyphs),
+    ('artifact_cache', _artifact_cache),
+    ('store_status', _store_status),
+)
+
+
+class StartupWarmup:
+    """Runs WARMUP_STEPS for ``settings`` once, on a background thread"""
+
+    def __init__(self, settings, steps=WARMUP_STEPS):
+        self.settings = settings
+        self.steps = tuple(steps)
+        # Step name -> seconds, and step name -> exception for steps that failed
+        self.timings = {}
+        self.errors = {}
+        self._done = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = threading.Thread(target=self.run, name="startup-warmup", daemon=True)
+
+    def start(self):
+        """Start the steps on the first call; later calls (every rerun) do nothing"""
+        with self._start_lock:
+            if self._thread.ident is None:
+                self._thread.start()
+        return self
+
+    def run(self):
+        try:
+            for name, step in self.steps:
+                started = perf_counter()
+                try:
+                    step(self.settings)
+                except Exception as e:
+                    # The submit that needs this step will hit and report the same error
+                    self.errors[name] = e
+                elapsed = perf_counter() - started
+                self.timings[name] = elapsed
+                WARMUP_SECONDS.observe(elapsed, step=name)
+        finally:
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until every step has run; returns False if ``timeout`` seconds pass first"""
+        return self._done.wait(timeout)